@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 from bson import ObjectId
+from pymongo import ReturnDocument
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 import hashlib
@@ -31,6 +32,12 @@ def create_indexes():
     verify_col.create_index("expiresAt", expireAfterSeconds=0)
     pwreset_col.create_index("expiresAt", expireAfterSeconds=0)
     users_col.create_index("email", unique=True)
+    # Lookups by token hash (refresh rotation, logout, reset) and by user
+    # (revoke-all, account deletion) must not scan the token collections.
+    refresh_col.create_index("token_hash", unique=True)
+    refresh_col.create_index("user_id")
+    verify_col.create_index([("user_id", 1), ("token_hash", 1)])
+    pwreset_col.create_index("token_hash", unique=True)
 
 
 # Run index creation once
@@ -148,21 +155,31 @@ def revoke_all_user_refresh_tokens(user_id: ObjectId):
     refresh_col.update_many({"user_id": user_id}, {"$set": {"revoked": True}})
 
 
-def verify_and_rotate_refresh_token(token: str, user_id: ObjectId) -> Optional[str]:
+def verify_and_rotate_refresh_token(token: str) -> Optional[Tuple[str, ObjectId]]:
+    """Revoke a live refresh token and issue its replacement.
+
+    The revoke is a single atomic `find_one_and_update` on the indexed
+    `token_hash`, so two concurrent refreshes with the same token cannot both
+    succeed. Returns `(new_token, user_id)` or None when the token is unknown
+    or was already revoked (reuse), in which case every token for that user is
+    revoked.
+    """
     t_hash = hash_token(token)
-    doc = refresh_col.find_one({"token_hash": t_hash})
+    doc = refresh_col.find_one_and_update(
+        {"token_hash": t_hash, "revoked": False},
+        {"$set": {"revoked": True}},
+        return_document=ReturnDocument.BEFORE,
+    )
     if not doc:
-        # possible token reuse - revoke all for user
-        revoke_all_user_refresh_tokens(user_id)
-        return None
-    if doc.get("revoked"):
-        # token already revoked -> revoke all
-        revoke_all_user_refresh_tokens(user_id)
+        # Unknown or already revoked. Only the failure path pays for the
+        # extra lookup needed to find the owner for reuse detection.
+        stale = refresh_col.find_one({"token_hash": t_hash}, {"user_id": 1})
+        if stale:
+            revoke_all_user_refresh_tokens(stale["user_id"])
         return None
-    # rotate: revoke current and insert new
-    refresh_col.update_one({"_id": doc["_id"]}, {"$set": {"revoked": True}})
+    user_id = doc["user_id"]
     new_token, _ = create_refresh_token_doc(user_id)
-    return new_token
+    return new_token, user_id
 
 
 def create_access_and_refresh_tokens(user: dict) -> dict:
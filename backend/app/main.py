@@ -1,14 +1,44 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 from app.routers import api
 from app.routers import auth as auth_router
+from app.routers import metrics as metrics_router
 from fastapi import Response
 from app.routers import auth as auth_module
 from app.auth import schemas as auth_schemas
+from app.services.airports import registry, AIRPORT_REGISTRY_REFRESH_SECONDS
+from app.services.mongodb import watch_config_changes
+from app.services.prompt_budget import load_tokenizer
+from app.utils.compression import CompressionMiddleware
+from app.utils.json_response import FastJSONResponse, json_backend
+from contextlib import asynccontextmanager
 import logging
 import os
 
-app = FastAPI(title="GroundScanner Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the airport registry so IATA lookups are served from memory
+    try:
+        registry.load()
+    except Exception:
+        logging.exception("Failed to load airport registry; using MongoDB lookups")
+    registry.start_background_refresh(AIRPORT_REGISTRY_REFRESH_SECONDS)
+    if os.getenv("CONFIG_CHANGE_STREAMS", "0").lower() in ("1", "true", "yes"):
+        watch_config_changes()
+    # Resolved here so no LLM worker ever waits on the encoding download
+    load_tokenizer()
+    if json_backend() != "orjson":
+        logging.warning("orjson is not installed; encoding responses with json")
+    yield
+
+
+app = FastAPI(
+    title="GroundScanner Backend",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # Allow requests from your frontend (e.g. localhost:3000)
 _default_origins = [
@@ -34,23 +64,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Custom middleware to check for frontend header
-@app.middleware("http")
-async def check_frontend_header(request: Request, call_next):
-    # Skip for auth endpoints or if it's a preflight
-    if request.method == "OPTIONS" or request.url.path.startswith("/login") or request.url.path.startswith("/register"):
-        return await call_next(request)
-    
-    # Check for custom header
-    #if request.headers.get("X-Requested-By") != "GroundScanner-Frontend":
-    #    raise HTTPException(status_code=403, detail="Forbidden: Requests must come from the frontend")
-    
-    response = await call_next(request)
-    return response
+
+# Custom middleware to check for frontend header. Pure ASGI (not
+# `@app.middleware("http")`) so the app still receives `http.disconnect`
+# and can cancel work for clients that went away.
+class FrontendHeaderMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        # Skip for auth endpoints or if it's a preflight
+        if (
+            request.method == "OPTIONS"
+            or request.url.path.startswith("/login")
+            or request.url.path.startswith("/register")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Check for custom header
+        # if request.headers.get("X-Requested-By") != "GroundScanner-Frontend":
+        #    raise HTTPException(status_code=403, detail="Forbidden: Requests must come from the frontend")
+
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(FrontendHeaderMiddleware)
+
+# Compress JSON responses above the size threshold (registered after the
+# header check so it wraps it and sees the final body)
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(api.router)
 app.include_router(auth_router.router)
+app.include_router(metrics_router.router)
 
 
 # --- Top-level auth aliases so frontend can POST to `/login` and `/register` ---
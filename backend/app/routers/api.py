@@ -3,30 +3,64 @@ from app.services.climatiq import (
     save_climatiq_response,
     search_emission_factors,
 )
-from fastapi import APIRouter, HTTPException, Query, Body
-from fastapi.responses import PlainTextResponse
-from app.services.ollama import ask_ollama
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from app.services.ollama import LLM_STREAM_BUFFER, ask_ollama, stream_ollama
+from app.services.city_centre import get_city_centre
+from app.services.terminal_transfers import generate_terminal_transfers
+from app.services.cancellation import (
+    CLIENT_DISCONNECTED,
+    DEADLINE,
+    UPDATE_DEADLINE_SECONDS,
+    Cancelled,
+    CancellationToken,
+)
+import asyncio
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
 from app.utils import sanitize_string, validate_iata, validate_city
+from app.utils.http_cache import cache_headers, is_not_modified, not_modified
+from app.utils.response_cache import cached_response, response_cache
+from app.utils.json_response import FastJSONResponse, dumps
 from fastapi import HTTPException
 from app.services.airports import (
     get_all_airports,
     get_airport_by_iata,
     replace_airports_for_country,
     replace_all_airports,
-    log_prompt,
+    registry as airport_registry,
+    AIRPORTS_VERSION_KEY,
+)
+from app.services.airport_generation import (
+    generate_airports,
+    get_chunk_countries,
+    update_airports_chunked,
 )
-from app.services.airport_prompt import get_prompt
-from app.services.city_center_prompt import get_prompt as get_city_center_prompt
-from app.services.terminal_transfers_prompt import get_prompt as get_terminal_transfers_prompt
 from app.services.airport_transports import (
     get_transports_for_airport,
+    get_transports_for_airports,
+    MAX_BATCH_AIRPORTS,
     replace_transports_for_airport,
     log_prompt as transport_log_prompt,
     enrich_transports_co2_for_airport,
+    get_failed_lookup,
+    record_failed_lookup,
+    clear_failed_lookup,
+    rollback_transports_for_airport,
+    transports_version_key,
+)
+from app.services.airport_agent import iter_airport_lookup, run_airport_lookup
+from app.services.transport_freshness import (
+    EXPIRED,
+    FRESH,
+    STALE,
+    classify_transports,
+    regenerate_transports,
+    schedule_refresh,
 )
-from app.services.airport_agent import run_airport_lookup
 import json
 from app.services.tavily import (
     search as tavily_search,
@@ -43,6 +77,7 @@ from app.services.city_fares import (
     save_fare_summary_for_city,
     generate_fare_summary_for_city,
     log_fare_summary_prompt,
+    fares_version_key,
 )
 from app.services.mongodb import (
     get_activity_ids,
@@ -63,10 +98,111 @@ from app.services.mongodb import (
 from app.services.mongodb import save_airport_distance, get_airport_distance
 from math import radians, sin, cos, atan2, sqrt
 from app.services.mongodb import save_climatiq_response
+from app.services.mongodb import (
+    COUNTRY_REGIONS_COLLECTION,
+    TERMINAL_TRANSFERS_COLLECTION,
+)
+from app.services.data_versions import get_version
+from app.services.bulkheads import (
+    Bulkhead,
+    BulkheadFull,
+    llm_bulkhead,
+    http_bulkhead,
+    mongo_bulkhead,
+)
 
 router = APIRouter(tags=["Example"])
 
 
+async def _isolated(bulkhead: Bulkhead, fn, *args, **kwargs):
+    """Run blocking work on a dedicated bulkhead, answering 503 when it is saturated."""
+    try:
+        return await bulkhead.run(fn, *args, **kwargs)
+    except BulkheadFull as e:
+        raise _busy(e)
+
+
+def _busy(e: BulkheadFull) -> HTTPException:
+    logging.warning("Rejecting request: %s", e)
+    return HTTPException(
+        status_code=503,
+        detail=f"Service busy ({e.name}), please retry shortly",
+        headers={"Retry-After": "5"},
+    )
+
+
+async def _cancel_on_disconnect(request: Request, token: CancellationToken):
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel(CLIENT_DISCONNECTED)
+            return
+        await asyncio.sleep(0.5)
+
+
+@asynccontextmanager
+async def _cancellation_scope(
+    request: Request, operation: str, timeout: Optional[float] = None
+):
+    """Yield a token that is cancelled when the client goes away or `timeout` passes.
+
+    LLM work started inside the scope should receive the token; a resulting
+    `Cancelled` becomes a 504 (deadline) or 499 (client closed request).
+    """
+    token = CancellationToken(operation, timeout)
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, token))
+    try:
+        yield token
+    except Cancelled as e:
+        if e.reason == DEADLINE:
+            raise HTTPException(
+                status_code=504, detail=f"{e.operation} exceeded its deadline"
+            )
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        # The request task itself was cancelled; stop the worker thread too
+        token.cancel(CLIENT_DISCONNECTED)
+        raise
+    finally:
+        watcher.cancel()
+    token.complete()
+
+
+async def _cache_validators(request: Request, name: str):
+    """Read the data version of `name` and evaluate the request's conditional headers.
+
+    Returns `(headers, not_modified_response)`; the response is None when the
+    client's copy is out of date. Call this before loading the data so the
+    validators never describe newer data than the body.
+    """
+    stamp = await _isolated(mongo_bulkhead, get_version, name)
+    headers = cache_headers(name, stamp)
+    if is_not_modified(request, headers):
+        return headers, not_modified(headers)
+    return headers, None
+
+
+async def _serve_cached(request: Request, name: str, stamp: dict, load):
+    """Answer from the pre-encoded body of `name` at `stamp`, building it once.
+
+    `load` is an async callable returning the payload; it only runs when no
+    body is cached for this version yet.
+    """
+    headers = cache_headers(name, stamp)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    entry = response_cache.get(name, stamp["version"])
+    if entry is None:
+        entry = response_cache.put(name, stamp["version"], await load())
+    return cached_response(request, entry, headers)
+
+
+async def _lookup_airport(iata: str):
+    """Resolve an airport from the in-memory registry (MongoDB until it has loaded)."""
+    if airport_registry.loaded:
+        return get_airport_by_iata(iata)
+    return await _isolated(mongo_bulkhead, get_airport_by_iata, iata)
+
+
 @router.get("/example")
 def get_example():
     """Returns a static example message."""
@@ -74,10 +210,47 @@ def get_example():
 
 
 @router.get("/llm")
-def query_ollama(
-    prompt: str = Query("Why is the sky blue?", description="Prompt for the LLM")
+async def query_ollama(
+    prompt: str = Query("Why is the sky blue?", description="Prompt for the LLM"),
+    stream: bool = Query(False, description="Stream tokens as plain text"),
 ):
-    """Query the Ollama LLM with a user prompt."""
+    """Query the Ollama LLM with a user prompt.
+
+    With `stream=true` the completion is sent as plain text while it is
+    generated. Tokens are buffered only up to LLM_STREAM_BUFFER ahead of the
+    client, and a client disconnect closes the upstream generation.
+    """
+    if not stream:
+        return await _isolated(llm_bulkhead, _query_ollama, prompt)
+    messages = [{"role": "user", "content": prompt}]
+    try:
+        tokens = llm_bulkhead.stream(
+            stream_ollama,
+            "gpt-oss:120b-cloud",
+            messages,
+            max_buffered=LLM_STREAM_BUFFER,
+        )
+    except BulkheadFull as e:
+        raise _busy(e)
+    return StreamingResponse(
+        _encode_tokens(tokens),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _encode_tokens(tokens):
+    try:
+        async for token in tokens:
+            yield token.encode("utf-8")
+    except Exception:
+        # Headers are already sent; all we can do is log and end the body
+        logging.exception("Error streaming from Ollama")
+    finally:
+        await tokens.aclose()
+
+
+def _query_ollama(prompt: str):
     messages = [{"role": "user", "content": prompt}]
     try:
         response = ask_ollama("gpt-oss:120b-cloud", messages)
@@ -88,12 +261,16 @@ def query_ollama(
 
 
 @router.get("/climatiq")
-def query_climatiq(
+async def query_climatiq(
     region: str = Query("GB", description="Region code"),
     passengers: int = Query(4, description="Number of passengers"),
     distance: int = Query(100, description="Distance in km"),
 ):
     """Query Climatiq for emission factors using saved activity IDs for the region."""
+    return await _isolated(http_bulkhead, _query_climatiq, region, passengers, distance)
+
+
+def _query_climatiq(region: str, passengers: int, distance: int):
     try:
         activity_entries = get_activity_ids(region)
         if not activity_entries:
@@ -212,22 +389,30 @@ def api_put_climatiq_activity_ids(
 
 
 @router.get("/climatiq/search")
-def climatiq_search(
+async def climatiq_search(
     mode_of_transport: str = Query("national rail", description="Mode of transport"),
     region: str = Query("GB", description="Region code"),
     source_lca_activity: str = Query("well_to_tank", description="Source LCA activity"),
 ):
     """Search for Climatiq activity metadata."""
     try:
-        result = search_emission_factors(mode_of_transport, region, source_lca_activity)
+        result = await _isolated(
+            http_bulkhead,
+            search_emission_factors,
+            mode_of_transport,
+            region,
+            source_lca_activity,
+        )
         return {"result": result}
+    except HTTPException:
+        raise
     except Exception:
         logging.exception("Unexpected error in climatiq_search")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/climatiq/estimate")
-def climatiq_estimate(
+async def climatiq_estimate(
     activity_id: str = Query(..., description="Activity ID from search"),
     region: str = Query("GB", description="Region code"),
     source_lca_activity: str = Query("well_to_tank", description="Source LCA activity"),
@@ -236,10 +421,18 @@ def climatiq_estimate(
 ):
     """Estimate emissions for a given activity ID."""
     try:
-        result = estimate_emission_factors(
-            activity_id, region, source_lca_activity, passengers, distance
+        result = await _isolated(
+            http_bulkhead,
+            estimate_emission_factors,
+            activity_id,
+            region,
+            source_lca_activity,
+            passengers,
+            distance,
         )
         return {"result": result}
+    except HTTPException:
+        raise
     except Exception:
         logging.exception("Unexpected error in climatiq_estimate")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -251,7 +444,7 @@ def climatiq_responses():
     """Return all stored Climatiq responses from MongoDB."""
     try:
         docs = get_all_climatiq_responses()
-        return {"responses": docs, "count": len(docs)}
+        return FastJSONResponse({"responses": docs, "count": len(docs)})
     except Exception:
         logging.exception("Failed to fetch climatiq responses")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -311,22 +504,35 @@ def api_put_transport_activity_mapping(payload: dict = Body(...)):
 
 
 @router.get("/airports")
-def api_get_airports():
+async def api_get_airports(request: Request):
     """Return all airports stored in MongoDB."""
     try:
-        docs = get_all_airports()
-        return {"airports": docs}
+        if airport_registry.loaded:
+            stamp, docs = airport_registry.snapshot()
+
+            async def load():
+                return {"airports": docs}
+
+        else:
+            stamp = await _isolated(mongo_bulkhead, get_version, AIRPORTS_VERSION_KEY)
+
+            async def load():
+                return {"airports": await _isolated(mongo_bulkhead, get_all_airports)}
+
+        return await _serve_cached(request, AIRPORTS_VERSION_KEY, stamp, load)
+    except HTTPException:
+        raise
     except Exception:
         logging.exception("Failed to get airports from DB")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/airports/{iata}/country")
-def api_get_airport_country(iata: str):
+async def api_get_airport_country(iata: str):
     """Return the country for a given IATA airport code."""
     try:
         iata = validate_iata(iata)
-        airport = get_airport_by_iata(iata.upper())
+        airport = await _lookup_airport(iata.upper())
         if not airport:
             raise HTTPException(status_code=404, detail="Airport not found")
         return PlainTextResponse(content=airport.get("country"))
@@ -340,11 +546,11 @@ def api_get_airport_country(iata: str):
 
 
 @router.get("/airports/{iata}/coords")
-def api_get_airport_coords(iata: str):
+async def api_get_airport_coords(iata: str):
     """Return latitude and longitude for a given IATA airport code."""
     try:
         iata = validate_iata(iata)
-        airport = get_airport_by_iata(iata.upper())
+        airport = await _lookup_airport(iata.upper())
         if not airport:
             raise HTTPException(status_code=404, detail="Airport not found")
         lat = airport.get("lat")
@@ -360,215 +566,85 @@ def api_get_airport_coords(iata: str):
 
 
 @router.post("/airports/update")
-def api_update_airports(country: str = "ALL"):
+async def api_update_airports(
+    request: Request,
+    country: str = "ALL",
+    chunked: bool = Query(
+        False,
+        description="For ALL: generate each country with its own prompt, concurrently",
+    ),
+):
     """Update airports for a given country (ISO code) or ALL using the stored Ollama prompt.
 
     This endpoint calls Ollama with a fixed prompt to generate JSON and saves the result to MongoDB.
+    With `chunked=true` and `country=ALL`, one prompt per country (from the
+    country-regions mapping) runs concurrently; failed countries are retried on
+    their own and reported without discarding the rest.
     """
-    prompt = get_prompt()
-    messages = [{"role": "user", "content": prompt + f"\nCountry: {country}"}]
-    try:
-        response_text = ask_ollama("gpt-oss:120b", messages)
-    except Exception as e:
-        logging.exception("Ollama query failed")
-        raise HTTPException(status_code=500, detail="LLM request failed")
-
-    # log prompt and response for auditing
-    try:
-        log_prompt(prompt, country, response_text)
-    except Exception:
-        logging.exception("Failed to log prompt/response")
-
-    # parse JSON from response
-    try:
-        data = json.loads(response_text)
-        if not isinstance(data, list):
-            raise ValueError("Expected JSON array from LLM")
-        # minimal validation: ensure required keys exist
-        cleaned = []
-        for item in data:
-            if not isinstance(item, dict):
-                continue
-            # Safely parse latitude and longitude: store values first so mypy
-            # can narrow types, and convert inside try/except to handle
-            # non-numeric or unexpected types gracefully.
-            lat_val = item.get("lat")
-            lon_val = item.get("lon")
-
-            city_lat_val = item.get("city_lat")
-            city_lon_val = item.get("city_lon")
-
-            lat = None
-            lon = None
-
-            if lat_val is not None:
-                try:
-                    lat = float(lat_val)
-                except (TypeError, ValueError):
-                    lat = None
-
-            if lon_val is not None:
-                try:
-                    lon = float(lon_val)
-                except (TypeError, ValueError):
-                    lon = None
-
-            city_lat = None
-            city_lon = None
-            if city_lat_val is not None:
-                try:
-                    city_lat = float(city_lat_val)
-                except (TypeError, ValueError):
-                    city_lat = None
-
-            if city_lon_val is not None:
-                try:
-                    city_lon = float(city_lon_val)
-                except (TypeError, ValueError):
-                    city_lon = None
-
-            cleaned.append(
-                {
-                    "iata": item.get("iata"),
-                    "name": item.get("name"),
-                    "city": item.get("city"),
-                    "country": item.get("country"),
-                    "lat": lat,
-                    "lon": lon,
-                    "city_lat": city_lat,
-                    "city_lon": city_lon,
-                    "aliases": item.get("aliases") or [],
-                }
-            )
-        # Strict validation: ensure each item has exactly the required keys
-        required_keys = {
-            "iata",
-            "name",
-            "city",
-            "country",
-            "lat",
-            "lon",
-            "city_lat",
-            "city_lon",
-            "aliases",
-        }
-        invalid_items = []
-        for idx, c in enumerate(cleaned):
-            if not isinstance(c, dict):
-                invalid_items.append((idx, "not an object"))
-                continue
-            keys = set(c.keys())
-            if keys != required_keys:
-                # allow missing keys or extra keys to be reported
-                missing = required_keys - keys
-                extra = keys - required_keys
-                invalid_items.append(
-                    (idx, {"missing": list(missing), "extra": list(extra)})
-                )
-
-        if invalid_items:
-            logging.error(
-                "LLM response failed validation; not saving. Details: %s", invalid_items
-            )
-            logging.error("LLM response text: %s", response_text)
+    if chunked and country.upper() == "ALL":
+        countries = await _isolated(mongo_bulkhead, get_chunk_countries)
+        if not countries:
             raise HTTPException(
-                status_code=500,
-                detail=f"LLM response failed validation for {len(invalid_items)} items; check logs for details",
+                status_code=400,
+                detail="No countries configured for a chunked update; set /country-regions first",
             )
-
-        # save for country or ALL
-        # First, delete all existing airports to avoid duplicates from previous updates
-        from app.services.mongodb import client, DB_NAME
-        db = client[DB_NAME]
-        col = db["airports"]
-        col.delete_many({})
-        if country.upper() == "ALL":
-            replace_all_airports(cleaned)
-        else:
-            replace_airports_for_country(country.upper(), cleaned)
-        return {"message": "Airports updated", "count": len(cleaned)}
+        async with _cancellation_scope(
+            request, "airports_update", UPDATE_DEADLINE_SECONDS
+        ) as token:
+            try:
+                result = await update_airports_chunked(countries, token)
+            except Exception:
+                logging.exception("Unexpected error in chunked airports update")
+                raise HTTPException(status_code=500, detail="Internal server error")
+        return {"message": "Airports updated", **result}
+    async with _cancellation_scope(
+        request, "airports_update", UPDATE_DEADLINE_SECONDS
+    ) as token:
+        return await _isolated(llm_bulkhead, _update_airports, country, token)
+
+
+def _update_airports(country: str, token: Optional[CancellationToken] = None):
+    try:
+        cleaned = generate_airports(country, token)
     except json.JSONDecodeError:
         logging.exception("Failed to parse JSON from LLM response")
         raise HTTPException(
             status_code=500, detail="Failed to parse JSON from LLM response"
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{e}; check logs for details",
+        )
+    except Exception:
+        logging.exception("Ollama query failed")
+        raise HTTPException(status_code=500, detail="LLM request failed")
+
+    try:
+        # save for country or ALL; only rows that changed are written
+        if country.upper() == "ALL":
+            counts = replace_all_airports(cleaned)
+        else:
+            counts = replace_airports_for_country(country.upper(), cleaned)
+        return {"message": "Airports updated", "count": len(cleaned), **counts}
     except Exception:
         logging.exception("Unexpected error updating airports")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/airports/{iata}/distance")
-def api_compute_and_save_distance(iata: str):
+async def api_compute_and_save_distance(iata: str):
     """Compute distance (km) between airport and city centre, save to MongoDB mapping, return rounded km as plain text."""
+    return await _isolated(llm_bulkhead, _compute_and_save_distance, iata)
+
+
+def _compute_and_save_distance(iata: str):
     try:
         iata = validate_iata(iata)
         airport = get_airport_by_iata(iata.upper())
         if not airport:
             raise HTTPException(status_code=404, detail="Airport not found")
-
-        a_lat = airport.get("lat")
-        a_lon = airport.get("lon")
-        city = airport.get("city")
-        country = airport.get("country")
-
-        if a_lat is None or a_lon is None:
-            raise HTTPException(
-                status_code=400, detail="Airport coordinates not available"
-            )
-        if not city:
-            raise HTTPException(status_code=400, detail="Airport city not available")
-
-        prompt = get_city_center_prompt()
-        messages = [
-            {
-                "role": "user",
-                "content": prompt + f"\nCity: {city}\nCountry: {country or ''}",
-            }
-        ]
-        try:
-            resp_text = ask_ollama("gpt-oss:120b", messages)
-        except Exception:
-            logging.exception("Ollama request failed for city centre lookup")
-            raise HTTPException(status_code=500, detail="LLM request failed")
-
-        try:
-            obj = json.loads(resp_text)
-            if not isinstance(obj, dict):
-                raise ValueError("Expected JSON object from LLM")
-            c_lat = obj.get("lat")
-            c_lon = obj.get("lon")
-            if c_lat is None or c_lon is None:
-                raise ValueError("City centre coordinates missing or null")
-            c_lat = float(c_lat)
-            c_lon = float(c_lon)
-        except Exception:
-            logging.exception(
-                "Failed to parse city centre coords from LLM response: %s", resp_text
-            )
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to parse city coordinates from LLM response",
-            )
-
-        # compute haversine in km
-        R = 6371.0
-        lat1 = radians(float(a_lat))
-        lon1 = radians(float(a_lon))
-        lat2 = radians(c_lat)
-        lon2 = radians(c_lon)
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        km = R * c
-
-        # save to DB (km as float)
-        try:
-            save_airport_distance(iata.upper(), float(km))
-        except Exception:
-            logging.exception("Failed to save airport distance for %s", iata)
-            raise HTTPException(status_code=500, detail="Failed to save distance")
-
+        km = _city_centre_distance_km(iata, airport)
         return PlainTextResponse(content=str(int(round(km))))
     except HTTPException:
         raise
@@ -577,15 +653,60 @@ def api_compute_and_save_distance(iata: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _city_centre_distance_km(iata: str, airport: dict) -> float:
+    """Ask the LLM for the city centre of `airport`, then compute and save the distance."""
+    a_lat = airport.get("lat")
+    a_lon = airport.get("lon")
+    city = airport.get("city")
+    country = airport.get("country")
+
+    if a_lat is None or a_lon is None:
+        raise HTTPException(status_code=400, detail="Airport coordinates not available")
+    if not city:
+        raise HTTPException(status_code=400, detail="Airport city not available")
+
+    try:
+        c_lat, c_lon = get_city_centre(city, country)
+    except ValueError:
+        logging.exception("Failed to parse city centre coords from LLM response")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to parse city coordinates from LLM response",
+        )
+    except Exception:
+        logging.exception("Ollama request failed for city centre lookup")
+        raise HTTPException(status_code=500, detail="LLM request failed")
+
+    # compute haversine in km
+    R = 6371.0
+    lat1 = radians(float(a_lat))
+    lon1 = radians(float(a_lon))
+    lat2 = radians(c_lat)
+    lon2 = radians(c_lon)
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    km = R * c
+
+    # save to DB (km as float)
+    try:
+        save_airport_distance(iata.upper(), float(km))
+    except Exception:
+        logging.exception("Failed to save airport distance for %s", iata)
+        raise HTTPException(status_code=500, detail="Failed to save distance")
+    return km
+
+
 @router.get("/airports/{iata}/distance")
-def api_get_saved_distance(iata: str):
+async def api_get_saved_distance(iata: str):
     """Retrieve saved distance (km) for an IATA code and return as rounded integer plain text."""
     try:
         iata = validate_iata(iata)
-        val = get_airport_distance(iata.upper())
+        val = await _isolated(mongo_bulkhead, get_airport_distance, iata.upper())
         if val is None:
             # attempt to compute and save the distance, then return result
-            return api_compute_and_save_distance(iata)
+            return await api_compute_and_save_distance(iata)
 
         return PlainTextResponse(content=str(int(round(float(val)))))
     except ValueError as e:
@@ -598,47 +719,391 @@ def api_get_saved_distance(iata: str):
 
 
 @router.get("/airports/{iata}/transports")
-def api_get_transports(
-    iata: str, passengers: int = Query(1, description="Number of passengers")
+async def api_get_transports(
+    request: Request,
+    iata: str,
+    passengers: int = Query(1, description="Number of passengers"),
 ):
     """Return transport options for a specific airport.
 
     If transports are not present in the database, call the LLM prompt on-demand,
-    store the results, and return them.
+    store the results, and return them. Unknown airports are rejected before the
+    agent runs, and airports whose last lookup came back empty or failed return
+    an empty list until their backoff expires.
+
+    Stored transports past the soft TTL are returned as-is while a background
+    regeneration is queued; past the hard TTL they are regenerated first. The
+    `X-Data-Freshness` header reports which case applied. Fresh data honours
+    `If-None-Match`/`If-Modified-Since` with a 304.
     """
     try:
         iata = validate_iata(iata)
         if passengers < 1 or passengers > 10:
             raise HTTPException(status_code=400, detail="Passengers must be between 1 and 10")
-        docs = get_transports_for_airport(iata)
+        version_key = transports_version_key(iata)
+        headers, unchanged = await _cache_validators(request, version_key)
+        docs = await _isolated(mongo_bulkhead, get_transports_for_airport, iata)
         if docs:
-            return {"transports": docs}
+            stored = classify_transports(docs)
+            if stored == FRESH and unchanged:
+                return unchanged
+            docs, freshness = await _apply_freshness(iata, docs, stored)
+            if freshness != stored:
+                headers, _ = await _cache_validators(request, version_key)
+            headers["X-Data-Freshness"] = freshness
+            return FastJSONResponse({"transports": docs}, headers=headers)
+
+        airport = await _lookup_airport(iata.upper())
+        if not airport:
+            raise HTTPException(status_code=404, detail="Airport not found")
+        async with _cancellation_scope(request, "transports_lookup") as token:
+            return {"transports": await _generate_transports(iata, token)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to get transports from DB")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def _apply_freshness(iata: str, docs: list, freshness: str):
+    """Apply the stale-while-revalidate policy to stored transports.
 
-        # Not in DB: run the new airport agent which will orchestrate the LLM + tools
+    Stale data queues a background refresh; expired data is regenerated
+    before answering, falling back to the expired set if that fails.
+    Airports in negative-cache backoff are served expired without calling
+    the LLM. Returns the transports to serve and their freshness.
+    """
+    if freshness == STALE:
+        schedule_refresh(iata)
+    elif freshness == EXPIRED:
+        if await _isolated(mongo_bulkhead, get_failed_lookup, iata):
+            logging.info("Serving expired transports for %s: lookup in backoff", iata)
+            return docs, freshness
         try:
-            cleaned = run_airport_lookup(iata)
-        except Exception:
-            logging.exception("Airport agent failed for %s", iata)
-            raise HTTPException(status_code=500, detail="Agent request failed")
+            if await _isolated(llm_bulkhead, regenerate_transports, iata):
+                docs = await _isolated(mongo_bulkhead, get_transports_for_airport, iata)
+                freshness = FRESH
+        except (Exception, Cancelled):
+            # Expired data beats no data when regeneration fails or runs out
+            # of its agent budget
+            logging.exception("Blocking refresh failed for %s", iata)
+    return docs, freshness
+
+
+async def _generate_transports(
+    iata: str, token: Optional[CancellationToken] = None
+) -> list:
+    """Run the agent for a known airport with no stored transports and save them.
+
+    Airports in negative-cache backoff, and runs that come back empty, yield
+    an empty list; agent or save failures raise a 500.
+    """
+    if await _isolated(mongo_bulkhead, get_failed_lookup, iata):
+        logging.info("Skipping agent for %s: recent lookup came back empty", iata)
+        return []
 
-        # Log and persist
+    # Not in DB: run the new airport agent which will orchestrate the LLM + tools
+    try:
+        cleaned = await _isolated(llm_bulkhead, run_airport_lookup, iata, token=token)
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Airport agent failed for %s", iata)
+        await _isolated(mongo_bulkhead, record_failed_lookup, iata, "agent_error")
+        raise HTTPException(status_code=500, detail="Agent request failed")
+
+    if not cleaned:
+        await _isolated(mongo_bulkhead, record_failed_lookup, iata, "empty_result")
+        return []
+
+    # Log and persist
+    try:
+        await _isolated(
+            mongo_bulkhead, replace_transports_for_airport, iata.upper(), cleaned
+        )
+        await _isolated(mongo_bulkhead, clear_failed_lookup, iata)
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to save transports for %s", iata)
+        raise HTTPException(status_code=500, detail="Failed to save transports")
+    return cleaned
+
+
+@router.get("/airports/{iata}/transports/stream")
+async def api_stream_transports(
+    iata: str,
+    format: str = Query("sse", pattern="^(sse|ndjson)$", description="sse or ndjson"),
+):
+    """Stream transport options as Server-Sent Events or NDJSON.
+
+    Stored transports are sent straight away, followed by a `done` event. On
+    a cache miss the agent's output is streamed: a `transport` event for
+    each object as soon as the model has completed it, `status`/`retry`
+    events per attempt (transports from a retried attempt are superseded),
+    then a `saved` event carrying the validated list once it is stored, or
+    `done`/`error` when nothing was produced.
+    """
+    try:
+        iata = validate_iata(iata)
+        docs = await _isolated(mongo_bulkhead, get_transports_for_airport, iata)
+        if docs:
+            freshness = classify_transports(docs)
+            if freshness != FRESH:
+                schedule_refresh(iata)
+            events = _stored_transport_events(docs, freshness)
+        else:
+            airport = await _lookup_airport(iata.upper())
+            if not airport:
+                raise HTTPException(status_code=404, detail="Airport not found")
+            if await _isolated(mongo_bulkhead, get_failed_lookup, iata):
+                events = _stored_transport_events([], "backoff")
+            else:
+                events = await _start_agent_stream(iata)
+        media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+        return StreamingResponse(
+            _encode_events(events, format),
+            media_type=media_type,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to stream transports for %s", iata)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def _stored_transport_events(docs: list, freshness: str):
+    for index, doc in enumerate(docs):
+        yield "transport", {"attempt": 0, "index": index, "transport": doc}
+    yield "done", {"count": len(docs), "source": "stored", "freshness": freshness}
+
+
+async def _start_agent_stream(iata: str):
+    """Run the agent on the LLM bulkhead and return its events as an async iterator.
+
+    The agent thread also stores the result, so a client that disconnects
+    early does not waste the generation.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    started = time.monotonic()
+
+    def emit(event, data):
+        data = {**data, "elapsed_ms": int((time.monotonic() - started) * 1000)}
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def produce():
         try:
-            replace_transports_for_airport(iata.upper(), cleaned)
+            cleaned = []
+            for event, data in iter_airport_lookup(iata, stream=True):
+                if event == "result":
+                    cleaned = data
+                    break
+                emit(event, data)
+            if not cleaned:
+                record_failed_lookup(iata, "empty_result")
+                emit("done", {"count": 0, "source": "agent"})
+                return
+            generation = replace_transports_for_airport(iata.upper(), cleaned)
+            clear_failed_lookup(iata)
+            emit(
+                "saved",
+                {
+                    "count": len(cleaned),
+                    "generation": generation,
+                    "transports": cleaned,
+                },
+            )
+        except Cancelled as e:
+            # Running out of budget says nothing about the airport; no backoff
+            logging.warning("Streaming agent for %s cancelled: %s", iata, e.reason)
+            emit("error", {"detail": f"Agent cancelled: {e.reason}"})
         except Exception:
-            logging.exception("Failed to save transports for %s", iata)
-            raise HTTPException(status_code=500, detail="Failed to save transports")
+            logging.exception("Streaming agent failed for %s", iata)
+            try:
+                record_failed_lookup(iata, "agent_error")
+            except Exception:
+                logging.exception("Failed to record agent failure for %s", iata)
+            emit("error", {"detail": "Agent request failed"})
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
 
-        return {"transports": cleaned}
+    try:
+        llm_bulkhead.submit(produce)
+    except BulkheadFull as e:
+        raise _busy(e)
+
+    async def events():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            yield item
+
+    return events()
+
+
+async def _encode_events(events, format: str):
+    async for event, data in events:
+        if format == "ndjson":
+            yield dumps({"type": event, **data}) + b"\n"
+        else:
+            yield b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@router.get("/transports")
+async def api_get_transports_batch(
+    iata: str = Query(..., description="Comma-separated IATA codes, e.g. LHR,LGW,STN"),
+):
+    """Return stored transports for several airports in one request.
+
+    Every airport is resolved with a single MongoDB query and the result is a
+    map keyed by IATA. Unlike the per-airport endpoint this never runs the
+    agent: airports without stored transports are listed under `missing`
+    (or `unknown` when the IATA code is not a known airport). Stale or
+    expired airports are returned as stored and refreshed in the background.
+    """
+    try:
+        codes = []
+        for code in iata.split(","):
+            code = validate_iata(code.strip().upper())
+            if code not in codes:
+                codes.append(code)
+        if len(codes) > MAX_BATCH_AIRPORTS:
+            raise ValueError(f"At most {MAX_BATCH_AIRPORTS} airports per request")
+
+        by_iata = await _isolated(mongo_bulkhead, get_transports_for_airports, codes)
+        transports, freshness, missing, unknown = {}, {}, [], []
+        for code in codes:
+            docs = by_iata.get(code) or []
+            if not docs:
+                if await _lookup_airport(code):
+                    missing.append(code)
+                else:
+                    unknown.append(code)
+                continue
+            state = classify_transports(docs)
+            if state != FRESH:
+                schedule_refresh(code)
+            transports[code] = docs
+            freshness[code] = state
+        return FastJSONResponse(
+            {
+                "transports": transports,
+                "freshness": freshness,
+                "missing": missing,
+                "unknown": unknown,
+            }
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception:
-        logging.exception("Failed to get transports from DB")
+        logging.exception("Failed to get batch transports from DB")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/airports/{iata}/bundle")
+async def api_get_airport_bundle(
+    iata: str,
+    passengers: int = Query(1, description="Number of passengers"),
+):
+    """Return everything the results page needs for one airport in one response.
+
+    The airport is resolved once, then transports, the city's fare summary,
+    terminal transfers and the city-centre distance are gathered
+    concurrently, each with the same generate-on-miss behaviour as its own
+    endpoint. A part that fails is returned as null with its error under
+    `errors` so the rest of the page can still render.
+    """
+    try:
+        iata = validate_iata(iata).upper()
+        if passengers < 1 or passengers > 10:
+            raise HTTPException(
+                status_code=400, detail="Passengers must be between 1 and 10"
+            )
+        airport = await _lookup_airport(iata)
+        if not airport:
+            raise HTTPException(status_code=404, detail="Airport not found")
+
+        async def transports():
+            docs = await _isolated(mongo_bulkhead, get_transports_for_airport, iata)
+            if docs:
+                return await _apply_freshness(iata, docs, classify_transports(docs))
+            return await _generate_transports(iata), FRESH
+
+        async def fare_summary():
+            city = validate_city(airport.get("city") or "")
+            summary = await _isolated(mongo_bulkhead, get_fare_summary_for_city, city)
+            return summary or await _generate_fare_summary(city)
+
+        async def distance():
+            km = await _isolated(mongo_bulkhead, get_airport_distance, iata)
+            if km is None:
+                km = await _isolated(
+                    llm_bulkhead, _city_centre_distance_km, iata, airport
+                )
+            return int(round(float(km)))
+
+        parts = {
+            "transports": transports(),
+            "fare_summary": fare_summary(),
+            "terminal_transfers": _isolated(
+                mongo_bulkhead, get_terminal_transfers, iata
+            ),
+            "distance_km": distance(),
+        }
+        results = await asyncio.gather(*parts.values(), return_exceptions=True)
+        bundle = {
+            "airport": airport,
+            "passengers": passengers,
+            "coords": {"lat": airport.get("lat"), "lon": airport.get("lon")},
+            "errors": {},
+        }
+        for name, result in zip(parts, results):
+            if isinstance(result, HTTPException):
+                bundle["errors"][name] = result.detail
+                result = None
+            elif isinstance(result, ValueError):
+                bundle["errors"][name] = str(result)
+                result = None
+            elif isinstance(result, Cancelled):
+                bundle["errors"][name] = f"Cancelled: {result.reason}"
+                result = None
+            elif isinstance(result, BaseException):
+                logging.error(
+                    "Bundle part %s failed for %s", name, iata, exc_info=result
+                )
+                bundle["errors"][name] = "Internal server error"
+                result = None
+            bundle[name] = result
+        bundle["transports"], bundle["freshness"] = bundle["transports"] or (None, None)
+        return FastJSONResponse(bundle)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to build bundle for %s", iata)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/airports/{iata}/transports/update")
-def api_update_transports(iata: str):
+async def api_update_transports(request: Request, iata: str):
     """Force update transports for a specific airport by calling the LLM and saving results."""
+    async with _cancellation_scope(
+        request, "transports_update", UPDATE_DEADLINE_SECONDS
+    ) as token:
+        return await _isolated(llm_bulkhead, _update_transports, iata, token)
+
+
+def _update_transports(iata: str, token: Optional[CancellationToken] = None):
     try:
         iata = validate_iata(iata)
     except ValueError as e:
@@ -648,7 +1113,7 @@ def api_update_transports(iata: str):
 
     try:
         logging.info("Calling run_airport_lookup for %s...", iata)
-        cleaned = run_airport_lookup(iata)
+        cleaned = run_airport_lookup(iata, token=token)
         logging.info(
             "run_airport_lookup completed. Returned %d transport options", len(cleaned)
         )
@@ -664,9 +1129,15 @@ def api_update_transports(iata: str):
         logging.exception("Airport agent failed for update %s", iata)
         raise HTTPException(status_code=500, detail="Agent request failed")
 
+    if not cleaned:
+        # Keep whatever is stored rather than replacing it with nothing
+        record_failed_lookup(iata, "empty_result")
+        return {"message": "No transports generated; existing data kept", "count": 0}
+
     try:
         logging.info("Saving %d transports to MongoDB...", len(cleaned))
         replace_transports_for_airport(iata.upper(), cleaned)
+        clear_failed_lookup(iata)
         logging.info("Successfully saved transports for %s", iata)
         return {"message": "Transports updated", "count": len(cleaned)}
     except Exception:
@@ -674,6 +1145,26 @@ def api_update_transports(iata: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/airports/{iata}/transports/rollback")
+def api_rollback_transports(iata: str):
+    """Serve the previous generation of generated transports for an airport again."""
+    try:
+        iata = validate_iata(iata)
+        generation = rollback_transports_for_airport(iata)
+        if not generation:
+            raise HTTPException(
+                status_code=404, detail="No previous transports to roll back to"
+            )
+        return {"message": "Transports rolled back", "generation": generation}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to roll back transports for %s", iata)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.post("/airports/{iata}/transports/enrich-co2")
 def api_enrich_transports_co2(
     iata: str,
@@ -710,7 +1201,7 @@ def api_enrich_transports_co2(
 
 
 @router.get("/cities/{city}/fares")
-def api_get_city_fares(city: str):
+async def api_get_city_fares(request: Request, response: Response, city: str):
     """Return the fare summary for a specific city.
 
     If the fare summary is not present in the database, generate it on-demand,
@@ -718,35 +1209,52 @@ def api_get_city_fares(city: str):
     """
     try:
         city = validate_city(city)
-        summary = get_fare_summary_for_city(city)
+        headers, unchanged = await _cache_validators(request, fares_version_key(city))
+        if unchanged:
+            return unchanged
+        summary = await _isolated(mongo_bulkhead, get_fare_summary_for_city, city)
         if summary:
+            response.headers.update(headers)
             return {"city": city, "fare_summary": summary}
+        return {"city": city, "fare_summary": await _generate_fare_summary(city)}
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Failed to get fare summary for city %s", city)
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        # Not in DB: generate using LLM
-        try:
-            summary = generate_fare_summary_for_city(city)
-        except Exception:
-            logging.exception("Fare summary generation failed for %s", city)
-            raise HTTPException(
-                status_code=500, detail="Fare summary generation failed"
-            )
 
-        # Log and persist
-        try:
-            save_fare_summary_for_city(city, summary)
-        except Exception:
-            logging.exception("Failed to save fare summary for %s", city)
-            raise HTTPException(status_code=500, detail="Failed to save fare summary")
+async def _generate_fare_summary(city: str):
+    """Generate a city's fare summary with the LLM and store it."""
+    try:
+        summary = await _isolated(llm_bulkhead, generate_fare_summary_for_city, city)
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Fare summary generation failed for %s", city)
+        raise HTTPException(status_code=500, detail="Fare summary generation failed")
 
-        return {"city": city, "fare_summary": summary}
+    # Log and persist
+    try:
+        await _isolated(mongo_bulkhead, save_fare_summary_for_city, city, summary)
+    except HTTPException:
+        raise
     except Exception:
-        logging.exception("Failed to get fare summary for city %s", city)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        logging.exception("Failed to save fare summary for %s", city)
+        raise HTTPException(status_code=500, detail="Failed to save fare summary")
+    return summary
 
 
 @router.post("/cities/{city}/fares/update")
-def api_update_city_fares(city: str):
+async def api_update_city_fares(request: Request, city: str):
     """Force update the fare summary for a specific city by calling the LLM and saving results."""
+    async with _cancellation_scope(
+        request, "fares_update", UPDATE_DEADLINE_SECONDS
+    ) as token:
+        return await _isolated(llm_bulkhead, _update_city_fares, city, token)
+
+
+def _update_city_fares(city: str, token: Optional[CancellationToken] = None):
     try:
         city = validate_city(city)
     except ValueError as e:
@@ -756,7 +1264,7 @@ def api_update_city_fares(city: str):
 
     try:
         logging.info("Generating fare summary for %s...", city)
-        summary = generate_fare_summary_for_city(city)
+        summary = generate_fare_summary_for_city(city, token)
         logging.info("Fare summary generation completed for %s", city)
     except Exception:
         logging.exception("Fare summary generation failed for update %s", city)
@@ -787,7 +1295,7 @@ def tavily_status():
 
 
 @router.get("/tavily/test")
-def tavily_test(
+async def tavily_test(
     query: str = Query(
         "Heathrow Express LHR Paddington", description="Query to test Tavily"
     ),
@@ -796,22 +1304,29 @@ def tavily_test(
     """Simple health/check endpoint to test Tavily SDK calls directly."""
     try:
         logging.info("Tavily test endpoint called. Query: %s Limit: %d", query, limit)
-        resp = tavily_search(query, limit=limit)
+        resp = await _isolated(http_bulkhead, tavily_search, query, limit=limit)
         snippets = extract_snippets(resp)
         return {
             "ok": True,
             "resp_preview": (resp if isinstance(resp, dict) else str(resp)),
             "snippets_count": len(snippets),
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.exception("Tavily test failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/country-regions")
-def get_all_country_regions():
+async def get_all_country_regions(request: Request, response: Response):
     """Get all country to region mappings."""
-    return get_country_regions()
+    headers, unchanged = await _cache_validators(request, COUNTRY_REGIONS_COLLECTION)
+    if unchanged:
+        return unchanged
+    regions = await _isolated(mongo_bulkhead, get_country_regions)
+    response.headers.update(headers)
+    return regions
 
 
 @router.get("/country-regions/{country}")
@@ -831,16 +1346,22 @@ def update_country_regions(regions: dict = Body(...)):
 
 
 @router.get("/airports/{iata}/terminal-transfers")
-def api_get_terminal_transfers(iata: str):
+async def api_get_terminal_transfers(request: Request, response: Response, iata: str):
     """Return terminal transfer information for a specific airport.
 
     If terminal transfers are not present in the database, return 404.
     """
     try:
         iata = validate_iata(iata)
-        transfers = get_terminal_transfers(iata)
+        headers, unchanged = await _cache_validators(
+            request, TERMINAL_TRANSFERS_COLLECTION
+        )
+        if unchanged:
+            return unchanged
+        transfers = await _isolated(mongo_bulkhead, get_terminal_transfers, iata)
         if not transfers:
             raise HTTPException(status_code=404, detail="Terminal transfers not found for this airport")
+        response.headers.update(headers)
         return transfers
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -852,11 +1373,18 @@ def api_get_terminal_transfers(iata: str):
 
 
 @router.post("/airports/{iata}/terminal-transfers/update")
-def api_update_terminal_transfers(iata: str):
+async def api_update_terminal_transfers(request: Request, iata: str):
     """Generate and save terminal transfer information for a specific airport.
 
     This endpoint calls Ollama with a fixed prompt to generate JSON and saves the result to MongoDB.
     """
+    async with _cancellation_scope(
+        request, "terminal_transfers_update", UPDATE_DEADLINE_SECONDS
+    ) as token:
+        return await _isolated(llm_bulkhead, _update_terminal_transfers, iata, token)
+
+
+def _update_terminal_transfers(iata: str, token: Optional[CancellationToken] = None):
     try:
         iata = validate_iata(iata)
     except ValueError as e:
@@ -870,70 +1398,48 @@ def api_update_terminal_transfers(iata: str):
     if not airport:
         raise HTTPException(status_code=404, detail="Airport not found")
 
-    prompt = get_terminal_transfers_prompt()
-    messages = [{"role": "user", "content": prompt + f"\nIATA: {iata.upper()}"}]
-
     try:
         logging.info("Calling Ollama to generate terminal transfers for %s...", iata)
-        response_text = ask_ollama("gpt-oss:120b", messages)
+        sections = generate_terminal_transfers(iata, token)
         logging.info("Ollama response received for terminal transfers")
-    except Exception as e:
+    except json.JSONDecodeError:
+        logging.exception("Failed to parse JSON from LLM response")
+        raise HTTPException(
+            status_code=500, detail="Failed to parse JSON from LLM response"
+        )
+    except ValueError as e:
+        logging.exception("Validation error: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"Invalid data format: {str(e)}")
+    except Exception:
         logging.exception("Ollama query failed for terminal transfers")
         raise HTTPException(status_code=500, detail="LLM request failed")
 
-    # Parse JSON from response
     try:
-        data = json.loads(response_text)
-        if not isinstance(data, dict):
-            raise ValueError("Expected JSON object as top level")
-
-        # Extract sections for this airport
-        iata_upper = iata.upper()
-        if iata_upper not in data:
-            raise ValueError(f"No data returned for airport {iata_upper}")
-
-        airport_data = data[iata_upper]
-        if not isinstance(airport_data, dict):
-            raise ValueError("Airport data must be an object")
-
-        sections = airport_data.get("sections", [])
-        if not isinstance(sections, list):
-            raise ValueError("Sections must be an array")
-
-        # Validate sections structure
-        for section in sections:
-            if not isinstance(section, dict):
-                raise ValueError("Each section must be an object")
-            if "name" not in section or "tips" not in section:
-                raise ValueError("Each section must have 'name' and 'tips' fields")
-            if not isinstance(section["tips"], list):
-                raise ValueError("Tips must be an array of strings")
-
         logging.info("Saving %d sections for airport %s", len(sections), iata)
         save_terminal_transfers(iata.upper(), sections)
         logging.info("Successfully saved terminal transfers for %s", iata)
 
         return {"message": "Terminal transfers updated", "iata": iata.upper(), "count": len(sections)}
-
-    except json.JSONDecodeError:
-        logging.exception("Failed to parse JSON from LLM response")
-        raise HTTPException(
-            status_code=500, detail="Failed to parse JSON from LLM response"
-        )
-    except ValueError as e:
-        logging.exception("Validation error: %s", str(e))
-        raise HTTPException(status_code=500, detail=f"Invalid data format: {str(e)}")
     except Exception:
         logging.exception("Unexpected error updating terminal transfers for %s", iata)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/terminal-transfers")
-def api_get_all_terminal_transfers():
+async def api_get_all_terminal_transfers(request: Request):
     """Return all terminal transfer information from MongoDB, sorted by IATA code."""
     try:
-        transfers = get_all_terminal_transfers()
-        return {"transfers": transfers, "count": len(transfers)}
+        stamp = await _isolated(
+            mongo_bulkhead, get_version, TERMINAL_TRANSFERS_COLLECTION
+        )
+
+        async def load():
+            transfers = await _isolated(mongo_bulkhead, get_all_terminal_transfers)
+            return {"transfers": transfers, "count": len(transfers)}
+
+        return await _serve_cached(request, TERMINAL_TRANSFERS_COLLECTION, stamp, load)
+    except HTTPException:
+        raise
     except Exception:
         logging.exception("Failed to get all terminal transfers")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -96,18 +96,12 @@ async def logout(response: Response, refresh_token: Optional[str] = Cookie(None)
 async def refresh(response: Response, refresh_token: Optional[str] = Cookie(None)):
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Missing refresh token")
-    # find token doc
-    t_hash = services.hash_token(refresh_token)
-    doc = services.refresh_col.find_one({"token_hash": t_hash})
-    if not doc:
-        # token not found -> possible reuse. We can't determine user safely.
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
-    user_id = doc["user_id"]
-    new_token = services.verify_and_rotate_refresh_token(refresh_token, user_id)
-    if not new_token:
+    rotated = services.verify_and_rotate_refresh_token(refresh_token)
+    if not rotated:
         raise HTTPException(
             status_code=401, detail="Refresh token invalid or reuse detected"
         )
+    new_token, user_id = rotated
     # issue new access token
     user = services.users_col.find_one({"_id": user_id})
     if not user:
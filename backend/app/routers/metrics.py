@@ -0,0 +1,67 @@
+from fastapi import APIRouter
+
+from app.services.bulkheads import get_bulkhead_stats
+from app.services.cancellation import cancellation_stats
+from app.services.config_cache import config_cache
+from app.services.llm_batcher import get_batcher_stats
+from app.services.model_router import router_stats
+from app.services.prompt_budget import prompt_budget_stats
+from app.services.speculative import speculation_stats
+from app.utils.compression import compression_stats
+from app.utils.response_cache import response_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/bulkheads")
+def api_get_bulkhead_metrics():
+    """Return worker usage, queue depth and rejection counts per bulkhead."""
+    return get_bulkhead_stats()
+
+
+@router.get("/config-cache")
+def api_get_config_cache_metrics():
+    """Return hit/miss counts and per-key versions of the config cache."""
+    return config_cache.stats()
+
+
+@router.get("/response-cache")
+def api_get_response_cache_metrics():
+    """Return hit/miss counts and the cached body sizes per dataset."""
+    return response_cache.stats()
+
+
+@router.get("/compression")
+def api_get_compression_metrics():
+    """Return bytes in/out and bytes saved per content encoding."""
+    return compression_stats.stats()
+
+
+@router.get("/cancellations")
+def api_get_cancellation_metrics():
+    """Return completions, cancellations by reason and estimated time saved per operation."""
+    return cancellation_stats.stats()
+
+
+@router.get("/speculation")
+def api_get_speculation_metrics():
+    """Return races, wins per sample index and win latency per operation."""
+    return speculation_stats.stats()
+
+
+@router.get("/model-router")
+def api_get_model_router_metrics():
+    """Return tiers, escalation rate and per-model outcomes and latency per task."""
+    return router_stats.stats()
+
+
+@router.get("/llm-batcher")
+def api_get_llm_batcher_metrics():
+    """Return batches sent, keys per batch and single-request fallbacks per template."""
+    return get_batcher_stats()
+
+
+@router.get("/prompt-budget")
+def api_get_prompt_budget_metrics():
+    """Return prompt tokens, validity rate and latency per call site, variant and iteration."""
+    return prompt_budget_stats.stats()
@@ -3,16 +3,43 @@ import logging
 import os
 import re
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.services.ollama import ask_ollama
+from app.services.bulkheads import BulkheadFull, llm_sample_bulkhead
+from app.services.cancellation import Cancelled, CancellationToken
+from app.services.json_repair import repair_json
+from app.services.json_stream import ArrayItemStream
+from app.services.ollama import ask_ollama, stream_ollama
+from app.services.prompt_budget import (
+    COMPACT,
+    count_message_tokens,
+    prompt_budget_stats,
+    select_variant,
+)
+from app.services.speculative import first_valid
+from app.services.transport_prompt import MODE_GROUPS, in_mode_group
 from app.services.transport_prompt import get_prompt as get_transport_prompt
 from app.services.airports import get_all_airports
 
+# Wall-clock budget for one agent run, across all of its iterations
+AGENT_BUDGET_SECONDS = float(os.getenv("AGENT_BUDGET_SECONDS", "300"))
+# Concurrent samples per attempt (speculative sampling); 1 disables it
+AGENT_SAMPLES = max(1, int(os.getenv("AGENT_SAMPLES", "1")))
+# Generate each mode group with its own concurrent request and merge them
+AGENT_PER_MODE = os.getenv("AGENT_PER_MODE", "0").lower() in ("1", "true", "yes")
+# Attempts per mode group; retries stay local to the failing group
+AGENT_MODE_MAX_ITERS = max(1, int(os.getenv("AGENT_MODE_MAX_ITERS", "3")))
+# How much of a rejected reply is echoed back to the model on retry
+AGENT_FAILURE_EXCERPT_CHARS = int(os.getenv("AGENT_FAILURE_EXCERPT_CHARS", "500"))
+
+# Name of the agent in prompt budget stats and PROMPT_COMPACT_<SITE>
+CALL_SITE = "transports"
+
 
 def _is_final_array(obj: Any) -> bool:
     """Return True if the object is a final JSON array of transport entries."""
@@ -126,8 +153,85 @@ def _extract_first_json(text: str) -> Optional[Any]:
     return None
 
 
+def _parse_response(response_text: str) -> Optional[Any]:
+    """Parse an LLM reply tolerantly, unwrapping a top-level `tool_call`."""
+    # Try parse the LLM response as JSON. Be tolerant of extra text
+    parsed = None
+    try:
+        parsed = json.loads(response_text)
+    except Exception:
+        parsed = _extract_first_json(response_text)
+    if parsed is None:
+        # Truncated output: keep the complete part instead of re-asking
+        report = repair_json(response_text)
+        if report.ok:
+            logging.warning(
+                "Salvaged truncated LLM JSON (%s); dropped %d partial items, "
+                "%d chars: %r",
+                ", ".join(report.repairs),
+                report.dropped_items,
+                report.dropped_chars,
+                report.dropped_excerpt,
+            )
+            parsed = report.value
+
+    # Some LLMs wrap a tool call under a top-level `tool_call` key. Unwrap it.
+    try:
+        if (
+            isinstance(parsed, dict)
+            and parsed.get("tool_call")
+            and isinstance(parsed.get("tool_call"), dict)
+        ):
+            logging.info("Unwrapping top-level 'tool_call' wrapper from LLM response")
+            # preserve any top-level search_results for debugging by attaching to messages
+            wrapper = parsed
+            parsed = wrapper.get("tool_call")
+            # also log if wrapper contained search_results/other keys
+            other_keys = {k: v for k, v in wrapper.items() if k != "tool_call"}
+            if other_keys:
+                try:
+                    logging.debug(
+                        "Tool wrapper contained extra keys: %s",
+                        json.dumps(other_keys)[:2000],
+                    )
+                except Exception:
+                    logging.debug(
+                        "Tool wrapper contained extra keys (non-serializable)"
+                    )
+    except Exception:
+        pass
+    return parsed
+
+
+def _replace_feedback(
+    messages: List[Dict[str, str]],
+    base_len: int,
+    failure: Dict[str, Any],
+    instruction: str,
+) -> None:
+    """Keep the first `base_len` (prompt) messages and only the latest failure.
+
+    Appending every rejected reply made each retry resend the whole failure
+    history, so prompts grew with every attempt. The failure summary carries
+    the attempt number instead.
+    """
+    del messages[base_len:]
+    messages.append({"role": "assistant", "content": json.dumps(failure)})
+    messages.append({"role": "user", "content": instruction})
+
+
+def _accept_final_array(response_text: str) -> Optional[List[Dict[str, Any]]]:
+    parsed = _parse_response(response_text)
+    return parsed if _is_final_array(parsed) else None
+
+
 def run_airport_lookup(
-    iata: str, model: str = "gpt-oss:120b-cloud", max_iters: int = 20
+    iata: str,
+    model: str = "gpt-oss:120b-cloud",
+    max_iters: int = 20,
+    token: Optional[CancellationToken] = None,
+    samples: Optional[int] = None,
+    per_mode: Optional[bool] = None,
 ) -> List[Dict[str, Any]]:
     """Run the agent loop for an airport and return final transport list.
 
@@ -138,9 +242,130 @@ def run_airport_lookup(
        The agent validates and returns this array.
 
     External tools are disabled; the LLM must produce the final JSON array directly.
+
+    The run stops with `Cancelled` when `token` is cancelled or once
+    AGENT_BUDGET_SECONDS have passed, whichever comes first; `max_iters`
+    only caps the number of attempts.
+
+    With `samples` > 1 (default AGENT_SAMPLES) each attempt sends that many
+    requests concurrently and keeps the first valid array; see
+    `app.services.speculative`.
+
+    With `per_mode` (default AGENT_PER_MODE) the transports are requested
+    per mode group instead of in one long array; see `_run_per_mode`.
     """
-    prompt = get_transport_prompt()
+    if per_mode is None:
+        per_mode = AGENT_PER_MODE
+    if per_mode:
+        return _run_per_mode(iata, model, max_iters, token, samples)
+    for event, data in iter_airport_lookup(
+        iata, model, max_iters, token=token, samples=samples
+    ):
+        if event == "result":
+            return data
+    return []
 
+
+def _run_per_mode(
+    iata: str,
+    model: str,
+    max_iters: int,
+    token: Optional[CancellationToken],
+    samples: Optional[int],
+) -> List[Dict[str, Any]]:
+    """Request each of MODE_GROUPS concurrently, then merge the arrays.
+
+    Each group gets a shorter prompt and output, is validated on its own and
+    retries only itself (up to AGENT_MODE_MAX_ITERS). Sub-requests run on
+    `llm_sample_bulkhead`; groups that do not fit run on this thread
+    afterwards. Transports are deduplicated by `id`, first group wins. A
+    failed group is logged and left out unless every group failed.
+    """
+    budget = CancellationToken("airport_agent", AGENT_BUDGET_SECONDS, parent=token)
+    iters = min(max_iters, AGENT_MODE_MAX_ITERS)
+
+    def lookup(group: str) -> List[Dict[str, Any]]:
+        for event, data in iter_airport_lookup(
+            iata, model, iters, token=budget, samples=samples, mode_group=group
+        ):
+            if event == "result":
+                return data
+        return []
+
+    futures = {}
+    for group in MODE_GROUPS:
+        try:
+            futures[group] = llm_sample_bulkhead.submit(lookup, group)
+        except BulkheadFull:
+            pass
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    errors: Dict[str, Exception] = {}
+    for group in MODE_GROUPS:
+        try:
+            if group in futures:
+                results[group] = futures[group].result()
+            else:
+                results[group] = lookup(group)
+        except Cancelled:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            logging.exception("Mode group %s failed for %s", group, iata)
+            errors[group] = e
+    if not results:
+        raise next(iter(errors.values()))
+
+    merged: List[Dict[str, Any]] = []
+    seen = set()
+    for group, transports in results.items():
+        for transport in transports:
+            key = transport.get("id")
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(transport)
+    logging.info(
+        "Per-mode lookup for %s: %s -> %d transports (failed: %s)",
+        iata,
+        {group: len(transports) for group, transports in results.items()},
+        len(merged),
+        sorted(errors) or "none",
+    )
+    budget.complete()
+    return merged
+
+
+def iter_airport_lookup(
+    iata: str,
+    model: str = "gpt-oss:120b-cloud",
+    max_iters: int = 20,
+    stream: bool = False,
+    token: Optional[CancellationToken] = None,
+    samples: Optional[int] = None,
+    mode_group: Optional[str] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """Run the agent loop for an airport, yielding `(event, data)` progress events.
+
+    - `("status", {"attempt": n})` when attempt `n` is sent to the LLM;
+    - `("transport", {"attempt": n, "index": i, "transport": {...}})` for each
+      transport object completed in the model's output (only with `stream`);
+    - `("retry", {"attempt": n, "reason": ...})` when attempt `n` was rejected;
+      transports already emitted for that attempt should be discarded;
+    - `("result", [...])` last, with the validated array (empty on failure).
+
+    Speculative sampling (`samples` > 1) is not used with `stream`, since
+    transports from competing samples cannot be told apart by the client.
+
+    `mode_group` restricts the prompt to one of MODE_GROUPS; transports of
+    other modes in the answer are dropped.
+    """
+    if samples is None:
+        samples = AGENT_SAMPLES
+    speculative = samples > 1 and not stream
+    budget = CancellationToken("airport_agent", AGENT_BUDGET_SECONDS, parent=token)
     # Add a strict JSON-only system instruction that explains the response type.
     strict_system = (
         "You MUST output ONLY valid JSON. Every response must be a top-level JSON array containing transport objects.\n"
@@ -149,7 +374,8 @@ def run_airport_lookup(
 
     messages: List[Dict[str, str]] = [
         {"role": "system", "content": strict_system},
-        {"role": "system", "content": prompt},
+        # Replaced each iteration with the variant chosen by select_variant
+        {"role": "system", "content": get_transport_prompt(mode_group)},
         {"role": "user", "content": f"Airport: {iata.upper()}"},
     ]
 
@@ -169,8 +395,24 @@ def run_airport_lookup(
         }
     )
 
+    base_len = len(messages)
     for iteration in range(1, max_iters + 1):
-        logging.info("Agent iteration %d for %s", iteration, iata)
+        budget.raise_if_cancelled()
+        variant = select_variant(CALL_SITE, iteration)
+        messages[1] = {
+            "role": "system",
+            "content": get_transport_prompt(mode_group, compact=variant == COMPACT),
+        }
+        prompt_tokens = count_message_tokens(messages)
+        logging.info(
+            "Agent iteration %d for %s: %d messages, %d prompt tokens (%s prompt)",
+            iteration,
+            iata,
+            len(messages),
+            prompt_tokens,
+            variant,
+        )
+        yield "status", {"attempt": iteration}
         # Log the messages we're about to send to the LLM (truncated to avoid huge logs)
         try:
             logging.debug(
@@ -179,11 +421,46 @@ def run_airport_lookup(
             )
         except Exception:
             logging.debug("Messages preview unavailable (non-serializable content)")
+        parsed = None
+        started = time.monotonic()
         try:
-            response_text = ask_ollama(model, messages)
+            if speculative:
+                outcome = first_valid(
+                    lambda sample_token: ask_ollama(
+                        model, list(messages), sample_token
+                    ),
+                    _accept_final_array,
+                    samples,
+                    budget,
+                    "airport_agent",
+                )
+                response_text, parsed = outcome.text, outcome.value
+            elif stream:
+                items = ArrayItemStream()
+                chunks = []
+                emitted = 0
+                for chunk in stream_ollama(model, messages, budget):
+                    chunks.append(chunk)
+                    for item in items.feed(chunk):
+                        if isinstance(item, dict):
+                            yield "transport", {
+                                "attempt": iteration,
+                                "index": emitted,
+                                "transport": item,
+                            }
+                            emitted += 1
+                response_text = "".join(chunks)
+            else:
+                response_text = ask_ollama(model, messages, budget)
         except Exception:
             logging.exception("LLM call failed on iteration %d", iteration)
             raise
+        elapsed = time.monotonic() - started
+
+        def record(valid: bool):
+            prompt_budget_stats.record(
+                CALL_SITE, iteration, variant, prompt_tokens, elapsed, valid
+            )
 
         # Log raw response for debugging (first 1000 chars) - use INFO level so it's always visible
         logging.info(
@@ -193,40 +470,8 @@ def run_airport_lookup(
             response_text[:1000],
         )
 
-        # Try parse the LLM response as JSON. Be tolerant of extra text
-        parsed = None
-        try:
-            parsed = json.loads(response_text)
-        except Exception:
-            parsed = _extract_first_json(response_text)
-
-        # Some LLMs wrap a tool call under a top-level `tool_call` key. Unwrap it.
-        try:
-            if (
-                isinstance(parsed, dict)
-                and parsed.get("tool_call")
-                and isinstance(parsed.get("tool_call"), dict)
-            ):
-                logging.info(
-                    "Unwrapping top-level 'tool_call' wrapper from LLM response"
-                )
-                # preserve any top-level search_results for debugging by attaching to messages
-                wrapper = parsed
-                parsed = wrapper.get("tool_call")
-                # also log if wrapper contained search_results/other keys
-                other_keys = {k: v for k, v in wrapper.items() if k != "tool_call"}
-                if other_keys:
-                    try:
-                        logging.debug(
-                            "Tool wrapper contained extra keys: %s",
-                            json.dumps(other_keys)[:2000],
-                        )
-                    except Exception:
-                        logging.debug(
-                            "Tool wrapper contained extra keys (non-serializable)"
-                        )
-        except Exception:
-            pass
+        if parsed is None:
+            parsed = _parse_response(response_text)
 
         # Log parsed JSON (if any) for debugging
         try:
@@ -242,37 +487,30 @@ def run_airport_lookup(
                 iteration,
                 response_text,
             )
+            record(False)
             # Provide increasingly strict instructions if the LLM keeps failing
-            messages.append(
-                {
-                    "role": "assistant",
-                    "content": json.dumps(
-                        {"error": "invalid_json", "text_excerpt": response_text[:2000]}
-                    ),
-                }
-            )
-
             if iteration < 3:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": (
-                            "Please respond with a final JSON array. "
-                            "Return only JSON. Do not include prose."
-                        ),
-                    }
+                instruction = (
+                    "Please respond with a final JSON array. "
+                    "Return only JSON. Do not include prose."
                 )
             else:
                 # After a few failed tries, give a very strict minimal template
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": (
-                            "You must now ONLY respond with valid JSON. "
-                            'Return a top-level JSON array like: [{"iata": "LHR", "name": "Heathrow", ... }].'
-                        ),
-                    }
+                instruction = (
+                    "You must now ONLY respond with valid JSON. "
+                    'Return a top-level JSON array like: [{"iata": "LHR", "name": "Heathrow", ... }].'
                 )
+            _replace_feedback(
+                messages,
+                base_len,
+                {
+                    "error": "invalid_json",
+                    "attempt": iteration,
+                    "text_excerpt": response_text[:AGENT_FAILURE_EXCERPT_CHARS],
+                },
+                instruction,
+            )
+            yield "retry", {"attempt": iteration, "reason": "invalid_json"}
             continue
 
         logging.info(
@@ -292,7 +530,19 @@ def run_airport_lookup(
                     transport.get("mode"),
                     stops_count,
                 )
-            return parsed
+            if mode_group is not None:
+                kept = [t for t in parsed if in_mode_group(t.get("mode"), mode_group)]
+                if len(kept) < len(parsed):
+                    logging.info(
+                        "Dropped %d transports outside mode group %s",
+                        len(parsed) - len(kept),
+                        mode_group,
+                    )
+                parsed = kept
+            record(True)
+            budget.complete()
+            yield "result", parsed
+            return
 
         # Unknown JSON shape: ask LLM to clarify / produce final array
         logging.warning(
@@ -301,18 +551,18 @@ def run_airport_lookup(
             type(parsed),
         )
         logging.warning("Unknown shape details: %s", json.dumps(parsed, indent=2)[:500])
-        messages.append(
-            {
-                "role": "assistant",
-                "content": json.dumps({"error": "unknown_shape", "received": parsed}),
-            }
-        )
-        messages.append(
+        record(False)
+        _replace_feedback(
+            messages,
+            base_len,
             {
-                "role": "user",
-                "content": 'Please produce a final JSON array of transports.',
-            }
+                "error": "unknown_shape",
+                "attempt": iteration,
+                "received": json.dumps(parsed)[:AGENT_FAILURE_EXCERPT_CHARS],
+            },
+            "Please produce a final JSON array of transports.",
         )
+        yield "retry", {"attempt": iteration, "reason": "unknown_shape"}
 
     # Fallback: generate a default/empty transport array so the system doesn't crash
     # Log the failure for investigation
@@ -328,7 +578,7 @@ def run_airport_lookup(
         ),
     )
     # Return an empty array instead of raising, so the API doesn't crash
-    return []
+    yield "result", []
 
 
 def main(argv: Optional[List[str]] = None) -> None:
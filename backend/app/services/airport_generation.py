@@ -0,0 +1,231 @@
+"""LLM generation of the airports list, whole-world or chunked per country."""
+
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.airport_prompt import get_prompt
+from app.services.airports import (
+    airports_changed,
+    get_airport_countries,
+    log_prompt,
+    replace_airports_for_country,
+)
+from app.services.bulkheads import BulkheadFull, llm_bulkhead, mongo_bulkhead
+from app.services.cancellation import Cancelled, CancellationToken, check
+from app.services.model_router import AIRPORTS, ask_routed
+from app.services.mongodb import get_country_regions
+
+# How many country prompts may be in flight at once during a chunked update.
+# Defaults to half the LLM bulkhead so interactive requests keep some room.
+AIRPORTS_CHUNK_CONCURRENCY = int(
+    os.getenv("AIRPORTS_CHUNK_CONCURRENCY", str(max(1, llm_bulkhead.max_workers // 2)))
+)
+# Extra attempts per failed country chunk
+AIRPORTS_CHUNK_RETRIES = int(os.getenv("AIRPORTS_CHUNK_RETRIES", "2"))
+
+REQUIRED_KEYS = {
+    "iata",
+    "name",
+    "city",
+    "country",
+    "lat",
+    "lon",
+    "city_lat",
+    "city_lon",
+    "aliases",
+}
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_airports_response(response_text: str) -> List[Dict[str, Any]]:
+    """Parse and validate the LLM's airports JSON array.
+
+    Raises `json.JSONDecodeError` for non-JSON output and `ValueError` when the
+    shape is wrong.
+    """
+    data = json.loads(response_text)
+    if not isinstance(data, list):
+        raise ValueError("Expected JSON array from LLM")
+    cleaned = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        cleaned.append(
+            {
+                "iata": item.get("iata"),
+                "name": item.get("name"),
+                "city": item.get("city"),
+                "country": item.get("country"),
+                "lat": _to_float(item.get("lat")),
+                "lon": _to_float(item.get("lon")),
+                "city_lat": _to_float(item.get("city_lat")),
+                "city_lon": _to_float(item.get("city_lon")),
+                "aliases": item.get("aliases") or [],
+            }
+        )
+    # Strict validation: ensure each item has exactly the required keys
+    invalid_items = []
+    for idx, c in enumerate(cleaned):
+        keys = set(c.keys())
+        if keys != REQUIRED_KEYS:
+            invalid_items.append(
+                (
+                    idx,
+                    {
+                        "missing": list(REQUIRED_KEYS - keys),
+                        "extra": list(keys - REQUIRED_KEYS),
+                    },
+                )
+            )
+    if invalid_items:
+        logging.error(
+            "LLM response failed validation; not saving. Details: %s", invalid_items
+        )
+        raise ValueError(
+            f"LLM response failed validation for {len(invalid_items)} items"
+        )
+    return cleaned
+
+
+def generate_airports(
+    country: str, token: Optional[CancellationToken] = None
+) -> List[Dict[str, Any]]:
+    """Ask the LLM for the airports of one country (or ALL) and validate them."""
+    prompt = get_prompt()
+    messages = [{"role": "user", "content": prompt + f"\nCountry: {country}"}]
+
+    def validate(response_text: str) -> List[Dict[str, Any]]:
+        # log prompt and response for auditing
+        try:
+            log_prompt(prompt, country, response_text)
+        except Exception:
+            logging.exception("Failed to log prompt/response")
+        try:
+            return parse_airports_response(response_text)
+        except ValueError:
+            logging.error("LLM response text for %s: %s", country, response_text)
+            raise
+
+    airports, _ = ask_routed(AIRPORTS, messages, validate, token)
+    return airports
+
+
+def get_chunk_countries() -> List[str]:
+    """Countries to fan out over: the region mapping, else stored airports."""
+    countries = [c for c in get_country_regions().keys() if isinstance(c, str)]
+    if not countries:
+        countries = [c for c in get_airport_countries() if isinstance(c, str)]
+    return sorted({c.strip().upper() for c in countries if c.strip()})
+
+
+def _canonical_country(
+    key: str, docs: List[Dict[str, Any]], stored: Dict[str, str]
+) -> str:
+    """Map a chunk key (region-config spelling or code) to the stored country name.
+
+    `stored` maps upper-cased stored country names to their stored spelling.
+    A key that is not a stored name (e.g. "GB") takes the country the LLM
+    wrote on the chunk's airports, which the prompt asks to be the full
+    upper-case name, so the sync is scoped to the rows it replaces.
+    """
+    if key in stored:
+        return stored[key]
+    returned = Counter(
+        d["country"].strip().upper()
+        for d in docs
+        if isinstance(d.get("country"), str) and d["country"].strip()
+    )
+    if not returned:
+        return key
+    name = returned.most_common(1)[0][0]
+    return stored.get(name, name)
+
+
+async def _generate_chunk(
+    country: str,
+    limiter: asyncio.Semaphore,
+    token: Optional[CancellationToken] = None,
+) -> Tuple[str, Optional[List[Dict[str, Any]]], Optional[str]]:
+    error = None
+    for attempt in range(AIRPORTS_CHUNK_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(2**attempt)
+        async with limiter:
+            try:
+                check(token)
+                docs = await llm_bulkhead.run(generate_airports, country, token)
+                return country, docs, None
+            except Cancelled as e:
+                # Countries that already finished are still saved
+                return country, None, f"cancelled: {e.reason}"
+            except BulkheadFull as e:
+                error = str(e)
+            except Exception as e:
+                logging.warning(
+                    "Airport chunk %s failed (attempt %d): %s", country, attempt + 1, e
+                )
+                error = str(e) or type(e).__name__
+    return country, None, error
+
+
+async def update_airports_chunked(
+    countries: List[str], token: Optional[CancellationToken] = None
+) -> Dict[str, Any]:
+    """Generate and save airports one country at a time, concurrently.
+
+    Each country is a separate prompt run on the LLM bulkhead (at most
+    AIRPORTS_CHUNK_CONCURRENCY at once), validated on its own and retried
+    independently. Successful countries are saved on the Mongo bulkhead
+    once every run has finished, and the registry is reloaded once at the
+    end; countries whose chunk keeps failing keep their stored airports.
+    Chunk keys are mapped to the stored country names before saving (see
+    `_canonical_country`). Once `token` is cancelled, pending countries are reported as failed.
+    """
+    limiter = asyncio.Semaphore(AIRPORTS_CHUNK_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_generate_chunk(c, limiter, token) for c in countries)
+    )
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    failed = []
+    count = 0
+    stored = {
+        c.strip().upper(): c
+        for c in await mongo_bulkhead.run(get_airport_countries)
+        if isinstance(c, str) and c.strip()
+    }
+    try:
+        for country, docs, error in results:
+            if docs is None:
+                failed.append({"country": country, "error": error})
+                continue
+            counts = await mongo_bulkhead.run(
+                replace_airports_for_country,
+                _canonical_country(country, docs, stored),
+                docs,
+                publish=False,
+            )
+            for key in totals:
+                totals[key] += counts.get(key, 0)
+            count += len(docs)
+    finally:
+        # Publish once for the whole run, including countries saved before a failure
+        if totals["inserted"] or totals["updated"] or totals["deleted"]:
+            await mongo_bulkhead.run(airports_changed)
+    return {
+        "count": count,
+        "countries": len(countries),
+        "failed": failed,
+        **totals,
+    }
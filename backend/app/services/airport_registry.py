@@ -0,0 +1,108 @@
+"""Process-wide in-memory index of the airports collection.
+
+The airport set is small and rarely written, so it is loaded once and kept
+in dictionaries keyed by IATA, country and city. Local writes reload it
+straight away; writes made by other workers are picked up by a background
+thread that polls the `airports` data version.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class AirportRegistry:
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict[str, Any]]],
+        version_reader: Callable[[], Dict[str, Any]],
+    ):
+        self._loader = loader
+        self._version_reader = version_reader
+        self._lock = threading.Lock()
+        self._airports: List[Dict[str, Any]] = []
+        self._by_iata: Dict[str, Dict[str, Any]] = {}
+        self._by_country: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_city: Dict[str, List[Dict[str, Any]]] = {}
+        self.version: Optional[int] = None
+        self.stamp: Dict[str, Any] = {"version": 0, "updated_at": None}
+        self.loaded = False
+        self._refresher: Optional[threading.Thread] = None
+
+    def load(self):
+        """(Re)load every airport from MongoDB and rebuild the indexes."""
+        stamp = self._version_reader()
+        docs = self._loader()
+        by_iata: Dict[str, Dict[str, Any]] = {}
+        by_country: Dict[str, List[Dict[str, Any]]] = {}
+        by_city: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            iata = doc.get("iata")
+            if isinstance(iata, str) and iata:
+                by_iata.setdefault(iata.upper(), doc)
+            country = doc.get("country")
+            if isinstance(country, str) and country:
+                by_country.setdefault(country.upper(), []).append(doc)
+            city = doc.get("city")
+            if isinstance(city, str) and city:
+                by_city.setdefault(city.upper(), []).append(doc)
+        with self._lock:
+            self._airports = docs
+            self._by_iata = by_iata
+            self._by_country = by_country
+            self._by_city = by_city
+            self.version = stamp["version"]
+            self.stamp = stamp
+            self.loaded = True
+        logging.info(
+            "Airport registry loaded %d airports (v%s)", len(docs), stamp["version"]
+        )
+
+    def refresh_if_changed(self) -> bool:
+        """Reload if another worker bumped the airports version."""
+        version = self._version_reader()["version"]
+        if self.loaded and version == self.version:
+            return False
+        self.load()
+        return True
+
+    def start_background_refresh(self, interval_seconds: float):
+        """Poll the version stamp every `interval_seconds` on a daemon thread."""
+        if self._refresher is not None:
+            return
+
+        def _run():
+            stop = threading.Event()
+            while not stop.wait(interval_seconds):
+                try:
+                    self.refresh_if_changed()
+                except Exception:
+                    logging.exception("Airport registry refresh failed")
+
+        self._refresher = threading.Thread(
+            target=_run, name="airport-registry-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def snapshot(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Return the version stamp and the airports it describes, read together.
+
+        The list is the registry's own: `load()` swaps in a new one rather than
+        changing it, so it is shared without copying and must not be mutated.
+        Callers that edit airports should use `all()`, which returns copies.
+        """
+        with self._lock:
+            return self.stamp, self._airports
+
+    def get(self, iata: str) -> Optional[Dict[str, Any]]:
+        doc = self._by_iata.get(iata.upper())
+        return dict(doc) if doc else None
+
+    def by_country(self, country: str) -> List[Dict[str, Any]]:
+        return [dict(d) for d in self._by_country.get(country.upper(), [])]
+
+    def by_city(self, city: str) -> List[Dict[str, Any]]:
+        return [dict(d) for d in self._by_city.get(city.upper(), [])]
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(d) for d in self._airports]
@@ -6,31 +6,52 @@ from app.services.mongodb import (
     find_latest_climatiq_doc,
     get_transport_activity_mapping,
 )
-from datetime import datetime
+from app.services.data_versions import bump_version
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
 import logging
+import os
+import uuid
 
 TRANSPORTS_COLLECTION = "airport_transports"
 TRANSPORT_PROMPT_LOG_COLLECTION = "airport_transports_prompts"
+# Airports whose last agent run produced nothing (or failed), with backoff state
+TRANSPORT_MISSES_COLLECTION = "airport_transports_misses"
+# One pointer document per airport:
+# {_id: IATA, current, previous, current_at, previous_at}, where the `_at`
+# fields are the start times of the generations they point to
+TRANSPORT_GENERATIONS_COLLECTION = "airport_transport_generations"
+# Generation id given to documents written before generations existed
+LEGACY_GENERATION = "legacy"
+
+# First retry after an empty/failed lookup waits this long; each further
+# failure doubles the wait up to the maximum.
+NEGATIVE_CACHE_BASE_SECONDS = int(os.getenv("TRANSPORTS_NEGATIVE_TTL_SECONDS", "900"))
+NEGATIVE_CACHE_MAX_SECONDS = int(
+    os.getenv("TRANSPORTS_NEGATIVE_MAX_TTL_SECONDS", "86400")
+)
+# Upper bound on airports per batch read, to keep the $in query bounded
+MAX_BATCH_AIRPORTS = int(os.getenv("MAX_BATCH_AIRPORTS", "20"))
 
 
 def _format_price(price: Any) -> float:
     """Format price to either 0dp (whole number) or 2dp.
-    
+
     If price is a whole number or ends in .0, return as integer.
     Otherwise, round to 2 decimal places.
     """
     if price is None:
         return 0
-    
+
     try:
         num = float(price)
     except (TypeError, ValueError):
         return 0
-    
+
     # Check if it's a whole number
     if num == int(num):
         return float(int(num))
-    
+
     # Otherwise round to 2 decimal places
     return round(num, 2)
 
@@ -39,9 +60,9 @@ def _format_transport_prices(transport: Dict[str, Any]) -> Dict[str, Any]:
     """Recursively format all prices in a transport object to 0dp or 2dp."""
     if not isinstance(transport, dict):
         return transport
-    
+
     result = transport.copy()
-    
+
     # Format prices in stops
     if "stops" in result and isinstance(result["stops"], list):
         formatted_stops = []
@@ -54,7 +75,9 @@ def _format_transport_prices(transport: Dict[str, Any]) -> Dict[str, Any]:
                         if isinstance(price_obj, dict):
                             price_copy = price_obj.copy()
                             if "amount" in price_copy:
-                                price_copy["amount"] = _format_price(price_copy["amount"])
+                                price_copy["amount"] = _format_price(
+                                    price_copy["amount"]
+                                )
                             formatted_prices.append(price_copy)
                         else:
                             formatted_prices.append(price_obj)
@@ -63,38 +86,109 @@ def _format_transport_prices(transport: Dict[str, Any]) -> Dict[str, Any]:
             else:
                 formatted_stops.append(stop)
         result["stops"] = formatted_stops
-    
-    return result
 
+    return result
 
 
 def get_db():
     return client[DB_NAME]
 
 
+def transports_version_key(iata: str) -> str:
+    """Key of an airport's transports in the data_versions collection."""
+    return f"transports:{iata.upper()}"
+
+
+def get_transport_generation(iata: str) -> Optional[Dict[str, Any]]:
+    """Return the generation pointer for an airport, or None if never swapped."""
+    db = get_db()
+    return db[TRANSPORT_GENERATIONS_COLLECTION].find_one({"_id": iata.upper()})
+
+
+def _visible_transports_query(
+    iata: str, pointer: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build the filter for the transports readers should see.
+
+    Readers see the current generation plus sponsored transports (which are
+    added by hand and never belong to a generation). Airports that have not
+    been swapped yet still hold untagged legacy documents.
+    """
+    if not pointer or not pointer.get("current"):
+        return {"iata": iata, "generation": {"$exists": False}}
+    return {
+        "iata": iata,
+        "$or": [{"generation": pointer["current"]}, {"sponsored": True}],
+    }
+
+
 def get_transports_for_airport(iata: str) -> List[Dict[str, Any]]:
     db = get_db()
     col = db[TRANSPORTS_COLLECTION]
-    docs = list(col.find({"iata": iata.upper()}, {"_id": 0}))
+    iata_u = iata.upper()
+    query = _visible_transports_query(iata_u, get_transport_generation(iata_u))
+    docs = list(col.find(query, {"_id": 0, "generation": 0, "generation_at": 0}))
     # Format all prices in the results
     formatted = [_format_transport_prices(doc) for doc in docs]
     # Ensure all required fields are present
     return [_ensure_transport_fields(doc) for doc in formatted]
 
 
+def get_transports_for_airports(iatas: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Return the visible transports of several airports keyed by IATA.
+
+    Reads every generation pointer and then every candidate document with one
+    `$in` query each, keeping per airport what `get_transports_for_airport`
+    would return. Airports without stored transports map to an empty list.
+    """
+    db = get_db()
+    iatas_u = sorted({i.upper() for i in iatas})
+    pointers = {
+        p["_id"]: p
+        for p in db[TRANSPORT_GENERATIONS_COLLECTION].find({"_id": {"$in": iatas_u}})
+    }
+    current = [p["current"] for p in pointers.values() if p.get("current")]
+    query = {
+        "iata": {"$in": iatas_u},
+        "$or": [
+            {"generation": {"$in": current}},
+            {"sponsored": True},
+            {"generation": {"$exists": False}},
+        ],
+    }
+    result: Dict[str, List[Dict[str, Any]]] = {i: [] for i in iatas_u}
+    for doc in db[TRANSPORTS_COLLECTION].find(query, {"_id": 0, "generation_at": 0}):
+        iata = doc.get("iata")
+        if iata not in result:
+            continue
+        pointer = pointers.get(iata)
+        generation = doc.pop("generation", None)
+        if pointer and pointer.get("current"):
+            visible = generation == pointer["current"] or doc.get("sponsored")
+        else:
+            visible = generation is None
+        if visible:
+            result[iata].append(_ensure_transport_fields(_format_transport_prices(doc)))
+    return result
+
+
 def _ensure_transport_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Ensure a transport document has all required fields, adding defaults if missing."""
     # Simply pass through all fields as-is, including url
     result = {**doc}
-    
+
     # Ensure sponsored flag is present
     if "sponsored" not in result:
         result["sponsored"] = False
-    
+
     # Calculate price from stops only if not present
     if "price" not in result or result["price"] is None:
         price = None
-        if "stops" in result and isinstance(result["stops"], list) and len(result["stops"]) > 0:
+        if (
+            "stops" in result
+            and isinstance(result["stops"], list)
+            and len(result["stops"]) > 0
+        ):
             last_stop = result["stops"][-1]
             if "prices" in last_stop and isinstance(last_stop["prices"], list):
                 for price_obj in last_stop["prices"]:
@@ -102,22 +196,220 @@ def _ensure_transport_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
                         price = price_obj["amount"]
                         break
         result["price"] = price
-    
+
     return result
 
 
-def replace_transports_for_airport(iata: str, docs: List[Dict[str, Any]]):
+def replace_transports_for_airport(iata: str, docs: List[Dict[str, Any]]) -> str:
+    """Store `docs` as a new generation and make it the current one.
+
+    The new documents are written first under a fresh generation id, then the
+    airport's pointer is flipped with a single compare-and-swap, so readers
+    always see a complete set and a crash mid-write leaves the old set in
+    place. The replaced generation is kept as `previous` for rollback; older
+    ones are garbage-collected.
+
+    Each generation is stamped with the time its write started. When several
+    writers overlap, a writer that started before the current generation's
+    writer does not swap: its documents are dropped and the newer set stays.
+    Returns the generation being served afterwards.
+    """
     db = get_db()
     col = db[TRANSPORTS_COLLECTION]
-    # delete existing for this iata
-    col.delete_many({"iata": iata.upper()})
+    iata_u = iata.upper()
+    generation = uuid.uuid4().hex
+    now = datetime.utcnow()
+    new_docs = []
     for d in docs:
         d.pop("_id", None)
-        d["iata"] = iata.upper()
-        d.setdefault("created_at", datetime.utcnow())
-        d["updated_at"] = datetime.utcnow()
-    if docs:
-        col.insert_many(docs)
+        d["iata"] = iata_u
+        d.setdefault("created_at", now)
+        d["updated_at"] = now
+        # insert copies so pymongo does not add ObjectIds to the caller's dicts
+        new_docs.append({**d, "generation": generation, "generation_at": now})
+    if new_docs:
+        col.insert_many(new_docs)
+    current = _swap_generation(iata_u, generation, now)
+    if current != generation:
+        logging.info(
+            "Dropping transports for %s: a newer generation was stored meanwhile",
+            iata_u,
+        )
+        col.delete_many({"iata": iata_u, "generation": generation})
+        return current
+    bump_version(transports_version_key(iata_u))
+    gc_transport_generations(iata_u)
+    return generation
+
+
+def _swap_generation(iata: str, generation: str, started_at: datetime) -> str:
+    """Point `iata` at `generation` unless a newer one is already current.
+
+    Returns the generation current after the call.
+    """
+    db = get_db()
+    pointers = db[TRANSPORT_GENERATIONS_COLLECTION]
+    while True:
+        pointer = pointers.find_one({"_id": iata})
+        if pointer is None:
+            try:
+                pointers.insert_one(
+                    {
+                        "_id": iata,
+                        "current": generation,
+                        "previous": LEGACY_GENERATION,
+                        "current_at": started_at,
+                        "previous_at": None,
+                        "updated_at": datetime.utcnow(),
+                    }
+                )
+            except DuplicateKeyError:
+                continue
+            # Legacy documents become the rollback generation
+            db[TRANSPORTS_COLLECTION].update_many(
+                {
+                    "iata": iata,
+                    "generation": {"$exists": False},
+                    "sponsored": {"$ne": True},
+                },
+                {"$set": {"generation": LEGACY_GENERATION}},
+            )
+            return generation
+        current_at = pointer.get("current_at")
+        if current_at is not None and current_at > started_at:
+            return pointer["current"]
+        res = pointers.update_one(
+            {"_id": iata, "current": pointer.get("current")},
+            {
+                "$set": {
+                    "current": generation,
+                    "previous": pointer.get("current"),
+                    "current_at": started_at,
+                    "previous_at": current_at,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+        if res.modified_count:
+            return generation
+        # Lost a race with a concurrent swap: re-read and try again
+
+
+def gc_transport_generations(iata: str) -> int:
+    """Delete generated transports older than both current and previous.
+
+    Generations started after the oldest kept one may belong to a writer that
+    has not swapped yet, so they are left alone; such a writer drops its own
+    documents if it loses to a newer generation.
+    """
+    db = get_db()
+    pointer = get_transport_generation(iata)
+    if not pointer:
+        return 0
+    keep = [g for g in (pointer.get("current"), pointer.get("previous")) if g]
+    stamps = [t for t in (pointer.get("current_at"), pointer.get("previous_at")) if t]
+    query: Dict[str, Any] = {
+        "iata": iata.upper(),
+        "sponsored": {"$ne": True},
+        "generation": {"$nin": keep},
+    }
+    if stamps:
+        # Untagged (legacy) documents have no stamp and count as oldest
+        query["$or"] = [
+            {"generation_at": {"$lt": min(stamps)}},
+            {"generation_at": {"$exists": False}},
+        ]
+    res = db[TRANSPORTS_COLLECTION].delete_many(query)
+    return res.deleted_count
+
+
+def rollback_transports_for_airport(iata: str) -> Optional[str]:
+    """Make the previous generation current again (and vice versa).
+
+    Returns the generation now being served, or None if there is nothing to
+    roll back to.
+    """
+    db = get_db()
+    pointers = db[TRANSPORT_GENERATIONS_COLLECTION]
+    iata_u = iata.upper()
+    pointer = pointers.find_one({"_id": iata_u})
+    if not pointer or not pointer.get("previous"):
+        return None
+    res = pointers.update_one(
+        {"_id": iata_u, "current": pointer.get("current")},
+        {
+            "$set": {
+                "current": pointer["previous"],
+                "previous": pointer.get("current"),
+                "current_at": pointer.get("previous_at"),
+                "previous_at": pointer.get("current_at"),
+                "updated_at": datetime.utcnow(),
+            }
+        },
+    )
+    if not res.modified_count:
+        return None
+    bump_version(transports_version_key(iata_u))
+    return pointer["previous"]
+
+
+def get_failed_lookup(iata: str) -> Optional[Dict[str, Any]]:
+    """Return the negative-cache entry for an airport if it is still in backoff."""
+    db = get_db()
+    col = db[TRANSPORT_MISSES_COLLECTION]
+    return col.find_one(
+        {"iata": iata.upper(), "retry_at": {"$gt": datetime.utcnow()}}, {"_id": 0}
+    )
+
+
+def record_failed_lookup(iata: str, reason: str) -> Dict[str, Any]:
+    """Remember that the agent produced no transports for an airport.
+
+    The retry delay doubles with every consecutive failure. The entry itself
+    expires (TTL index on `expiresAt`) one maximum backoff after the last
+    retry time, which resets the failure count.
+    """
+    db = get_db()
+    col = db[TRANSPORT_MISSES_COLLECTION]
+    iata_u = iata.upper()
+    existing = col.find_one({"iata": iata_u}) or {}
+    failures = int(existing.get("failures") or 0) + 1
+    delay = min(
+        NEGATIVE_CACHE_BASE_SECONDS * 2 ** (failures - 1), NEGATIVE_CACHE_MAX_SECONDS
+    )
+    now = datetime.utcnow()
+    entry = {
+        "iata": iata_u,
+        "failures": failures,
+        "reason": reason,
+        "last_failed_at": now,
+        "retry_at": now + timedelta(seconds=delay),
+        "expiresAt": now + timedelta(seconds=delay + NEGATIVE_CACHE_MAX_SECONDS),
+    }
+    col.update_one({"iata": iata_u}, {"$set": entry}, upsert=True)
+    return entry
+
+
+def clear_failed_lookup(iata: str):
+    db = get_db()
+    col = db[TRANSPORT_MISSES_COLLECTION]
+    col.delete_one({"iata": iata.upper()})
+
+
+def create_indexes():
+    db = get_db()
+    db[TRANSPORTS_COLLECTION].create_index([("iata", 1), ("id", 1)])
+    db[TRANSPORTS_COLLECTION].create_index([("iata", 1), ("generation", 1)])
+    misses = db[TRANSPORT_MISSES_COLLECTION]
+    misses.create_index("iata", unique=True)
+    misses.create_index("expiresAt", expireAfterSeconds=0)
+
+
+try:
+    create_indexes()
+except Exception:
+    # ignore in environments where indexes exist or during tests
+    pass
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -205,7 +497,8 @@ def enrich_transports_co2_for_airport(
     col = db[TRANSPORTS_COLLECTION]
 
     iata_u = iata.upper()
-    docs = list(col.find({"iata": iata_u}))
+    query = _visible_transports_query(iata_u, get_transport_generation(iata_u))
+    docs = list(col.find(query))
 
     mapping = get_transport_activity_mapping()
     if not mapping:
@@ -315,12 +608,15 @@ def enrich_transports_co2_for_airport(
         }
 
         res = col.update_one(
-            {"iata": iata_u, "id": transport_id},
+            {"_id": d["_id"]},
             {"$set": {"co2": co2_obj, "updated_at": datetime.utcnow()}},
         )
         if res.modified_count:
             updated += 1
 
+    if updated:
+        bump_version(transports_version_key(iata_u))
+
     return {
         "iata": iata_u,
         "distance_km": distance_km,
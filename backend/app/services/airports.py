@@ -1,24 +1,75 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from app.services.mongodb import client, DB_NAME
+from app.services.airport_registry import AirportRegistry
+from app.services.data_versions import bump_version, get_version
 from datetime import datetime
+from pymongo import DeleteOne, UpdateOne
 import logging
+import os
 
 AIRPORTS_COLLECTION = "airports"
 AIRPORT_PROMPT_LOG_COLLECTION = "airports_prompts"
+# Key of the airports stamp in the data_versions collection
+AIRPORTS_VERSION_KEY = "airports"
+# How often each worker checks whether another worker changed the airports
+AIRPORT_REGISTRY_REFRESH_SECONDS = float(
+    os.getenv("AIRPORT_REGISTRY_REFRESH_SECONDS", "30")
+)
 
 
 def get_db():
     return client[DB_NAME]
 
 
+def create_indexes():
+    col = get_db()[AIRPORTS_COLLECTION]
+    # (iata, country) is the sync key and also serves lookups by IATA alone
+    col.create_index([("iata", 1), ("country", 1)])
+    col.create_index("country")
+
+
+try:
+    create_indexes()
+except Exception:
+    # ignore in environments where indexes exist or during tests
+    pass
+
+
+def _load_airports() -> List[Dict[str, Any]]:
+    db = get_db()
+    col = db[AIRPORTS_COLLECTION]
+    return list(col.find({}, {"_id": 0}))
+
+
+# Loaded at startup (see app.main); until then lookups fall back to MongoDB
+registry = AirportRegistry(_load_airports, lambda: get_version(AIRPORTS_VERSION_KEY))
+
+
+def airports_changed():
+    """Publish a write to other workers and reload this worker's registry."""
+    bump_version(AIRPORTS_VERSION_KEY)
+    if registry.loaded:
+        try:
+            registry.load()
+        except Exception:
+            logging.exception("Failed to reload airport registry after write")
+
+
 def get_all_airports() -> List[Dict[str, Any]]:
+    if registry.loaded:
+        return registry.all()
+    return _load_airports()
+
+
+def get_airport_countries() -> List[str]:
     db = get_db()
     col = db[AIRPORTS_COLLECTION]
-    docs = list(col.find({}, {"_id": 0}))
-    return docs
+    return list(col.distinct("country"))
 
 
 def get_airport_by_iata(iata: str) -> Optional[Dict[str, Any]]:
+    if registry.loaded:
+        return registry.get(iata)
     db = get_db()
     col = db[AIRPORTS_COLLECTION]
     doc = col.find_one({"iata": iata.upper()}, {"_id": 0})
@@ -37,39 +88,113 @@ def upsert_airport(doc: Dict[str, Any]):
     if not query:
         # fallback: insert as new
         col.insert_one(doc)
+        airports_changed()
         return
     # set timestamps
     doc.setdefault("created_at", datetime.utcnow())
     doc["updated_at"] = datetime.utcnow()
     col.update_one(query, {"$set": doc}, upsert=True)
+    airports_changed()
 
 
-def replace_airports_for_country(country: str, docs: List[Dict[str, Any]]):
+# Bookkeeping fields ignored when deciding whether an airport changed
+_NON_CONTENT_FIELDS = {"_id", "created_at", "updated_at"}
+
+
+def _airport_key(doc: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    """Identity of an airport: (iata, country), or the name when IATA is missing."""
+    iata = doc.get("iata")
+    return (iata, doc.get("country"), None if iata else doc.get("name"))
+
+
+def _airport_content(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k not in _NON_CONTENT_FIELDS}
+
+
+def _sync_airports(
+    scope: Dict[str, Any], docs: List[Dict[str, Any]], publish: bool = True
+) -> Dict[str, int]:
+    """Make the airports matching `scope` equal to `docs` with one bulk write.
+
+    New airports are upserted, changed ones updated in place, unchanged ones
+    left alone and airports in scope that are missing from `docs` deleted.
+    Duplicate stored rows for one airport (left by the old delete-and-insert
+    sync) are reduced to a single row.
+    With `publish=False` a write does not call `airports_changed()`; the
+    caller does so once after a batch of syncs. Returns the
+    inserted/updated/unchanged/deleted counts.
+    """
     db = get_db()
     col = db[AIRPORTS_COLLECTION]
-    # remove existing for country
-    col.delete_many({"country": country})
-    # insert new documents (remove any _id keys)
+    existing: Dict[Tuple[Any, Any, Any], Dict[str, Any]] = {}
+    ops: List[Any] = []
+    duplicates = 0
+    for d in col.find(scope):
+        key = _airport_key(d)
+        if key in existing:
+            ops.append(DeleteOne({"_id": d["_id"]}))
+            duplicates += 1
+        else:
+            existing[key] = d
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": duplicates}
+    seen = set()
+    now = datetime.utcnow()
     for d in docs:
         d.pop("_id", None)
-        d["country"] = country
-        d.setdefault("created_at", datetime.utcnow())
-        d["updated_at"] = datetime.utcnow()
-    if docs:
-        col.insert_many(docs)
+        key = _airport_key(d)
+        if key in seen:
+            # the LLM occasionally repeats an airport; first one wins
+            continue
+        seen.add(key)
+        content = _airport_content(d)
+        old = existing.get(key)
+        if old is None:
+            query = {"iata": key[0], "country": key[1]}
+            if key[2] is not None:
+                query["name"] = key[2]
+            ops.append(
+                UpdateOne(
+                    query,
+                    {
+                        "$set": {**content, "updated_at": now},
+                        "$setOnInsert": {"created_at": now},
+                    },
+                    upsert=True,
+                )
+            )
+            counts["inserted"] += 1
+        elif _airport_content(old) == content:
+            counts["unchanged"] += 1
+        else:
+            update: Dict[str, Any] = {"$set": {**content, "updated_at": now}}
+            removed = set(_airport_content(old)) - set(content)
+            if removed:
+                update["$unset"] = {k: "" for k in removed}
+            ops.append(UpdateOne({"_id": old["_id"]}, update))
+            counts["updated"] += 1
+    for key, old in existing.items():
+        if key not in seen:
+            ops.append(DeleteOne({"_id": old["_id"]}))
+            counts["deleted"] += 1
+    if ops:
+        col.bulk_write(ops, ordered=False)
+        if publish:
+            airports_changed()
+    return counts
 
 
-def replace_all_airports(docs: List[Dict[str, Any]]):
-    db = get_db()
-    col = db[AIRPORTS_COLLECTION]
-    # delete all existing
-    col.delete_many({})
+def replace_airports_for_country(
+    country: str, docs: List[Dict[str, Any]], publish: bool = True
+) -> Dict[str, int]:
+    """Sync the stored airports for one country; other countries are untouched."""
     for d in docs:
-        d.pop("_id", None)
-        d.setdefault("created_at", datetime.utcnow())
-        d["updated_at"] = datetime.utcnow()
-    if docs:
-        col.insert_many(docs)
+        d["country"] = country
+    return _sync_airports({"country": country}, docs, publish)
+
+
+def replace_all_airports(docs: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Sync the whole airports collection to `docs`."""
+    return _sync_airports({}, docs)
 
 
 def log_prompt(prompt: str, country: Optional[str], response_text: str):
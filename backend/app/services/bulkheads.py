@@ -0,0 +1,233 @@
+"""Dedicated thread pools per dependency class.
+
+FastAPI runs every sync route in one shared threadpool, so a handful of slow
+LLM calls can starve cheap Mongo reads. Work is instead submitted to a named
+`Bulkhead` (LLM, external HTTP, Mongo), each with its own worker count and a
+bounded queue. When a bulkhead is full, `BulkheadFull` is raised immediately
+so the caller can shed load rather than queue behind a slow dependency.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, TypeVar
+
+T = TypeVar("T")
+
+# How long a streaming worker waits for a consumer that stopped reading (or
+# never started) before it gives up and releases its slot
+STREAM_STALL_SECONDS = float(os.getenv("BULKHEAD_STREAM_STALL_SECONDS", "60"))
+
+
+class BulkheadFull(Exception):
+    """Raised when a bulkhead has no free worker or queue slot."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} bulkhead is saturated")
+        self.name = name
+
+
+_STREAM_END = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Bulkhead:
+    """A bounded thread pool that rejects work instead of queueing forever."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+        """Submit `fn` to the pool, raising `BulkheadFull` if no slot is free."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise BulkheadFull(self.name)
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._executor.submit(self._call, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `fn` in the pool and await its result from async code."""
+        future = self.submit(functools.partial(fn, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    def stream(
+        self,
+        fn: Callable[..., Iterable[T]],
+        *args: Any,
+        max_buffered: int = 64,
+        stall_timeout: float = STREAM_STALL_SECONDS,
+        **kwargs: Any,
+    ) -> AsyncIterator[T]:
+        """Run the iterator returned by `fn` in the pool and consume it from async code.
+
+        The worker is submitted straight away, so `BulkheadFull` is raised
+        here rather than on first iteration. It pauses once `max_buffered`
+        items are waiting for a slow consumer. Closing the returned async
+        iterator (e.g. when the client disconnects) stops the worker and
+        closes the sync iterator, releasing whatever upstream it reads from.
+        If the buffer stays full for `stall_timeout` seconds the worker gives
+        up the same way, and the consumer gets a `TimeoutError` after the
+        buffered items.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+        stop = threading.Event()
+        stalled = threading.Event()
+
+        def mark_stalled():
+            # Runs on the loop, so it cannot race the consumer's empty check
+            stalled.set()
+            if not queue.full():
+                queue.put_nowait(_StreamError(TimeoutError("stream consumer stalled")))
+
+        def put(item: Any) -> bool:
+            if stop.is_set() or loop.is_closed():
+                return False
+            try:
+                future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            except RuntimeError:  # event loop closed meanwhile
+                return False
+            deadline = time.monotonic() + stall_timeout
+            while True:
+                try:
+                    future.result(timeout=min(0.5, stall_timeout))
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+                    if time.monotonic() >= deadline:
+                        future.cancel()
+                        try:
+                            loop.call_soon_threadsafe(mark_stalled)
+                        except RuntimeError:
+                            pass
+                        return False
+
+        def pump():
+            iterator = None
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                for item in iterator:
+                    if stop.is_set() or not put(item):
+                        break
+                else:
+                    put(_STREAM_END)
+            except BaseException as e:
+                put(_StreamError(e))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        self.submit(pump)
+
+        async def consume() -> AsyncIterator[T]:
+            try:
+                while True:
+                    if stalled.is_set() and queue.empty():
+                        raise TimeoutError("stream consumer stalled")
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        return
+                    if isinstance(item, _StreamError):
+                        raise item.error
+                    yield item
+            finally:
+                stop.set()
+                # Unblock a worker waiting for queue space so it sees `stop`
+                while not queue.empty():
+                    queue.get_nowait()
+
+        return consume()
+
+    def _call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+llm_bulkhead = Bulkhead(
+    "llm", _env_int("LLM_POOL_SIZE", 8), _env_int("LLM_POOL_QUEUE", 16)
+)
+http_bulkhead = Bulkhead(
+    "http", _env_int("HTTP_POOL_SIZE", 8), _env_int("HTTP_POOL_QUEUE", 32)
+)
+mongo_bulkhead = Bulkhead(
+    "mongo", _env_int("MONGO_POOL_SIZE", 16), _env_int("MONGO_POOL_QUEUE", 64)
+)
+# Concurrency budget for LLM calls fanned out from an llm task (speculative
+# samples, per-mode sub-requests); no queue, so callers skip or run inline
+# whatever does not fit instead of waiting
+llm_sample_bulkhead = Bulkhead("llm_samples", _env_int("LLM_SAMPLE_POOL_SIZE", 8), 0)
+
+BULKHEADS: Dict[str, Bulkhead] = {
+    b.name: b
+    for b in (llm_bulkhead, http_bulkhead, mongo_bulkhead, llm_sample_bulkhead)
+}
+
+
+def get_bulkhead_stats() -> Dict[str, Any]:
+    """Return queue depth and counters for every bulkhead."""
+    return {name: b.stats() for name, b in BULKHEADS.items()}
@@ -0,0 +1,168 @@
+"""Request-scoped cancellation tokens with deadlines for LLM work.
+
+LLM calls run synchronously on bulkhead threads, so they cannot be
+interrupted from the event loop. Instead a `CancellationToken` is handed down
+to `ask_ollama`/`stream_ollama` and the agent loop, which check it between
+streamed chunks and iterations and raise `Cancelled` once the client has
+disconnected or the deadline has passed. Closing the Ollama stream at that
+point stops the upstream generation instead of paying for the rest of it.
+
+Each cancellation is counted per operation together with an estimate of the
+time saved: the operation's typical (moving average) completion time minus
+the time already spent when it was cancelled.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLIENT_DISCONNECTED = "client_disconnected"
+DEADLINE = "deadline"
+
+# Overall deadline for the POST .../update endpoints
+UPDATE_DEADLINE_SECONDS = float(os.getenv("UPDATE_DEADLINE_SECONDS", "600"))
+
+
+class Cancelled(BaseException):
+    """Raised inside LLM work once its token is cancelled or past its deadline.
+
+    Like `asyncio.CancelledError` this derives from BaseException, so the
+    blanket `except Exception` handlers around LLM calls do not turn a
+    cancellation into a generic failure (or a negative-cache entry).
+    """
+
+    def __init__(self, reason: str, operation: str):
+        super().__init__(f"{operation} cancelled: {reason}")
+        self.reason = reason
+        self.operation = operation
+
+
+class CancellationToken:
+    def __init__(
+        self,
+        operation: str,
+        timeout: Optional[float] = None,
+        parent: Optional["CancellationToken"] = None,
+    ):
+        self.operation = operation
+        self.parent = parent
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self._reason: Optional[str] = None
+        self._recorded = False
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = CLIENT_DISCONNECTED):
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+
+    def _own_reason(self) -> Optional[str]:
+        if self._reason is not None:
+            return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return DEADLINE
+        return None
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why this token (or one of its parents) is cancelled, else None."""
+        for token in self._chain():
+            reason = token._own_reason()
+            if reason is not None:
+                return reason
+        return None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the nearest deadline (None when unbounded)."""
+        deadlines = [t.deadline for t in self._chain() if t.deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def raise_if_cancelled(self):
+        # The token that fired records the cancellation under its operation
+        if self.parent is not None:
+            self.parent.raise_if_cancelled()
+        reason = self._own_reason()
+        if reason is None:
+            return
+        with self._lock:
+            first = not self._recorded
+            self._recorded = True
+        if first:
+            cancellation_stats.record_cancelled(
+                self.operation, reason, time.monotonic() - self.started
+            )
+        raise Cancelled(reason, self.operation)
+
+    def complete(self):
+        """Record that the operation finished, feeding its typical duration."""
+        cancellation_stats.record_completed(
+            self.operation, time.monotonic() - self.started
+        )
+
+    def _chain(self):
+        token: Optional[CancellationToken] = self
+        while token is not None:
+            yield token
+            token = token.parent
+
+
+def check(token: Optional[CancellationToken]):
+    """`token.raise_if_cancelled()` for optional tokens."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class CancellationStats:
+    # Weight of the newest completion in the moving average of durations
+    _ALPHA = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict[str, Any]] = {}
+
+    def _op(self, operation: str) -> Dict[str, Any]:
+        return self._ops.setdefault(
+            operation,
+            {
+                "completed": 0,
+                "cancelled": {},
+                "typical_seconds": None,
+                "time_saved_seconds": 0.0,
+            },
+        )
+
+    def record_completed(self, operation: str, elapsed: float):
+        with self._lock:
+            op = self._op(operation)
+            op["completed"] += 1
+            typical = op["typical_seconds"]
+            op["typical_seconds"] = (
+                elapsed
+                if typical is None
+                else typical + self._ALPHA * (elapsed - typical)
+            )
+
+    def record_cancelled(self, operation: str, reason: str, elapsed: float):
+        with self._lock:
+            op = self._op(operation)
+            op["cancelled"][reason] = op["cancelled"].get(reason, 0) + 1
+            if op["typical_seconds"] is not None:
+                op["time_saved_seconds"] += max(0.0, op["typical_seconds"] - elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {**op, "cancelled": dict(op["cancelled"])}
+                for name, op in self._ops.items()
+            }
+
+
+cancellation_stats = CancellationStats()
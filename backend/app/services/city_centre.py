@@ -0,0 +1,80 @@
+"""City-centre coordinates from the LLM, batched across concurrent lookups."""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.cancellation import CancellationToken
+from app.services.city_center_prompt import get_prompt
+from app.services.llm_batcher import MicroBatcher, register
+from app.services.model_router import CITY_CENTRE, ask_routed
+
+CityKey = Tuple[str, str]
+
+
+def parse_city_centre(obj: Any) -> Tuple[float, float]:
+    """Return `(lat, lon)` from a `{"lat": .., "lon": ..}` reply object."""
+    if not isinstance(obj, dict):
+        raise ValueError("Expected JSON object from LLM")
+    c_lat = obj.get("lat")
+    c_lon = obj.get("lon")
+    if c_lat is None or c_lon is None:
+        raise ValueError("City centre coordinates missing or null")
+    return float(c_lat), float(c_lon)
+
+
+def _single(key: CityKey, token: Optional[CancellationToken]) -> Tuple[float, float]:
+    city, country = key
+    messages = [
+        {
+            "role": "user",
+            "content": get_prompt() + f"\nCity: {city}\nCountry: {country}",
+        }
+    ]
+    coords, _ = ask_routed(
+        CITY_CENTRE, messages, lambda text: parse_city_centre(json.loads(text)), token
+    )
+    return coords
+
+
+def _batch(
+    keys: List[CityKey], token: Optional[CancellationToken]
+) -> Dict[CityKey, Any]:
+    lines = "\n".join(
+        f"{n}) City: {city}; Country: {country}"
+        for n, (city, country) in enumerate(keys, 1)
+    )
+    messages = [
+        {
+            "role": "user",
+            "content": get_prompt()
+            + "\nThis request covers several cities. Return ONE JSON object whose keys "
+            'are the request numbers below ("1", "2", ...) and whose values are the '
+            "lat/lon objects described above.\n" + lines,
+        }
+    ]
+    data, _ = ask_routed(CITY_CENTRE, messages, _json_object, token)
+    return {key: data[str(n)] for n, key in enumerate(keys, 1) if str(n) in data}
+
+
+def _json_object(text: str) -> Dict[str, Any]:
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Expected JSON object from LLM")
+    return data
+
+
+city_centre_batcher = register(
+    MicroBatcher(
+        "city_centre", _single, _batch, lambda key, part: parse_city_centre(part)
+    )
+)
+
+
+def get_city_centre(
+    city: str, country: Optional[str], token: Optional[CancellationToken] = None
+) -> Tuple[float, float]:
+    """Ask the LLM for the `(lat, lon)` of a city's centre.
+
+    Raises `ValueError` when no model returned usable coordinates.
+    """
+    return city_centre_batcher.call((city, country or ""), token)
@@ -1,6 +1,5 @@
-FARE_SUMMARY_PROMPT = (
-    "You are a knowledgeable assistant specializing in public transportation fare structures worldwide. "
-    "Return ONLY a valid JSON object with fare information for the specified city. "
+_FARE_SUMMARY_ROLE = "You are a knowledgeable assistant specializing in public transportation fare structures worldwide. "
+_FARE_SUMMARY_RULES = (
     "Focus ONLY on fare information and payment methods - do not include journey details, routes, or how to travel. "
     "The JSON structure must include: "
     "'city': the city name in uppercase, "
@@ -9,10 +8,31 @@ FARE_SUMMARY_PROMPT = (
     "Use simple language. Provide the MOST CURRENT fare information available as of December 2025. "
     "If you have knowledge of recent fare changes, price increases, or new payment methods implemented in 2024-2025, include them. "
     "Do not use outdated information - prioritize the latest available data. "
-    "Return only the JSON object, no additional text or explanation.\n\n"
+)
+
+FARE_SUMMARY_PROMPT = (
+    _FARE_SUMMARY_ROLE
+    + "Return ONLY a valid JSON object with fare information for the specified city. "
+    + _FARE_SUMMARY_RULES
+    + "Return only the JSON object, no additional text or explanation.\n\n"
     "City: {city}"
 )
 
+# Several cities in one request: one fare summary per numbered city
+MULTI_CITY_FARE_SUMMARY_PROMPT = (
+    _FARE_SUMMARY_ROLE
+    + "Return ONLY a valid JSON object whose keys are the request numbers of the cities listed below "
+    '("1", "2", ...) and whose values are the fare summary objects for those cities. '
+    "Each fare summary object describes one city only and follows these rules. "
+    + _FARE_SUMMARY_RULES
+    + "Return only the JSON object, no additional text or explanation.\n\n"
+    "Cities:\n{cities}"
+)
+
 
 def get_fare_summary_prompt():
     return FARE_SUMMARY_PROMPT
+
+
+def get_multi_city_fare_summary_prompt():
+    return MULTI_CITY_FARE_SUMMARY_PROMPT
@@ -1,12 +1,24 @@
 from app.services.mongodb import client, DB_NAME
-from app.services.ollama import ask_ollama
-from app.services.city_fare_prompt import get_fare_summary_prompt
+from app.services.llm_batcher import MicroBatcher, register
+from app.services.model_router import FARE_SUMMARY, ask_routed
+from app.services.city_fare_prompt import (
+    get_fare_summary_prompt,
+    get_multi_city_fare_summary_prompt,
+)
+from app.services.data_versions import bump_version
+from app.services.cancellation import CancellationToken
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 FARE_SUMMARY_COLLECTION = "city_fare_summaries"
 
 
+def fares_version_key(city: str) -> str:
+    """Key of a city's fare summary in the data_versions collection."""
+    return f"fares:{city.upper()}"
+
+
 def get_fare_summary_for_city(city: str) -> Optional[Dict[str, Any]]:
     """
     Retrieve the fare summary for a given city from MongoDB.
@@ -34,9 +46,12 @@ def save_fare_summary_for_city(city: str, summary: Dict[str, Any]) -> None:
     collection.replace_one(
         {"city": city.upper()}, {"city": city.upper(), "summary": summary}, upsert=True
     )
+    bump_version(fares_version_key(city))
 
 
-def generate_fare_summary_for_city(city: str) -> Dict[str, Any]:
+def generate_fare_summary_for_city(
+    city: str, token: Optional[CancellationToken] = None
+) -> Dict[str, Any]:
     """
     Generate a fare summary for a city using the LLM.
     Args:
@@ -44,27 +59,61 @@ def generate_fare_summary_for_city(city: str) -> Dict[str, Any]:
     Returns:
         The generated summary dictionary
     """
-    prompt = get_fare_summary_prompt().format(city=city)
-    messages = [{"role": "user", "content": prompt}]
     try:
-        response_text = ask_ollama("gpt-oss:120b", messages)
-        # Parse the JSON response
-        import json
-
-        summary_dict = json.loads(response_text.strip())
-        return summary_dict
-    except json.JSONDecodeError as e:
-        logging.exception(
-            "Failed to parse JSON from LLM response for city %s: %s",
-            city,
-            response_text[:500],
-        )
+        return fare_summary_batcher.call(city, token)
+    except ValueError as e:
+        logging.exception("Failed to parse fare summary from LLM for city %s", city)
         raise ValueError(f"Invalid JSON response from LLM: {str(e)}")
     except Exception as e:
         logging.exception("Failed to generate fare summary for city %s", city)
         raise
 
 
+def _validate_fare_summary(city: str, summary: Any) -> Dict[str, Any]:
+    """Check a fare summary object, requiring the `modes` object the UI renders."""
+    if not isinstance(summary, dict):
+        raise ValueError("Expected a JSON object")
+    if not isinstance(summary.get("modes"), dict):
+        raise ValueError("Missing 'modes' object")
+    return summary
+
+
+def _summarise_city(city: str, token: Optional[CancellationToken]) -> Dict[str, Any]:
+    prompt = get_fare_summary_prompt().format(city=city)
+    messages = [{"role": "user", "content": prompt}]
+    summary, _ = ask_routed(
+        FARE_SUMMARY,
+        messages,
+        lambda text: _validate_fare_summary(city, json.loads(text.strip())),
+        token,
+    )
+    return summary
+
+
+def _summarise_cities(
+    cities: List[str], token: Optional[CancellationToken]
+) -> Dict[str, Any]:
+    lines = "\n".join(f"{n}) {city}" for n, city in enumerate(cities, 1))
+    prompt = get_multi_city_fare_summary_prompt().format(cities=lines)
+    messages = [{"role": "user", "content": prompt}]
+
+    def validate(text: str) -> Dict[str, Any]:
+        data = json.loads(text.strip())
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        return data
+
+    data, _ = ask_routed(FARE_SUMMARY, messages, validate, token)
+    return {city: data[str(n)] for n, city in enumerate(cities, 1) if str(n) in data}
+
+
+fare_summary_batcher = register(
+    MicroBatcher(
+        "fare_summary", _summarise_city, _summarise_cities, _validate_fare_summary
+    )
+)
+
+
 def log_fare_summary_prompt(prompt: str, city: str, response: Dict[str, Any]):
     """
     Log the prompt and response for auditing purposes.
@@ -0,0 +1,87 @@
+"""In-process cache for small, rarely-written configuration documents.
+
+Values are loaded on first use and served from memory afterwards. Each key
+carries a version that increases on every invalidation. Write paths
+invalidate their key explicitly. Writes made by other workers are picked up
+through an optional MongoDB change stream, or at the latest once an entry
+is older than CONFIG_CACHE_TTL_SECONDS.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CONFIG_CACHE_TTL_SECONDS = float(os.getenv("CONFIG_CACHE_TTL_SECONDS", "300"))
+
+
+class ConfigCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._values and now - self._loaded_at[key] < self.ttl_seconds:
+                self._hits += 1
+                return self._values[key]
+            self._misses += 1
+            version = self._versions.get(key, 0)
+        value = loader()
+        with self._lock:
+            # Don't store a value loaded before a concurrent invalidation
+            if self._versions.get(key, 0) == version:
+                self._values[key] = value
+                self._loaded_at[key] = now
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+            self._loaded_at.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "cached": sorted(self._values),
+                "versions": dict(self._versions),
+            }
+
+
+config_cache = ConfigCache(CONFIG_CACHE_TTL_SECONDS)
+
+
+def watch_collections(
+    db: Any, keys_by_collection: Dict[str, str]
+) -> Optional[threading.Thread]:
+    """Invalidate cache keys whenever their collection changes in MongoDB.
+
+    Change streams need a replica set or Atlas; if the stream cannot be opened
+    the cache keeps relying on explicit invalidation plus the TTL.
+    """
+
+    def _run():
+        pipeline = [{"$match": {"ns.coll": {"$in": list(keys_by_collection)}}}]
+        try:
+            with db.watch(pipeline) as stream:
+                for change in stream:
+                    key = keys_by_collection.get(change.get("ns", {}).get("coll"))
+                    if key:
+                        config_cache.invalidate(key)
+        except Exception:
+            logging.exception("Config change stream stopped; relying on TTL")
+
+    thread = threading.Thread(target=_run, name="config-cache-watch", daemon=True)
+    thread.start()
+    return thread
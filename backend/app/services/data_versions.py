@@ -0,0 +1,43 @@
+"""Monotonic version stamps for datasets that are cached in-process.
+
+Every write path bumps the version of the dataset it touched, e.g.
+`airports`. Readers holding a cached copy compare their version against the
+stored one to decide whether to reload, which lets several workers share
+one source of truth without reloading the data itself.
+"""
+
+from datetime import datetime
+from typing import Any, Dict
+
+from pymongo import ReturnDocument
+
+from app.services.mongodb import client, DB_NAME
+from app.utils.response_cache import response_cache
+
+DATA_VERSIONS_COLLECTION = "data_versions"
+
+
+def bump_version(name: str) -> Dict[str, Any]:
+    """Increment the version of dataset `name` and return the new stamp."""
+    db = client[DB_NAME]
+    collection = db[DATA_VERSIONS_COLLECTION]
+    doc = collection.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # An upsert returning the updated document always yields one
+    assert doc is not None
+    response_cache.invalidate(name)
+    return {"version": doc.get("version", 0), "updated_at": doc.get("updated_at")}
+
+
+def get_version(name: str) -> Dict[str, Any]:
+    """Return `{version, updated_at}` for dataset `name` (version 0 if never written)."""
+    db = client[DB_NAME]
+    collection = db[DATA_VERSIONS_COLLECTION]
+    doc = collection.find_one({"_id": name})
+    if not doc:
+        return {"version": 0, "updated_at": None}
+    return {"version": doc.get("version", 0), "updated_at": doc.get("updated_at")}
@@ -0,0 +1,146 @@
+"""Salvage truncated or slightly malformed JSON from LLM replies.
+
+Long generations are often cut off mid-array (token limit, dropped stream).
+Rather than re-asking for the whole answer, `repair_json` keeps what is
+usable:
+
+- model control tokens (`<|...|>`), code fences and trailing commas are
+  stripped, as in the agent's `_sanitize_json`;
+- for a top-level array, every complete object element is kept and the element
+  that was being written when the text stopped is dropped;
+- for a top-level object, the text is cut back to the last complete value
+  and the open brackets are closed.
+
+The returned `RepairReport` says what was changed and what was dropped, so
+callers can log it and decide whether the salvaged value is good enough.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from app.services.json_stream import ArrayItemStream
+
+_CONTROL_TOKENS = re.compile(r"<\|[^\|]+\|>")
+_FENCE = re.compile(r"```(?:json)?", flags=re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+# How much of the dropped text to keep in the report
+_EXCERPT_CHARS = 200
+
+
+@dataclass
+class RepairReport:
+    value: Any = None
+    # Human-readable list of the fixes applied
+    repairs: List[str] = field(default_factory=list)
+    # Complete array elements kept / partial ones dropped
+    kept_items: int = 0
+    dropped_items: int = 0
+    # Characters of the reply that did not make it into `value`
+    dropped_chars: int = 0
+    dropped_excerpt: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.value is not None
+
+
+def _clean(text: str, report: RepairReport) -> str:
+    cleaned = _CONTROL_TOKENS.sub(" ", text)
+    if cleaned != text:
+        report.repairs.append("stripped control tokens")
+    unfenced = _FENCE.sub("", cleaned)
+    if unfenced != cleaned:
+        report.repairs.append("stripped code fences")
+    return unfenced
+
+
+def _salvage_array(body: str, report: RepairReport) -> Optional[List[Any]]:
+    stream = ArrayItemStream()
+    items = stream.feed(body)
+    if stream.done:
+        # Balanced after all; not a truncation
+        return None
+    report.kept_items = len(items)
+    # Anything after the last complete element was cut off mid-write
+    tail = body[stream.last_item_end or 1 :].strip(" \t\r\n,")
+    report.dropped_items = 1 if tail else 0
+    report.dropped_chars = len(tail)
+    report.dropped_excerpt = tail[:_EXCERPT_CHARS]
+    report.repairs.append(f"kept {len(items)} complete array elements")
+    return items
+
+
+def _close_truncated(body: str, report: RepairReport) -> Optional[str]:
+    """Cut `body` back to its last complete value and close open brackets."""
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    safe: Optional[tuple] = None
+    for i, ch in enumerate(body):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "[{":
+            stack.append(ch)
+            # Only the outermost opening is a cut point; cutting after an
+            # inner one would leave an empty placeholder element behind
+            if safe is None:
+                safe = (i + 1, list(stack))
+        elif ch in "]}":
+            if stack:
+                stack.pop()
+            if not stack:
+                return body[: i + 1]
+            safe = (i + 1, list(stack))
+        elif ch == ",":
+            safe = (i, list(stack))
+    if safe is None:
+        return None
+    cut, still_open = safe
+    dropped = body[cut:].strip(" \t\r\n,")
+    report.dropped_chars = len(dropped)
+    report.dropped_excerpt = dropped[:_EXCERPT_CHARS]
+    report.repairs.append(f"closed {len(still_open)} unbalanced brackets")
+    closers = "".join("]" if c == "[" else "}" for c in reversed(still_open))
+    return body[:cut].rstrip().rstrip(",") + closers
+
+
+def repair_json(text: str) -> RepairReport:
+    """Recover as much JSON as possible from `text`; `report.value` is None on failure."""
+    report = RepairReport()
+    if not isinstance(text, str):
+        return report
+    cleaned = _clean(text, report)
+    starts = [i for i in (cleaned.find("["), cleaned.find("{")) if i >= 0]
+    if not starts:
+        return report
+    body = cleaned[min(starts) :].strip()
+
+    if body.startswith("["):
+        items = _salvage_array(body, report)
+        if items is not None:
+            # Nothing complete means nothing worth keeping
+            report.value = items or None
+            return report
+
+    closed = _close_truncated(body, report)
+    if closed is None:
+        return report
+    fixed = _TRAILING_COMMA.sub(r"\1", closed)
+    if fixed != closed:
+        report.repairs.append("removed trailing commas")
+    try:
+        report.value = json.loads(fixed)
+    except ValueError:
+        report.repairs.append("unrecoverable")
+    return report
@@ -0,0 +1,68 @@
+"""Incremental parsing of JSON arrays streamed token by token from an LLM."""
+
+import json
+from typing import Any, List, Optional
+
+
+class ArrayItemStream:
+    """Pull complete elements out of a top-level JSON array as text arrives.
+
+    Text before the opening `[` (prose, code fences, control tokens) is
+    skipped. Each object element is decoded as soon as its closing brace is
+    seen, so callers can act on the first transport long before the model
+    has finished the whole array. Elements that do not decode are dropped;
+    the full response is still validated separately once it is complete.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item: Optional[List[str]] = None
+        self._consumed = 0
+        self.done = False
+        # Characters fed up to and including the last completed element
+        self.last_item_end = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume `chunk` and return the elements it completed."""
+        items = []
+        for ch in chunk:
+            if self.done:
+                break
+            self._consumed += 1
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._item is not None:
+                self._item.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 2 and ch == "{":
+                    self._item = [ch]
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+                elif self._depth == 1 and self._item is not None:
+                    text = "".join(self._item)
+                    self._item = None
+                    try:
+                        items.append(json.loads(text))
+                        self.last_item_end = self._consumed
+                    except ValueError:
+                        pass
+        return items
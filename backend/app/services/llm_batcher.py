@@ -0,0 +1,168 @@
+"""Micro-batching of small, same-template LLM requests.
+
+Terminal transfers, city-centre coordinates and fare summaries are small
+per-key tasks that often arrive together (bundle requests, bulk updates).
+A `MicroBatcher` collects calls for distinct keys over LLM_BATCH_WINDOW_MS
+(or until LLM_BATCH_MAX_KEYS are waiting), sends them as one multi-key
+prompt and splits the reply per key.
+
+The first caller of a window is its leader: it waits out the window on its
+own thread and then makes the request, so no extra threads are involved.
+A batch of one key simply makes the single request. When the batched call
+fails, or a key's part of the reply is missing or does not validate, the
+callers concerned fall back to their own single request, each on its own
+thread and with its own cancellation token.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from app.services.cancellation import Cancelled, CancellationToken
+
+# How long the first request waits for others to join its batch; 0 disables
+LLM_BATCH_WINDOW_MS = int(os.getenv("LLM_BATCH_WINDOW_MS", "50"))
+# A batch is sent as soon as this many distinct keys are waiting
+LLM_BATCH_MAX_KEYS = max(1, int(os.getenv("LLM_BATCH_MAX_KEYS", "8")))
+
+K = TypeVar("K", bound=Hashable)
+
+# Future result telling a caller to make its own single request
+_FALLBACK = object()
+
+
+class _Batch:
+    def __init__(self):
+        self.futures: Dict[Any, Future] = {}
+        self.full = threading.Event()
+
+
+class MicroBatcher(Generic[K]):
+    """Batch concurrent calls of one prompt template by key.
+
+    - `single(key, token)` makes the normal one-key request and returns
+      the validated value;
+    - `batch(keys, token)` makes one multi-key request and returns a dict
+      of key -> raw part of the reply (missing keys fall back);
+    - `validate(key, part)` checks one part and returns the value, raising
+      `ValueError` when it is unusable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        single: Callable[[K, Optional[CancellationToken]], Any],
+        batch: Callable[[List[K], Optional[CancellationToken]], Dict[K, Any]],
+        validate: Callable[[K, Any], Any],
+        window_ms: Optional[int] = None,
+        max_keys: Optional[int] = None,
+    ):
+        self.name = name
+        self._single = single
+        self._batch = batch
+        self._validate = validate
+        self.window = (LLM_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_keys = max_keys or LLM_BATCH_MAX_KEYS
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+        self._stats = {
+            "calls": 0,
+            "batches": 0,
+            "batched_keys": 0,
+            "single_requests": 0,
+            "fallbacks": 0,
+        }
+
+    def call(self, key: K, token: Optional[CancellationToken] = None) -> Any:
+        """Return the value for `key`, sharing an LLM request with concurrent callers."""
+        if self.window <= 0 or self.max_keys == 1:
+            self._count(calls=1, single_requests=1)
+            return self._single(key, token)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            batch = self._open
+            leader = batch is None
+            if batch is None:
+                batch = self._open = _Batch()
+            future = batch.futures.get(key)
+            if future is None:
+                future = batch.futures[key] = Future()
+            if len(batch.futures) >= self.max_keys:
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            try:
+                self._run(batch, token)
+            finally:
+                # Never leave followers waiting, whatever happened
+                self._resolve_all(batch, _FALLBACK)
+
+        result = future.result()
+        if result is _FALLBACK:
+            self._count(single_requests=1)
+            return self._single(key, token)
+        return result
+
+    def _run(self, batch: _Batch, token: Optional[CancellationToken]):
+        keys = list(batch.futures)
+        if len(keys) == 1:
+            batch.futures[keys[0]].set_result(_FALLBACK)
+            return
+        self._count(batches=1, batched_keys=len(keys))
+        try:
+            parts = self._batch(keys, token)
+        except Cancelled:
+            # Only the leader was cancelled; the others still want answers
+            self._resolve_all(batch, _FALLBACK)
+            raise
+        except Exception:
+            logging.exception("%s batch of %d keys failed", self.name, len(keys))
+            self._count(fallbacks=len(keys))
+            self._resolve_all(batch, _FALLBACK)
+            return
+        for key, future in batch.futures.items():
+            try:
+                future.set_result(self._validate(key, parts[key]))
+            except Exception as e:
+                logging.warning("%s batch: key %s unusable (%s)", self.name, key, e)
+                self._count(fallbacks=1)
+                future.set_result(_FALLBACK)
+
+    @staticmethod
+    def _resolve_all(batch: _Batch, value: Any):
+        for future in batch.futures.values():
+            if not future.done():
+                future.set_result(value)
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, n in increments.items():
+                self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "window_ms": int(self.window * 1000),
+                "max_keys": self.max_keys,
+            }
+
+
+BATCHERS: Dict[str, MicroBatcher] = {}
+
+
+def register(batcher: MicroBatcher) -> MicroBatcher:
+    BATCHERS[batcher.name] = batcher
+    return batcher
+
+
+def get_batcher_stats() -> Dict[str, Any]:
+    return {name: b.stats() for name, b in BATCHERS.items()}
@@ -0,0 +1,157 @@
+"""Tiered model routing with validation-gated escalation.
+
+Each LLM call site declares a task class. `ask_routed` tries the task's
+models in order (a small, fast model first for small structured tasks),
+runs the call site's validator on every reply and escalates to the next
+tier only when the reply fails validation or the call errors. The
+validator returns the parsed value or raises `ValueError`.
+
+Tiers come from LLM_SMALL_MODEL/LLM_LARGE_MODEL and can be overridden per
+task with `LLM_TIERS_<TASK>` (comma-separated models, tried in order).
+Attempts, validation failures, escalations and latency per task and model
+are exposed at `/metrics/model-router` for tuning the tiers.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.services.cancellation import CancellationToken
+from app.services.ollama import ask_ollama
+from app.services.prompt_budget import record_call
+from app.services.speculative import percentile
+
+LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "gpt-oss:20b")
+LLM_LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", "gpt-oss:120b")
+
+# Task classes
+CITY_CENTRE = "city_centre"
+TERMINAL_TRANSFERS = "terminal_transfers"
+FARE_SUMMARY = "fare_summary"
+AIRPORTS = "airports"
+
+# Small structured answers start on the small model; the airports list is
+# long enough that the small model rarely gets it right, so it stays large
+_DEFAULT_TIERS = {
+    CITY_CENTRE: (LLM_SMALL_MODEL, LLM_LARGE_MODEL),
+    TERMINAL_TRANSFERS: (LLM_SMALL_MODEL, LLM_LARGE_MODEL),
+    FARE_SUMMARY: (LLM_SMALL_MODEL, LLM_LARGE_MODEL),
+    AIRPORTS: (LLM_LARGE_MODEL,),
+}
+
+_LATENCY_WINDOW = 200
+
+
+def tiers_for(task: str) -> Tuple[str, ...]:
+    """Models to try for `task`, cheapest first."""
+    override = os.getenv(f"LLM_TIERS_{task.upper()}")
+    if override:
+        models = tuple(m.strip() for m in override.split(",") if m.strip())
+        if models:
+            return models
+    return _DEFAULT_TIERS.get(task, (LLM_LARGE_MODEL,))
+
+
+class RouterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def _model(self, task: str, model: str) -> Dict[str, int]:
+        t = self._tasks.setdefault(task, {"calls": 0, "escalated": 0, "models": {}})
+        self._latencies.setdefault((task, model), deque(maxlen=_LATENCY_WINDOW))
+        return t["models"].setdefault(
+            model, {"attempts": 0, "accepted": 0, "invalid": 0, "errors": 0}
+        )
+
+    def record_attempt(self, task: str, model: str, outcome: str, elapsed: float):
+        with self._lock:
+            m = self._model(task, model)
+            m["attempts"] += 1
+            m[outcome] += 1
+            self._latencies[(task, model)].append(elapsed)
+
+    def record_call(self, task: str, escalated: bool):
+        with self._lock:
+            t = self._tasks.setdefault(task, {"calls": 0, "escalated": 0, "models": {}})
+            t["calls"] += 1
+            t["escalated"] += int(escalated)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for task, t in self._tasks.items():
+                models = {}
+                for model, m in t["models"].items():
+                    latencies = list(self._latencies[(task, model)])
+                    models[model] = {
+                        **m,
+                        "latency_p50_seconds": percentile(latencies, 0.5),
+                        "latency_p95_seconds": percentile(latencies, 0.95),
+                    }
+                result[task] = {
+                    "tiers": list(tiers_for(task)),
+                    "calls": t["calls"],
+                    "escalated": t["escalated"],
+                    "escalation_rate": (
+                        t["escalated"] / t["calls"] if t["calls"] else None
+                    ),
+                    "models": models,
+                }
+            return result
+
+
+router_stats = RouterStats()
+
+
+def ask_routed(
+    task: str,
+    messages: List[Dict[str, str]],
+    validate: Callable[[str], Any],
+    token: Optional[CancellationToken] = None,
+    variant: Optional[str] = None,
+) -> Tuple[Any, str]:
+    """Ask the tiers of `task` in order and return `(value, model)` of the first valid reply.
+
+    Raises the last tier's error (`ValueError` for a reply that failed
+    validation) when no tier produced a valid reply. Each attempt's prompt
+    size and outcome is recorded under `task` and the prompt `variant`.
+    """
+    tiers = tiers_for(task)
+    for attempt, model in enumerate(tiers):
+        last = attempt == len(tiers) - 1
+        started = time.monotonic()
+        try:
+            text = ask_ollama(model, messages, token)
+        except Exception as e:
+            router_stats.record_attempt(
+                task, model, "errors", time.monotonic() - started
+            )
+            if last:
+                router_stats.record_call(task, attempt > 0)
+                raise
+            logging.warning("%s: %s failed (%s), escalating", task, model, e)
+            continue
+        try:
+            value = validate(text)
+        except ValueError as e:
+            elapsed = time.monotonic() - started
+            router_stats.record_attempt(task, model, "invalid", elapsed)
+            record_call(task, attempt + 1, variant, messages, elapsed, False)
+            if last:
+                router_stats.record_call(task, attempt > 0)
+                raise
+            logging.info(
+                "%s: %s reply failed validation (%s), escalating", task, model, e
+            )
+            continue
+        elapsed = time.monotonic() - started
+        router_stats.record_attempt(task, model, "accepted", elapsed)
+        record_call(task, attempt + 1, variant, messages, elapsed, True)
+        router_stats.record_call(task, attempt > 0)
+        return value, model
+    raise ValueError(f"No models configured for task {task}")
@@ -4,6 +4,7 @@ import os
 from unittest.mock import MagicMock
 from dotenv import load_dotenv
 from datetime import datetime
+from app.services.config_cache import config_cache, watch_collections
 
 load_dotenv()
 
@@ -142,23 +143,11 @@ def get_latest_climatiq_response(query_params: dict):
 def get_all_climatiq_responses():
     """
     Retrieve all documents from the climatiq_responses collection.
-    Returns a list of documents with `_id` converted to string for JSON serialization.
+    Documents keep their BSON `_id`; `FastJSONResponse` encodes it as a string.
     """
     db = client[DB_NAME]
     collection = db[CLIMATIQ_COLLECTION]
-    docs = list(collection.find({}))
-    results = []
-    for d in docs:
-        # convert BSON ObjectId to string for JSON friendliness
-        doc = dict(d)
-        _id = doc.get("_id")
-        if _id is not None:
-            try:
-                doc["_id"] = str(_id)
-            except Exception:
-                pass
-        results.append(doc)
-    return results
+    return list(collection.find({}))
 
 
 def find_latest_climatiq_doc(
@@ -199,12 +188,7 @@ def find_latest_climatiq_doc(
     return doc
 
 
-def get_country_regions():
-    """
-    Retrieve the country to region mapping from MongoDB.
-    Returns:
-        Dict of country to region
-    """
+def _load_country_regions() -> dict:
     db = client[DB_NAME]
     collection = db[COUNTRY_REGIONS_COLLECTION]
     doc = collection.find_one({"_id": "regions"})
@@ -214,6 +198,15 @@ def get_country_regions():
     return {}
 
 
+def get_country_regions():
+    """
+    Retrieve the country to region mapping (cached in memory).
+    Returns:
+        Dict of country to region
+    """
+    return dict(config_cache.get(COUNTRY_REGIONS_COLLECTION, _load_country_regions))
+
+
 def save_country_regions(regions: dict):
     """
     Save the country to region mapping to MongoDB.
@@ -225,6 +218,10 @@ def save_country_regions(regions: dict):
     collection.replace_one(
         {"_id": "regions"}, {"_id": "regions", **regions}, upsert=True
     )
+    config_cache.invalidate(COUNTRY_REGIONS_COLLECTION)
+    from app.services.data_versions import bump_version
+
+    bump_version(COUNTRY_REGIONS_COLLECTION)
 
 
 def get_country_region(country: str):
@@ -235,7 +232,7 @@ def get_country_region(country: str):
     Returns:
         Region string or None
     """
-    regions = get_country_regions()
+    regions = config_cache.get(COUNTRY_REGIONS_COLLECTION, _load_country_regions)
     return regions.get(country.upper())
 
 
@@ -264,12 +261,7 @@ def get_airport_distance(iata: str):
     return distances.get(iata.upper())
 
 
-def get_transport_activity_mapping() -> dict:
-    """Retrieve the transport mode -> Climatiq activity_id mapping.
-
-    Stored as a single document with `_id='default'` and a `mapping` sub-document.
-    Returns an empty dict if not configured.
-    """
+def _load_transport_activity_mapping() -> dict:
     db = client[DB_NAME]
     collection = db[TRANSPORT_ACTIVITY_MAPPING_COLLECTION]
     doc = collection.find_one({"_id": "default"})
@@ -279,6 +271,19 @@ def get_transport_activity_mapping() -> dict:
     return mapping if isinstance(mapping, dict) else {}
 
 
+def get_transport_activity_mapping() -> dict:
+    """Retrieve the transport mode -> Climatiq activity_id mapping (cached in memory).
+
+    Stored as a single document with `_id='default'` and a `mapping` sub-document.
+    Returns an empty dict if not configured.
+    """
+    return dict(
+        config_cache.get(
+            TRANSPORT_ACTIVITY_MAPPING_COLLECTION, _load_transport_activity_mapping
+        )
+    )
+
+
 def save_transport_activity_mapping(mapping: dict):
     """Save the transport mode -> Climatiq activity_id mapping."""
     db = client[DB_NAME]
@@ -288,6 +293,18 @@ def save_transport_activity_mapping(mapping: dict):
         {"_id": "default", "mapping": mapping},
         upsert=True,
     )
+    config_cache.invalidate(TRANSPORT_ACTIVITY_MAPPING_COLLECTION)
+
+
+def watch_config_changes():
+    """Invalidate cached config when another worker writes it (needs a replica set)."""
+    return watch_collections(
+        client[DB_NAME],
+        {
+            COUNTRY_REGIONS_COLLECTION: COUNTRY_REGIONS_COLLECTION,
+            TRANSPORT_ACTIVITY_MAPPING_COLLECTION: TRANSPORT_ACTIVITY_MAPPING_COLLECTION,
+        },
+    )
 
 
 def save_terminal_transfers(iata: str, sections: list):
@@ -304,6 +321,9 @@ def save_terminal_transfers(iata: str, sections: list):
         {"$set": {"iata": iata.upper(), "sections": sections}},
         upsert=True,
     )
+    from app.services.data_versions import bump_version
+
+    bump_version(TERMINAL_TRANSFERS_COLLECTION)
 
 
 def get_terminal_transfers(iata: str):
@@ -344,8 +364,12 @@ def add_sponsored_transport(iata: str, transport_data: dict):
     Returns:
         The inserted document ID
     """
-    from app.services.airport_transports import TRANSPORTS_COLLECTION
-    
+    from app.services.airport_transports import (
+        TRANSPORTS_COLLECTION,
+        transports_version_key,
+    )
+    from app.services.data_versions import bump_version
+
     db = client[DB_NAME]
     collection = db[TRANSPORTS_COLLECTION]
     
@@ -357,6 +381,7 @@ def add_sponsored_transport(iata: str, transport_data: dict):
     
     # Insert and return the result
     result = collection.insert_one(transport_data)
+    bump_version(transports_version_key(iata))
     return result.inserted_id
 
 
@@ -1,10 +1,17 @@
 import os
+from typing import Iterator, Optional
+
 from ollama import Client
 from dotenv import load_dotenv
 
+from app.services.cancellation import CancellationToken, check
+
 load_dotenv()
 
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
+# Tokens a streaming response may run ahead of a slow client before the
+# upstream read pauses
+LLM_STREAM_BUFFER = int(os.getenv("LLM_STREAM_BUFFER", "64"))
 TESTING = os.getenv("TESTING", "0").lower() in ("1", "true", "yes")
 
 if not TESTING and not OLLAMA_API_KEY:
@@ -32,13 +39,32 @@ messages = [
 ]
 
 
-def ask_ollama(model: str, messages: list):
-    """Send a chat request to Ollama and return the combined response."""
+def ask_ollama(model: str, messages: list, token: Optional[CancellationToken] = None):
+    """Send a chat request to Ollama and return the combined response.
+
+    If `token` is cancelled (client gone, deadline passed) the stream is
+    closed and `Cancelled` is raised instead of waiting for the full reply.
+    """
+    return "".join(stream_ollama(model, messages, token))
+
+
+def stream_ollama(
+    model: str, messages: list, token: Optional[CancellationToken] = None
+) -> Iterator[str]:
+    """Send a chat request to Ollama and yield the response text as it arrives."""
+    check(token)
     if TESTING:
         # Return a mock response for testing
-        return "Mock response for testing purposes"
+        yield "Mock response for testing purposes"
+        return
 
-    response = ""
-    for part in client.chat(model, messages=messages, stream=True):
-        response += part["message"]["content"]
-    return response
+    parts = client.chat(model, messages=messages, stream=True)
+    try:
+        for part in parts:
+            check(token)
+            yield part["message"]["content"]
+    finally:
+        # Closing the HTTP stream stops the upstream generation early
+        close = getattr(parts, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,173 @@
+"""Prompt token accounting and compact prompt variants.
+
+The transport and terminal-transfer prompts carry long worked examples that
+are resent on every call and every agent retry. This module counts prompt
+tokens per call site, per iteration and per prompt variant, together with
+the validity rate and latency of the replies, so prompt size can be traded
+against retry count with data (`/metrics/prompt-budget`).
+
+`select_variant` decides when a call site uses the compact variant of its
+prompt (examples dropped). PROMPT_COMPACT sets the policy for every site
+and `PROMPT_COMPACT_<SITE>` overrides it for one:
+
+- `never` (default): always the full prompt;
+- `retry`: full prompt first, compact on retries, once the model has seen
+  the examples fail to help;
+- `always`: compact prompt on every call.
+
+Tokens are estimated at ~4 characters per token unless PROMPT_TOKENIZER is
+`o200k_base` (the gpt-oss tokenizer family), in which case `load_tokenizer()`
+resolves tiktoken's encoding once at startup. tiktoken downloads the encoding
+file unless it is already in TIKTOKEN_CACHE_DIR; counting never does.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from app.services.speculative import percentile
+
+try:
+    import tiktoken
+
+    _HAS_TIKTOKEN = True
+except ImportError:  # pragma: no cover - tiktoken is optional
+    tiktoken = None  # type: ignore[assignment]
+    _HAS_TIKTOKEN = False
+
+FULL = "full"
+COMPACT = "compact"
+
+PROMPT_COMPACT = os.getenv("PROMPT_COMPACT", "never").lower()
+# "o200k_base" counts exact tokens with tiktoken; anything else estimates
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "estimate").lower()
+
+# Iterations tracked individually; later ones are folded into the last bucket
+_MAX_TRACKED_ITERATIONS = 10
+_LATENCY_WINDOW = 200
+
+_encoding: Any = None
+
+
+def load_tokenizer():
+    """Resolve the PROMPT_TOKENIZER encoding; called once at startup.
+
+    Until it has run, or if the encoding cannot be loaded, tokens are estimated.
+    """
+    global _encoding
+    if PROMPT_TOKENIZER != "o200k_base":
+        return
+    if not _HAS_TIKTOKEN:
+        logging.warning("PROMPT_TOKENIZER=o200k_base needs tiktoken; estimating")
+        return
+    try:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.warning("tiktoken encoding unavailable (%s); estimating", e)
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text`, exact once `load_tokenizer()` resolved one, else estimated."""
+    if not text:
+        return 0
+    encoding = _encoding
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    return sum(count_tokens(m.get("content") or "") for m in messages)
+
+
+def tokenizer_name() -> str:
+    return "o200k_base" if _encoding is not None else "estimate (chars/4)"
+
+
+def select_variant(call_site: str, iteration: int) -> str:
+    """Return FULL or COMPACT for attempt `iteration` (1-based) of `call_site`."""
+    policy = os.getenv(f"PROMPT_COMPACT_{call_site.upper()}", PROMPT_COMPACT).lower()
+    if policy == "always":
+        return COMPACT
+    if policy == "retry" and iteration > 1:
+        return COMPACT
+    return FULL
+
+
+class PromptBudgetStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def record(
+        self,
+        call_site: str,
+        iteration: int,
+        variant: str,
+        prompt_tokens: int,
+        elapsed: float,
+        valid: bool,
+    ):
+        bucket = min(iteration, _MAX_TRACKED_ITERATIONS)
+        with self._lock:
+            site = self._sites.setdefault(call_site, {"variants": {}, "iterations": {}})
+            v = site["variants"].setdefault(
+                variant, {"calls": 0, "valid": 0, "prompt_tokens": 0}
+            )
+            v["calls"] += 1
+            v["valid"] += int(valid)
+            v["prompt_tokens"] += prompt_tokens
+            it = site["iterations"].setdefault(bucket, {"calls": 0, "prompt_tokens": 0})
+            it["calls"] += 1
+            it["prompt_tokens"] += prompt_tokens
+            self._latencies.setdefault(
+                (call_site, variant), deque(maxlen=_LATENCY_WINDOW)
+            ).append(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = {}
+            for name, site in self._sites.items():
+                variants = {}
+                for variant, v in site["variants"].items():
+                    latencies = list(self._latencies[(name, variant)])
+                    variants[variant] = {
+                        "calls": v["calls"],
+                        "validity_rate": v["valid"] / v["calls"],
+                        "avg_prompt_tokens": v["prompt_tokens"] / v["calls"],
+                        "latency_p50_seconds": percentile(latencies, 0.5),
+                        "latency_p95_seconds": percentile(latencies, 0.95),
+                    }
+                result[name] = {
+                    "variants": variants,
+                    "avg_prompt_tokens_by_iteration": {
+                        str(n): it["prompt_tokens"] / it["calls"]
+                        for n, it in sorted(site["iterations"].items())
+                    },
+                }
+            return {"tokenizer": tokenizer_name(), "call_sites": result}
+
+
+prompt_budget_stats = PromptBudgetStats()
+
+
+def record_call(
+    call_site: str,
+    iteration: int,
+    variant: Optional[str],
+    messages: Iterable[Dict[str, str]],
+    elapsed: float,
+    valid: bool,
+):
+    """Count the prompt tokens of `messages` and record the call's outcome."""
+    try:
+        tokens = count_message_tokens(messages)
+    except Exception:
+        logging.exception("Failed to count prompt tokens for %s", call_site)
+        return
+    prompt_budget_stats.record(
+        call_site, iteration, variant or FULL, tokens, elapsed, valid
+    )
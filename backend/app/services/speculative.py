@@ -0,0 +1,168 @@
+"""Speculative sampling: race K copies of one LLM call, keep the first valid one.
+
+A retry after an invalid answer costs a full extra round trip. When tail
+latency matters more than tokens, `first_valid` instead sends `samples`
+independent requests at once on `llm_sample_bulkhead` and returns as soon as
+one passes `accept`. The remaining samples are cancelled through their
+tokens, which closes their Ollama streams at the next chunk.
+
+Samples that do not fit in the bulkhead's budget are skipped; the first one
+runs on the calling thread when no worker is free, so a call never fails
+just because the budget is exhausted. Wins are recorded per operation with
+the winning sample's index and latency for `/metrics/speculation`.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.services.bulkheads import BulkheadFull, llm_sample_bulkhead
+from app.services.cancellation import Cancelled, CancellationToken, check
+
+# Reason given to samples that lost the race
+SUPERSEDED = "superseded"
+
+# Latencies kept per operation for the percentile figures
+_LATENCY_WINDOW = 200
+
+
+@dataclass
+class SampleOutcome:
+    # Index of the winning sample, None when no sample was accepted
+    index: Optional[int]
+    # Text of the winner, or of the first completed sample on a miss
+    text: str
+    # What `accept` returned for the winner
+    value: Any = None
+    # Samples actually sent (may be fewer than requested)
+    sent: int = 0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SpeculationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def _op(self, operation: str) -> Dict[str, Any]:
+        self._latencies.setdefault(operation, deque(maxlen=_LATENCY_WINDOW))
+        return self._ops.setdefault(
+            operation,
+            {"races": 0, "samples_sent": 0, "no_valid": 0, "wins_by_sample": {}},
+        )
+
+    def record(self, operation: str, index: Optional[int], sent: int, elapsed: float):
+        with self._lock:
+            op = self._op(operation)
+            op["races"] += 1
+            op["samples_sent"] += sent
+            if index is None:
+                op["no_valid"] += 1
+                return
+            wins = op["wins_by_sample"]
+            wins[index] = wins.get(index, 0) + 1
+            self._latencies[operation].append(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                latencies = list(self._latencies[name])
+                result[name] = {
+                    **op,
+                    "wins_by_sample": dict(op["wins_by_sample"]),
+                    "win_latency_p50_seconds": percentile(latencies, 0.5),
+                    "win_latency_p95_seconds": percentile(latencies, 0.95),
+                }
+            return result
+
+
+speculation_stats = SpeculationStats()
+
+
+def first_valid(
+    generate: Callable[[CancellationToken], str],
+    accept: Callable[[str], Any],
+    samples: int,
+    token: Optional[CancellationToken] = None,
+    operation: str = "llm",
+) -> SampleOutcome:
+    """Run up to `samples` calls of `generate` concurrently, keep the first accepted.
+
+    `generate(sample_token)` performs one LLM call and should pass the token
+    on to `ask_ollama`. `accept(text)` returns a value for a valid answer and
+    None otherwise. When no sample is accepted the first completed text is
+    returned with `index=None` so the caller can retry as usual; if every
+    sample raised, the last error is re-raised.
+    """
+    check(token)
+    started = time.monotonic()
+    tokens = [
+        CancellationToken(f"{operation}_sample", parent=token)
+        for _ in range(max(1, samples))
+    ]
+    futures: Dict[Future, int] = {}
+    for index, sample_token in enumerate(tokens):
+        try:
+            futures[llm_sample_bulkhead.submit(generate, sample_token)] = index
+        except BulkheadFull:
+            break
+    if not futures:
+        # No budget left at all: behave like a plain call on this thread
+        future: Future = Future()
+        try:
+            future.set_result(generate(tokens[0]))
+        except Exception as e:
+            future.set_exception(e)
+        futures[future] = 0
+
+    fallback: Optional[str] = None
+    error: Optional[BaseException] = None
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                text = future.result()
+            except Cancelled:
+                check(token)
+                continue
+            except Exception as e:
+                logging.warning("%s sample %d failed: %s", operation, index, e)
+                error = e
+                continue
+            value = accept(text)
+            if value is not None:
+                elapsed = time.monotonic() - started
+                logging.info(
+                    "%s: sample %d of %d won after %.2fs",
+                    operation,
+                    index,
+                    len(futures),
+                    elapsed,
+                )
+                speculation_stats.record(operation, index, len(futures), elapsed)
+                return SampleOutcome(index, text, value, len(futures))
+            if fallback is None:
+                fallback = text
+    finally:
+        for sample_token in tokens:
+            sample_token.cancel(SUPERSEDED)
+        for future in futures:
+            future.cancel()
+
+    check(token)
+    speculation_stats.record(operation, None, len(futures), time.monotonic() - started)
+    if fallback is None and error is not None:
+        raise error
+    return SampleOutcome(None, fallback or "", None, len(futures))
@@ -0,0 +1,93 @@
+"""Terminal-transfer tips from the LLM, batched across airports.
+
+The prompt already answers with an object keyed by IATA code, so concurrent
+requests for different airports are sent as one prompt listing all codes.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from app.services.cancellation import CancellationToken
+from app.services.llm_batcher import MicroBatcher, register
+from app.services.model_router import TERMINAL_TRANSFERS, ask_routed
+from app.services.prompt_budget import COMPACT, select_variant
+from app.services.terminal_transfers_prompt import get_prompt
+
+
+def terminal_sections(iata_upper: str, data: Any) -> list:
+    """Validate a terminal-transfers reply object and return the sections for `iata_upper`."""
+    if not isinstance(data, dict):
+        raise ValueError("Expected JSON object as top level")
+
+    # Extract sections for this airport
+    if iata_upper not in data:
+        raise ValueError(f"No data returned for airport {iata_upper}")
+
+    airport_data = data[iata_upper]
+    if not isinstance(airport_data, dict):
+        raise ValueError("Airport data must be an object")
+
+    sections = airport_data.get("sections", [])
+    if not isinstance(sections, list):
+        raise ValueError("Sections must be an array")
+
+    # Validate sections structure
+    for section in sections:
+        if not isinstance(section, dict):
+            raise ValueError("Each section must be an object")
+        if "name" not in section or "tips" not in section:
+            raise ValueError("Each section must have 'name' and 'tips' fields")
+        if not isinstance(section["tips"], list):
+            raise ValueError("Tips must be an array of strings")
+    return sections
+
+
+def _single(iata: str, token: Optional[CancellationToken]) -> list:
+    variant = select_variant(TERMINAL_TRANSFERS, 1)
+    prompt = get_prompt(compact=variant == COMPACT)
+    messages = [{"role": "user", "content": prompt + f"\nIATA: {iata}"}]
+    sections, _ = ask_routed(
+        TERMINAL_TRANSFERS,
+        messages,
+        lambda text: terminal_sections(iata, json.loads(text)),
+        token,
+        variant,
+    )
+    return sections
+
+
+def _batch(iatas: List[str], token: Optional[CancellationToken]) -> Dict[str, Any]:
+    variant = select_variant(TERMINAL_TRANSFERS, 1)
+    messages = [
+        {
+            "role": "user",
+            "content": get_prompt(compact=variant == COMPACT)
+            + f"\nIATA: {', '.join(iatas)}\n"
+            + "Return one entry per requested IATA code in the same object.",
+        }
+    ]
+    data, _ = ask_routed(TERMINAL_TRANSFERS, messages, _json_object, token, variant)
+    return {iata: data for iata in iatas if iata in data}
+
+
+def _json_object(text: str) -> Dict[str, Any]:
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Expected JSON object as top level")
+    return data
+
+
+terminal_transfers_batcher = register(
+    MicroBatcher("terminal_transfers", _single, _batch, terminal_sections)
+)
+
+
+def generate_terminal_transfers(
+    iata: str, token: Optional[CancellationToken] = None
+) -> list:
+    """Ask the LLM for the terminal-transfer sections of one airport.
+
+    Raises `ValueError` (`json.JSONDecodeError` for unparseable JSON) when
+    no model returned valid sections.
+    """
+    return terminal_transfers_batcher.call(iata.upper(), token)
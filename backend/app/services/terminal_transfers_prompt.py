@@ -33,7 +33,13 @@ PROMPT = (
     "If you understand, return only the JSON object as described above.\n"
 )
 
+# Compact variant without the worked example; the schema line and rules
+# already describe the shape
+COMPACT_PROMPT = (
+    PROMPT[: PROMPT.index("Examples (these are examples only")]
+    + PROMPT[PROMPT.index("If you understand") :]
+)
 
 
-def get_prompt():
-    return PROMPT
+def get_prompt(compact=False):
+    return COMPACT_PROMPT if compact else PROMPT
@@ -0,0 +1,153 @@
+"""Freshness policy for generated airport transports.
+
+Stored transports age by their `updated_at` timestamp:
+
+- younger than the soft TTL: fresh, served straight from MongoDB;
+- between the soft and hard TTL: stale, still served immediately while a
+  background regeneration is queued on the LLM bulkhead;
+- older than the hard TTL: expired, the caller regenerates before answering.
+
+Sponsored transports are added manually and never expire, so only generated
+documents count towards an airport's age.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.airport_agent import run_airport_lookup
+from app.services.airport_transports import (
+    clear_failed_lookup,
+    get_failed_lookup,
+    record_failed_lookup,
+    replace_transports_for_airport,
+)
+from app.services.bulkheads import BulkheadFull, llm_bulkhead
+from app.services.cancellation import Cancelled
+
+TRANSPORTS_SOFT_TTL_SECONDS = int(
+    os.getenv("TRANSPORTS_SOFT_TTL_SECONDS", str(7 * 24 * 3600))
+)
+TRANSPORTS_HARD_TTL_SECONDS = int(
+    os.getenv("TRANSPORTS_HARD_TTL_SECONDS", str(30 * 24 * 3600))
+)
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+_refreshing: set[str] = set()
+_refreshing_lock = threading.Lock()
+# Regenerations in flight per IATA; concurrent callers share the leader's result
+_regenerating: Dict[str, "Future[List[Dict[str, Any]]]"] = {}
+_regenerating_lock = threading.Lock()
+
+
+def _generated_at(docs: List[Dict[str, Any]]) -> Optional[datetime]:
+    """Return the oldest `updated_at` among generated (non-sponsored) docs."""
+    stamps = [
+        d["updated_at"]
+        for d in docs
+        if not d.get("sponsored") and isinstance(d.get("updated_at"), datetime)
+    ]
+    return min(stamps) if stamps else None
+
+
+def classify_transports(docs: List[Dict[str, Any]]) -> str:
+    """Return FRESH, STALE or EXPIRED for a stored set of transports."""
+    generated_at = _generated_at(docs)
+    if generated_at is None:
+        return FRESH
+    if generated_at.tzinfo is not None:
+        generated_at = generated_at.replace(tzinfo=None)
+    age = (datetime.utcnow() - generated_at).total_seconds()
+    if age >= TRANSPORTS_HARD_TTL_SECONDS:
+        return EXPIRED
+    if age >= TRANSPORTS_SOFT_TTL_SECONDS:
+        return STALE
+    return FRESH
+
+
+def regenerate_transports(iata: str) -> List[Dict[str, Any]]:
+    """Run the agent and replace stored transports if it produced any.
+
+    An empty result is recorded in the negative cache and leaves the stored
+    transports untouched. Calls for an airport that is already being
+    regenerated wait for that run instead of starting another one. Returns
+    the new transports (possibly empty).
+    """
+    key = iata.upper()
+    with _regenerating_lock:
+        future = _regenerating.get(key)
+        leader = future is None
+        if future is None:
+            future = _regenerating[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        cleaned = _regenerate(key)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(cleaned)
+        return cleaned
+    finally:
+        with _regenerating_lock:
+            _regenerating.pop(key, None)
+
+
+def _regenerate(iata: str) -> List[Dict[str, Any]]:
+    cleaned = run_airport_lookup(iata)
+    if not cleaned:
+        record_failed_lookup(iata, "empty_result")
+        return []
+    replace_transports_for_airport(iata.upper(), cleaned)
+    clear_failed_lookup(iata)
+    return cleaned
+
+
+def _refresh_in_background(iata: str):
+    try:
+        if get_failed_lookup(iata):
+            logging.info("Skipping background refresh for %s: in backoff", iata)
+            return
+        cleaned = regenerate_transports(iata)
+        logging.info(
+            "Background refresh for %s stored %d transports", iata, len(cleaned)
+        )
+    except Cancelled as e:
+        logging.warning("Background refresh for %s stopped: %s", iata, e.reason)
+    except Exception:
+        logging.exception("Background transport refresh failed for %s", iata)
+        try:
+            record_failed_lookup(iata, "agent_error")
+        except Exception:
+            logging.exception("Failed to record refresh failure for %s", iata)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(iata.upper())
+
+
+def schedule_refresh(iata: str) -> bool:
+    """Queue a background regeneration unless one is already running.
+
+    Returns False when a refresh is already in flight or the LLM bulkhead is
+    saturated; the stale data keeps being served either way.
+    """
+    key = iata.upper()
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+    try:
+        llm_bulkhead.submit(_refresh_in_background, key)
+    except BulkheadFull:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        logging.info("LLM bulkhead full; deferring refresh for %s", key)
+        return False
+    return True
@@ -156,5 +156,72 @@ RULES:
 """
 
 
-def get_prompt():
-    return PROMPT
+# Compact variant: one short worked example instead of three full routes;
+# the schema and rules are unchanged
+COMPACT_EXAMPLE = (
+    '[{"iata":"LHR","id":"heathrow_express","airport":"London Heathrow",'
+    '"name":"Heathrow Express","mode":"train","duration":15,"co2":null,'
+    '"url":"https://www.heathrowexpress.com/ticket-fares","hasFirstClass":true,'
+    '"stops":[{"stop_name":"Heathrow Terminal 5","lat":51.47,"lon":-0.4863,'
+    '"currency":"GBP","prices":[{"type":"standard","amount":0}],"branch_id":"T5-branch"},'
+    '{"stop_name":"London Paddington","lat":51.5155,"lon":-0.1754,"currency":"GBP",'
+    '"prices":[{"type":"standard","amount":25}],"branch_id":null}]}]'
+)
+_EXAMPLE_START = "Emit ONLY this JSON array with MULTIPLE transport options:\n"
+_EXAMPLE_END = "\nCRITICAL REQUIREMENTS:"
+COMPACT_PROMPT = (
+    PROMPT[: PROMPT.index(_EXAMPLE_START) + len(_EXAMPLE_START)]
+    + "\n"
+    + COMPACT_EXAMPLE
+    + "\n"
+    + PROMPT[PROMPT.index(_EXAMPLE_END) :]
+)
+
+# Mode categories requested separately when the agent splits generation
+# per mode; each value lists the schema's `mode` strings in that group
+OTHER_MODE_GROUP = "other"
+MODE_GROUPS = {
+    "train": ("train", "rail"),
+    "underground": ("underground", "tube", "metro"),
+    "bus": ("bus",),
+    "coach": ("coach",),
+    "taxi": ("taxi",),
+    # Catch-all: every mode not listed above (tram, ferry, shuttle, ...)
+    OTHER_MODE_GROUP: (),
+}
+_GROUPED_MODES = tuple(m for modes in MODE_GROUPS.values() for m in modes)
+
+MODE_SCOPE = """
+SCOPE FOR THIS REQUEST:
+Only include services whose "mode" is one of: {modes}. Leave out every other mode; those are requested separately.
+The MULTIPLE-options requirement above applies within this scope only. If the airport has no such service, output an empty array [].
+"""
+
+OTHER_MODE_SCOPE = """
+SCOPE FOR THIS REQUEST:
+Only include services whose "mode" is NOT one of: {modes} (for example tram, light rail, ferry, shuttle). Those modes are requested separately.
+The MULTIPLE-options requirement above applies within this scope only. If the airport has no such service, output an empty array [].
+"""
+
+
+def in_mode_group(mode, mode_group):
+    """Whether a transport `mode` belongs to `mode_group` of MODE_GROUPS."""
+    mode = str(mode).lower()
+    if mode_group == OTHER_MODE_GROUP:
+        return mode not in _GROUPED_MODES
+    return mode in MODE_GROUPS[mode_group]
+
+
+def get_prompt(mode_group=None, compact=False):
+    """Return the transport prompt, optionally restricted to one of MODE_GROUPS.
+
+    `compact` selects the variant with a single short example.
+    """
+    prompt = COMPACT_PROMPT if compact else PROMPT
+    if mode_group is None:
+        return prompt
+    if mode_group == OTHER_MODE_GROUP:
+        modes = ", ".join(f'"{m}"' for m in _GROUPED_MODES)
+        return prompt + OTHER_MODE_SCOPE.format(modes=modes)
+    modes = ", ".join(f'"{m}"' for m in MODE_GROUPS[mode_group])
+    return prompt + MODE_SCOPE.format(modes=modes)
@@ -0,0 +1,211 @@
+"""Response compression with content negotiation and a size threshold.
+
+`CompressionMiddleware` compresses buffered JSON/text responses of at
+least COMPRESSION_MIN_BYTES with brotli (when the `brotli` package is
+installed and the client accepts `br`) or gzip. Responses that carry an
+`ETag` are versioned, so their compressed bytes are memoised per ETag and
+encoding instead of being recompressed on every request. Streaming
+responses (no `Content-Length`) and already-encoded ones pass through
+untouched. Bytes in/out per encoding are counted for `/metrics/compression`.
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import URL, Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore[import-not-found]
+
+    _HAS_BROTLI = True
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None  # type: ignore[assignment]
+    _HAS_BROTLI = False
+
+# Bodies smaller than this are sent uncompressed; the framing overhead wins
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# How many compressed variants of ETagged responses to keep in memory
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+_STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if _HAS_BROTLI else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an `Accept-Encoding` header."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_encoding: Dict[str, Dict[str, int]] = {}
+        self._skipped_small = 0
+
+    def record(self, encoding: str, original: int, compressed: int, cached: bool):
+        with self._lock:
+            s = self._by_encoding.setdefault(
+                encoding,
+                {"responses": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0},
+            )
+            s["responses"] += 1
+            s["cache_hits"] += int(cached)
+            s["bytes_in"] += original
+            s["bytes_out"] += compressed
+
+    def record_skipped(self):
+        with self._lock:
+            self._skipped_small += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_encoding = {
+                enc: {**s, "bytes_saved": s["bytes_in"] - s["bytes_out"]}
+                for enc, s in self._by_encoding.items()
+            }
+            return {
+                "min_bytes": COMPRESSION_MIN_BYTES,
+                "encodings": list(supported_encodings()),
+                "skipped_below_threshold": self._skipped_small,
+                "bytes_saved": sum(s["bytes_saved"] for s in by_encoding.values()),
+                "by_encoding": by_encoding,
+            }
+
+
+compression_stats = CompressionStats()
+
+_variants: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+_variants_lock = threading.Lock()
+
+
+def _compress_cached(key: Optional[Tuple[str, str, str]], body: bytes, encoding: str):
+    """Compress `body`, reusing a memoised variant for versioned responses."""
+    if key is not None:
+        with _variants_lock:
+            hit = _variants.get(key)
+            if hit is not None:
+                _variants.move_to_end(key)
+                return hit, True
+    compressed = compress(body, encoding)
+    if key is not None:
+        with _variants_lock:
+            _variants[key] = compressed
+            while len(_variants) > COMPRESSION_CACHE_SIZE:
+                _variants.popitem(last=False)
+    return compressed, False
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    if "content-length" not in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    if content_type.startswith(_STREAMING_TYPES):
+        return False
+    return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Pure ASGI compression layer, like Starlette's own `GZipMiddleware`.
+
+    It only wraps `send`, so the app keeps the server's `receive` and still
+    sees `http.disconnect` (a `BaseHTTPMiddleware` layer would hide it).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if not _is_compressible(headers):
+                    await send(message)
+                elif int(headers["content-length"]) < COMPRESSION_MIN_BYTES:
+                    compression_stats.record_skipped()
+                    await send(message)
+                else:
+                    start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = Headers(raw=start["headers"])
+            etag = headers.get("etag")
+            key = (str(URL(scope=scope)), etag, encoding) if etag else None
+            compressed, cached = _compress_cached(key, body, encoding)
+            compression_stats.record(encoding, len(body), len(compressed), cached)
+
+            # Keep the raw headers so repeated ones (Set-Cookie) survive
+            vary = headers.get("vary")
+            raw_headers = [
+                (k, v)
+                for k, v in start["headers"]
+                if k.lower() not in (b"content-length", b"vary")
+            ] + [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (
+                    b"vary",
+                    (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode(
+                        "latin-1"
+                    ),
+                ),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**start, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,68 @@
+"""Conditional GET helpers built on the `data_versions` stamps.
+
+A read endpoint fetches the stamp of the dataset it serves before loading
+the data. If the client's `If-None-Match` / `If-Modified-Since` still match,
+it answers 304 without loading or serialising anything. Otherwise it returns
+the body with `ETag`, `Last-Modified` and `Cache-Control` headers.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+# Seconds browsers and the frontend proxy may reuse a response before revalidating
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+
+
+def make_etag(name: str, version: int) -> str:
+    digest = hashlib.sha1(f"{name}:{version}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def cache_headers(name: str, stamp: Dict[str, Any]) -> Dict[str, str]:
+    """Validator and freshness headers for dataset `name` at `stamp`."""
+    headers = {
+        "ETag": make_etag(name, stamp.get("version", 0)),
+        "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}",
+    }
+    updated_at = stamp.get("updated_at")
+    if isinstance(updated_at, datetime):
+        headers["Last-Modified"] = format_datetime(_as_utc(updated_at), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluate the request's conditional headers against `headers`.
+
+    `If-None-Match` takes precedence over `If-Modified-Since` (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etag = headers["ETag"].removeprefix("W/")
+        candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(last_modified) <= _as_utc(since)
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,64 @@
+"""Fast JSON encoding for API responses.
+
+FastAPI's default path runs every returned value through `jsonable_encoder`
+and then `json.dumps`, walking nested transport documents (`stops`, `prices`,
+`co2`) twice in Python. `FastJSONResponse` encodes with orjson (a declared
+dependency; the stdlib `json` is only a fallback for environments without
+it), which handles datetimes natively, and serialises BSON ObjectIds
+as strings so Mongo documents can be returned without converting `_id` by
+hand. Endpoints that return large payloads should return a
+`FastJSONResponse` directly to skip `jsonable_encoder` as well.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:  # pragma: no cover - fallback when orjson is missing
+    orjson = None  # type: ignore[assignment]
+    _HAS_ORJSON = False
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    # Anything else (pydantic models, enums, ...) goes through FastAPI's encoder
+    return jsonable_encoder(value)
+
+
+def json_backend() -> str:
+    """Name of the encoder in use: "orjson", or "json" for the fallback."""
+    return "orjson" if _HAS_ORJSON else "json"
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` to compact UTF-8 JSON bytes."""
+    if _HAS_ORJSON:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,105 @@
+"""In-memory cache of encoded response bodies, keyed by data version.
+
+Hot list endpoints (`/airports`, `/terminal-transfers`) otherwise rebuild
+and JSON-encode the same payload on every request. Instead the encoded
+bytes, plus their compressed variants, are kept per dataset for the version stamp they
+were built from. A request whose stamp matches the cached version is served
+straight from memory; a newer stamp rebuilds the entry once. Write paths
+call `invalidate` through `bump_version`, so the old bytes are dropped as
+soon as this worker changes the data.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from app.utils.compression import (
+    COMPRESSION_MIN_BYTES,
+    compress,
+    compression_stats,
+    negotiate_encoding,
+    supported_encodings,
+)
+from app.utils.json_response import dumps
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    version: int
+    body: bytes
+    # Content-Encoding -> compressed body; empty below the size threshold
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+
+def encode_body(payload: Any) -> bytes:
+    return dumps(payload)
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CachedBody] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, name: str, version: int) -> Optional[CachedBody]:
+        """Return the cached body for `name` if it was built from `version`."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.version == version:
+                self._hits += 1
+                return entry
+            self._misses += 1
+        return None
+
+    def put(self, name: str, version: int, payload: Any) -> CachedBody:
+        """Encode and compress `payload` and cache it under `name`/`version`."""
+        body = encode_body(payload)
+        variants = {}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            variants = {enc: compress(body, enc) for enc in supported_encodings()}
+        entry = CachedBody(version, body, variants)
+        with self._lock:
+            current = self._entries.get(name)
+            # A slower rebuild for an older version must not replace a newer one
+            if current is None or current.version <= version:
+                self._entries[name] = entry
+        return entry
+
+    def invalidate(self, name: str):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": {
+                    name: {
+                        "version": e.version,
+                        "bytes": len(e.body),
+                        **{f"{enc}_bytes": len(v) for enc, v in e.variants.items()},
+                    }
+                    for name, e in self._entries.items()
+                },
+            }
+
+
+def cached_response(
+    request: Request, entry: CachedBody, headers: Dict[str, str]
+) -> Response:
+    """Serve `entry` as-is, picking a precompressed variant the client accepts."""
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    content = entry.body
+    if encoding in entry.variants:
+        content = entry.variants[encoding]
+        headers["Content-Encoding"] = encoding
+        compression_stats.record(encoding, len(entry.body), len(content), True)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,81 @@
+"""Compare response encode time: FastAPI's default path vs FastJSONResponse.
+
+Uses the largest real payloads in the configured MongoDB: the airport with
+the most stored transports and the full Climatiq responses list. Run from
+the backend directory:
+
+    poetry run python -m scripts.bench_json [--repeat 50]
+"""
+
+import argparse
+import json
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.services.airport_transports import (
+    TRANSPORTS_COLLECTION,
+    get_transports_for_airport,
+)
+from app.services.mongodb import DB_NAME, client, get_all_climatiq_responses
+from app.utils.json_response import _HAS_ORJSON, dumps
+
+
+def _largest_transports_airport():
+    pipeline = [
+        {"$group": {"_id": "$iata", "n": {"$sum": 1}}},
+        {"$sort": {"n": -1}},
+        {"$limit": 1},
+    ]
+    top = list(client[DB_NAME][TRANSPORTS_COLLECTION].aggregate(pipeline))
+    return top[0]["_id"] if top else None
+
+
+def _default_encode(content):
+    # What FastAPI does for a returned dict with the stock JSONResponse
+    return json.dumps(
+        jsonable_encoder(content, custom_encoder={ObjectId: str}),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _time(fn, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = {}
+    iata = _largest_transports_airport()
+    if iata:
+        payloads[f"transports {iata}"] = {
+            "transports": get_transports_for_airport(iata)
+        }
+    climatiq = get_all_climatiq_responses()
+    payloads["climatiq responses"] = {"responses": climatiq, "count": len(climatiq)}
+
+    print(f"encoder: {'orjson' if _HAS_ORJSON else 'json (orjson not installed)'}")
+    print(
+        f"{'payload':<28}{'bytes':>10}{'default ms':>12}{'fast ms':>10}{'speedup':>9}"
+    )
+    for name, content in payloads.items():
+        size = len(dumps(content))
+        slow = _time(_default_encode, content, args.repeat)
+        fast = _time(dumps, content, args.repeat)
+        speedup = slow / fast if fast else float("inf")
+        print(f"{name:<28}{size:>10}{slow:>12.2f}{fast:>10.2f}{speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Print prompt token counts per template, variant and agent iteration.
+
+Static counterpart of `/metrics/prompt-budget`: it needs no database or
+LLM, only the prompt modules. Run from the backend directory:
+
+    poetry run python -m scripts.prompt_budget [--iterations 5]
+"""
+
+import argparse
+import json
+import logging
+
+from app.services import (
+    airport_prompt,
+    city_center_prompt,
+    city_fare_prompt,
+    terminal_transfers_prompt,
+    transport_prompt,
+)
+from app.services.airport_agent import (
+    AGENT_FAILURE_EXCERPT_CHARS,
+    CALL_SITE,
+    iter_airport_lookup,
+)
+from app.services.prompt_budget import (
+    count_message_tokens,
+    count_tokens,
+    load_tokenizer,
+    select_variant,
+    tokenizer_name,
+)
+
+
+def _templates():
+    yield "transports", transport_prompt.get_prompt(), transport_prompt.get_prompt(
+        compact=True
+    )
+    for group in transport_prompt.MODE_GROUPS:
+        yield f"transports[{group}]", transport_prompt.get_prompt(
+            group
+        ), transport_prompt.get_prompt(group, compact=True)
+    yield "terminal_transfers", terminal_transfers_prompt.get_prompt(), terminal_transfers_prompt.get_prompt(
+        compact=True
+    )
+    yield "city_centre", city_center_prompt.get_prompt(), None
+    yield "fare_summary", city_fare_prompt.get_fare_summary_prompt(), None
+    yield "airports", airport_prompt.get_prompt(), None
+
+
+def _agent_iterations(iterations):
+    """Prompt tokens the agent sends per iteration when every reply is invalid."""
+    import app.services.airport_agent as agent
+
+    sizes = []
+    garbage = "x" * (AGENT_FAILURE_EXCERPT_CHARS * 4)
+
+    def fake_ask(model, messages, token=None):
+        sizes.append(
+            (select_variant(CALL_SITE, len(sizes) + 1), count_message_tokens(messages))
+        )
+        return garbage
+
+    original = agent.ask_ollama
+    agent.ask_ollama = fake_ask
+    # The agent logs every rejected reply; not useful here
+    logging.disable(logging.CRITICAL)
+    try:
+        for _ in iter_airport_lookup("LHR", max_iters=iterations, samples=1):
+            pass
+    finally:
+        agent.ask_ollama = original
+        logging.disable(logging.NOTSET)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+    load_tokenizer()
+
+    templates = [
+        {
+            "template": name,
+            "full_tokens": count_tokens(full),
+            "compact_tokens": count_tokens(compact) if compact else None,
+        }
+        for name, full, compact in _templates()
+    ]
+    iterations = [
+        {"iteration": n, "variant": variant, "prompt_tokens": tokens}
+        for n, (variant, tokens) in enumerate(_agent_iterations(args.iterations), 1)
+    ]
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "tokenizer": tokenizer_name(),
+                    "templates": templates,
+                    "agent_iterations": iterations,
+                },
+                indent=2,
+            )
+        )
+        return
+
+    print(f"tokenizer: {tokenizer_name()}")
+    print(f"{'template':<28}{'full':>8}{'compact':>9}{'saved':>8}")
+    for t in templates:
+        compact = t["compact_tokens"]
+        saved = "" if compact is None else f"{1 - compact / t['full_tokens']:.0%}"
+        print(
+            f"{t['template']:<28}{t['full_tokens']:>8}"
+            f"{'' if compact is None else compact:>9}{saved:>8}"
+        )
+    print("\nagent prompt per iteration (all replies invalid, PROMPT_COMPACT applied):")
+    for it in iterations:
+        print(f"  {it['iteration']:>2}  {it['variant']:<8}{it['prompt_tokens']:>8}")
+
+
+if __name__ == "__main__":
+    main()
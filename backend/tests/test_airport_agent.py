@@ -0,0 +1,54 @@
+from app.services import airport_agent
+
+
+def test_agent_history_stays_flat_across_retries(monkeypatch):
+    sizes = []
+
+    def fake_ask(model, messages, token):
+        sizes.append(len(messages))
+        if len(sizes) < 5:
+            return "Sorry, here is some prose instead of JSON. " * 200
+        return '[{"id": "hex", "mode": "train"}]'
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    result = airport_agent.run_airport_lookup("LHR", samples=1, per_mode=False)
+    assert result == [{"id": "hex", "mode": "train"}]
+    # Prompt messages plus only the latest failure and instruction
+    assert sizes == [4, 6, 6, 6, 6]
+
+
+def test_retries_use_compact_prompt_and_record_budget(monkeypatch):
+    from app.services.prompt_budget import PromptBudgetStats
+
+    prompt_budget_stats = PromptBudgetStats()
+    monkeypatch.setattr(airport_agent, "prompt_budget_stats", prompt_budget_stats)
+    prompts = []
+
+    def fake_ask(model, messages, token):
+        prompts.append(messages[1]["content"])
+        if len(prompts) == 1:
+            return "no json"
+        return '[{"id": "hex", "mode": "train"}]'
+
+    monkeypatch.setenv("PROMPT_COMPACT_TRANSPORTS", "retry")
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+
+    airport_agent.run_airport_lookup("LHR", samples=1, per_mode=False)
+
+    assert len(prompts[1]) < len(prompts[0]) / 2
+    site = prompt_budget_stats.stats()["call_sites"]["transports"]
+    assert site["variants"]["full"]["validity_rate"] == 0
+    assert site["variants"]["compact"]["validity_rate"] == 1
+    by_iteration = site["avg_prompt_tokens_by_iteration"]
+    assert by_iteration["2"] < by_iteration["1"]
+
+
+def test_compact_prompts_are_opt_in(monkeypatch):
+    from app.services import prompt_budget
+
+    monkeypatch.delenv("PROMPT_COMPACT_TRANSPORTS", raising=False)
+    assert prompt_budget.PROMPT_COMPACT == "never"
+    assert prompt_budget.select_variant("transports", 3) == prompt_budget.FULL
+    monkeypatch.setenv("PROMPT_COMPACT_TRANSPORTS", "retry")
+    assert prompt_budget.select_variant("transports", 1) == prompt_budget.FULL
+    assert prompt_budget.select_variant("transports", 2) == prompt_budget.COMPACT
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from app.services import airport_generation
+
+
+def test_chunked_update_saves_off_loop_and_publishes_once(monkeypatch):
+    def generate(country, token=None):
+        if country == "Atlantis":
+            raise ValueError("no airports")
+        return [{"iata": country[:3].upper(), "name": country}]
+
+    saves = []
+
+    def replace(country, docs, publish=True):
+        saves.append((country, publish, threading.current_thread()))
+        return {"inserted": len(docs), "updated": 0, "unchanged": 0, "deleted": 0}
+
+    published = []
+    monkeypatch.setattr(airport_generation, "generate_airports", generate)
+    monkeypatch.setattr(airport_generation, "get_airport_countries", lambda: [])
+    monkeypatch.setattr(airport_generation, "AIRPORTS_CHUNK_RETRIES", 0)
+    monkeypatch.setattr(airport_generation, "replace_airports_for_country", replace)
+    monkeypatch.setattr(
+        airport_generation, "airports_changed", lambda: published.append(1)
+    )
+
+    result = asyncio.run(
+        airport_generation.update_airports_chunked(["France", "Atlantis", "Spain"])
+    )
+
+    assert result["count"] == 2
+    assert result["inserted"] == 2
+    assert [f["country"] for f in result["failed"]] == ["Atlantis"]
+    assert [(c, p) for c, p, _ in saves] == [("France", False), ("Spain", False)]
+    assert all(t is not threading.main_thread() for _, _, t in saves)
+    assert published == [1]
+
+
+def test_chunked_update_without_changes_does_not_publish(monkeypatch):
+    published = []
+    monkeypatch.setattr(airport_generation, "get_airport_countries", lambda: [])
+    monkeypatch.setattr(
+        airport_generation,
+        "generate_airports",
+        lambda country, token=None: [{"iata": "CDG", "name": "Charles de Gaulle"}],
+    )
+    monkeypatch.setattr(
+        airport_generation,
+        "replace_airports_for_country",
+        lambda country, docs, publish=True: {"unchanged": len(docs)},
+    )
+    monkeypatch.setattr(
+        airport_generation, "airports_changed", lambda: published.append(1)
+    )
+
+    result = asyncio.run(airport_generation.update_airports_chunked(["France"]))
+
+    assert result["unchanged"] == 1
+    assert published == []
+
+
+def test_chunk_keys_are_saved_under_the_stored_country_names(monkeypatch):
+    replies = {
+        "GB": [{"iata": "LHR", "country": "United Kingdom"}],
+        "UNITED KINGDOM": [{"iata": "LGW", "country": "UNITED KINGDOM"}],
+        "FR": [{"iata": "CDG", "country": "FRANCE"}],
+    }
+    saved = []
+    monkeypatch.setattr(
+        airport_generation,
+        "generate_airports",
+        lambda country, token=None: [dict(d) for d in replies[country]],
+    )
+    monkeypatch.setattr(
+        airport_generation, "get_airport_countries", lambda: ["United Kingdom"]
+    )
+    monkeypatch.setattr(
+        airport_generation,
+        "replace_airports_for_country",
+        lambda country, docs, publish=True: saved.append(country) or {},
+    )
+    monkeypatch.setattr(airport_generation, "airports_changed", lambda: None)
+
+    asyncio.run(airport_generation.update_airports_chunked(list(replies)))
+
+    assert saved == ["United Kingdom", "United Kingdom", "FRANCE"]
@@ -0,0 +1,60 @@
+from app.services.airport_registry import AirportRegistry
+
+
+def _registry(docs, versions):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [dict(d) for d in docs]
+
+    registry = AirportRegistry(
+        loader, lambda: {"version": versions[-1], "updated_at": None}
+    )
+    return registry, loads
+
+
+def test_lookups_are_case_insensitive_and_return_copies():
+    docs = [
+        {
+            "iata": "CDG",
+            "name": "Charles de Gaulle",
+            "country": "France",
+            "city": "Paris",
+        },
+        {"iata": "ORY", "name": "Orly", "country": "France", "city": "Paris"},
+        {"iata": "ZRH", "name": "Zurich", "country": "Switzerland", "city": "Zurich"},
+        {"name": "No code", "country": "France"},
+    ]
+    registry, _ = _registry(docs, [3])
+    registry.load()
+
+    assert registry.loaded
+    assert registry.version == 3
+    assert registry.get("cdg")["name"] == "Charles de Gaulle"
+    assert registry.get("XXX") is None
+    assert [d["iata"] for d in registry.by_city("paris")] == ["CDG", "ORY"]
+    assert len(registry.by_country("france")) == 3
+    assert len(registry.all()) == 4
+
+    registry.get("CDG")["name"] = "changed"
+    assert registry.get("CDG")["name"] == "Charles de Gaulle"
+
+
+def test_refresh_reloads_only_when_the_version_changes():
+    versions = [1]
+    registry, loads = _registry([{"iata": "CDG", "country": "France"}], versions)
+
+    assert registry.refresh_if_changed() is True
+    assert registry.refresh_if_changed() is False
+    versions.append(2)
+    assert registry.refresh_if_changed() is True
+    assert len(loads) == 2
+
+    stamp, airports = registry.snapshot()
+    assert stamp["version"] == 2
+    assert [d["iata"] for d in airports] == ["CDG"]
+    # Served as-is until the next load swaps in a new list
+    assert registry.snapshot()[1] is airports
+    registry.load()
+    assert registry.snapshot()[1] is not airports
@@ -0,0 +1,125 @@
+import mongomock
+from pymongo import DeleteOne, UpdateOne
+
+from app.services import airports
+
+
+class _BulkCollection:
+    """mongomock collection whose bulk_write replays ops one at a time.
+
+    mongomock's own bulk_write rejects the arguments current pymongo passes.
+    """
+
+    def __init__(self, col):
+        self._col = col
+        self.bulk_writes = []
+
+    def __getattr__(self, name):
+        return getattr(self._col, name)
+
+    def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+        for op in ops:
+            if isinstance(op, UpdateOne):
+                self._col.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, DeleteOne):
+                self._col.delete_one(op._filter)
+
+
+def _setup(monkeypatch):
+    db = mongomock.MongoClient()["test_db"]
+    col = _BulkCollection(db[airports.AIRPORTS_COLLECTION])
+    monkeypatch.setattr(airports, "get_db", lambda: {airports.AIRPORTS_COLLECTION: col})
+    bumps = []
+    monkeypatch.setattr(airports, "bump_version", bumps.append)
+    monkeypatch.setattr(airports.registry, "loaded", False)
+    return col, bumps
+
+
+def _stored(col, country):
+    return {d["iata"]: d for d in col.find({"country": country}, {"_id": 0})}
+
+
+def test_country_sync_writes_only_the_diff(monkeypatch):
+    col, bumps = _setup(monkeypatch)
+    col.insert_one({"iata": "ZRH", "name": "Zurich", "country": "Switzerland"})
+    airports.replace_airports_for_country(
+        "France",
+        [
+            {"iata": "CDG", "name": "Charles de Gaulle"},
+            {"iata": "ORY", "name": "Orly"},
+            {"iata": "NCE", "name": "Nice", "city": "Nice"},
+        ],
+    )
+    created_at = _stored(col, "France")["CDG"]["created_at"]
+
+    counts = airports.replace_airports_for_country(
+        "France",
+        [
+            {"iata": "CDG", "name": "Charles de Gaulle"},
+            {"iata": "ORY", "name": "Paris Orly"},
+            {"iata": "NCE", "name": "Nice"},
+            {"iata": "LYS", "name": "Lyon"},
+            {"iata": "LYS", "name": "Lyon duplicate"},
+        ],
+    )
+
+    assert counts == {"inserted": 1, "updated": 2, "unchanged": 1, "deleted": 0}
+    stored = _stored(col, "France")
+    assert sorted(stored) == ["CDG", "LYS", "NCE", "ORY"]
+    assert stored["CDG"]["created_at"] == created_at
+    assert stored["ORY"]["name"] == "Paris Orly"
+    assert stored["LYS"]["name"] == "Lyon"
+    assert "city" not in stored["NCE"]
+    assert _stored(col, "Switzerland")["ZRH"]["name"] == "Zurich"
+    assert bumps == [airports.AIRPORTS_VERSION_KEY] * 2
+
+
+def test_unchanged_sync_skips_the_write_and_version_bump(monkeypatch):
+    col, bumps = _setup(monkeypatch)
+    docs = [{"iata": "CDG", "name": "Charles de Gaulle"}]
+    airports.replace_airports_for_country("France", [dict(d) for d in docs])
+
+    counts = airports.replace_airports_for_country("France", [dict(d) for d in docs])
+
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1, "deleted": 0}
+    assert len(col.bulk_writes) == 1
+    assert len(bumps) == 1
+
+
+def test_full_sync_deletes_airports_missing_from_the_new_set(monkeypatch):
+    col, _ = _setup(monkeypatch)
+    col.insert_many(
+        [
+            {"iata": "CDG", "name": "Charles de Gaulle", "country": "France"},
+            {"iata": "ZRH", "name": "Zurich", "country": "Switzerland"},
+        ]
+    )
+
+    counts = airports.replace_all_airports(
+        [{"iata": "CDG", "name": "Charles de Gaulle", "country": "France"}]
+    )
+
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1, "deleted": 1}
+    assert [d["iata"] for d in col.find({})] == ["CDG"]
+
+
+def test_sync_collapses_duplicate_rows_to_one(monkeypatch):
+    col, _ = _setup(monkeypatch)
+    col.insert_many(
+        [
+            {"iata": "CDG", "name": "Charles de Gaulle", "country": "France"},
+            {"iata": "CDG", "name": "Roissy", "country": "France"},
+            {"iata": "CDG", "name": "Roissy", "country": "France"},
+        ]
+    )
+
+    counts = airports.replace_airports_for_country(
+        "France", [{"iata": "CDG", "name": "Paris Charles de Gaulle"}]
+    )
+
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": 0, "deleted": 2}
+    rows = list(col.find({"iata": "CDG"}, {"_id": 0, "updated_at": 0}))
+    assert rows == [
+        {"iata": "CDG", "name": "Paris Charles de Gaulle", "country": "France"}
+    ]
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.bulkheads import Bulkhead, BulkheadFull
+
+
+def test_bulkhead_rejects_when_workers_and_queue_are_full():
+    bulkhead = Bulkhead("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = bulkhead.submit(release.wait)
+    queued = bulkhead.submit(release.wait)
+    with pytest.raises(BulkheadFull):
+        bulkhead.submit(release.wait)
+    assert bulkhead.stats()["rejected"] == 1
+
+    release.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    stats = bulkhead.stats()
+    assert stats["completed"] == 2
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+    # Slots are released once work finishes
+    assert bulkhead.submit(lambda: 42).result(timeout=5) == 42
+
+
+def test_saturated_llm_pool_does_not_block_cheap_endpoints(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    saturated = Bulkhead("llm", max_workers=1, max_queue=0)
+    release = threading.Event()
+    saturated.submit(release.wait)
+    monkeypatch.setattr(api, "llm_bulkhead", saturated)
+    monkeypatch.setattr(api, "get_all_airports", lambda: [{"iata": "LHR"}])
+    monkeypatch.setattr(api, "get_version", lambda name: {"version": 0})
+
+    client = TestClient(app)
+    try:
+        r = client.post("/airports/update")
+        assert r.status_code == 503
+        assert r.headers.get("Retry-After")
+
+        r = client.get("/airports")
+        assert r.status_code == 200
+        assert r.json() == {"airports": [{"iata": "LHR"}]}
+    finally:
+        release.set()
+
+
+def test_stream_applies_backpressure_and_stops_on_close():
+    import asyncio
+
+    bulkhead = Bulkhead("test-stream", max_workers=1, max_queue=0)
+    produced = []
+    closed = threading.Event()
+
+    def tokens():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    async def consume_three():
+        stream = bulkhead.stream(tokens, max_buffered=2)
+        received = []
+        async for token in stream:
+            received.append(token)
+            if len(received) == 3:
+                await asyncio.sleep(0.2)
+                break
+        await stream.aclose()
+        return received
+
+    assert asyncio.run(consume_three()) == [0, 1, 2]
+    assert closed.wait(timeout=5)
+    # The worker ran at most about one buffer ahead of the consumer
+    assert len(produced) <= 3 + 2 * 2
+
+
+def test_stream_reports_errors_raised_before_iteration():
+    import asyncio
+
+    bulkhead = Bulkhead("test-stream-error", max_workers=1, max_queue=0)
+
+    def broken():
+        raise ValueError("no stream")
+
+    async def consume():
+        return [token async for token in bulkhead.stream(broken)]
+
+    with pytest.raises(ValueError, match="no stream"):
+        asyncio.run(consume())
+
+
+def test_stream_worker_gives_up_when_nobody_reads():
+    import asyncio
+
+    bulkhead = Bulkhead("test-stream-stall", max_workers=1, max_queue=0)
+    closed = threading.Event()
+
+    def tokens():
+        try:
+            yield from range(1000)
+        finally:
+            closed.set()
+
+    async def read_late():
+        stream = bulkhead.stream(tokens, max_buffered=2, stall_timeout=0.1)
+        await asyncio.sleep(0.5)
+        received = []
+        with pytest.raises(TimeoutError):
+            async for token in stream:
+                received.append(token)
+        return received
+
+    assert asyncio.run(read_late()) == [0, 1]
+    assert closed.wait(timeout=5)
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+
+def test_bundle_gathers_parts_and_reports_failures(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    airport = {
+        "iata": "LHR",
+        "city": "London",
+        "country": "GB",
+        "lat": 51.47,
+        "lon": -0.45,
+    }
+    monkeypatch.setattr(api.airport_registry, "loaded", False)
+    monkeypatch.setattr(api, "get_airport_by_iata", lambda iata: airport)
+    monkeypatch.setattr(
+        api, "get_transports_for_airport", lambda iata: [{"mode": "train"}]
+    )
+    monkeypatch.setattr(api, "classify_transports", lambda docs: api.FRESH)
+    monkeypatch.setattr(api, "get_fare_summary_for_city", lambda city: {"bus": 2.0})
+    monkeypatch.setattr(api, "get_airport_distance", lambda iata: 23.4)
+
+    def broken_transfers(iata):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(api, "get_terminal_transfers", broken_transfers)
+
+    r = TestClient(app).get("/airports/LHR/bundle?passengers=2")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["transports"] == [{"mode": "train"}]
+    assert body["freshness"] == "fresh"
+    assert body["fare_summary"] == {"bus": 2.0}
+    assert body["distance_km"] == 23
+    assert body["coords"] == {"lat": 51.47, "lon": -0.45}
+    assert body["terminal_transfers"] is None
+    assert body["errors"] == {"terminal_transfers": "Internal server error"}
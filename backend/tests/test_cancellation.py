@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import airport_agent
+from app.services.cancellation import (
+    CLIENT_DISCONNECTED,
+    DEADLINE,
+    Cancelled,
+    CancellationToken,
+    cancellation_stats,
+)
+
+
+def test_agent_stops_between_iterations_once_cancelled(monkeypatch):
+    token = CancellationToken("test_lookup")
+    calls = []
+
+    def fake_ask(model, messages, budget):
+        calls.append(budget)
+        token.cancel(CLIENT_DISCONNECTED)
+        return "not json"
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    with pytest.raises(Cancelled) as exc:
+        airport_agent.run_airport_lookup("LHR", max_iters=5, token=token)
+
+    assert exc.value.reason == CLIENT_DISCONNECTED
+    assert exc.value.operation == "test_lookup"
+    assert len(calls) == 1
+    assert cancellation_stats.stats()["test_lookup"]["cancelled"] == {
+        CLIENT_DISCONNECTED: 1
+    }
+
+
+def test_token_deadline_and_parent_chain():
+    parent = CancellationToken("parent", timeout=60)
+    child = CancellationToken("child", timeout=0.000001, parent=parent)
+    assert child.reason == DEADLINE
+    assert not parent.cancelled
+    assert child.remaining() == 0.0
+    parent.cancel(CLIENT_DISCONNECTED)
+    with pytest.raises(Cancelled) as exc:
+        child.raise_if_cancelled()
+    assert exc.value.operation == "parent"
+
+
+def test_update_endpoint_maps_deadline_to_504(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    def expired_lookup(iata, token=None):
+        raise Cancelled(DEADLINE, "transports_update")
+
+    monkeypatch.setattr(api, "run_airport_lookup", expired_lookup)
+    r = TestClient(app).post("/airports/LHR/transports/update")
+    assert r.status_code == 504
+
+
+def test_expired_transports_are_served_when_regeneration_is_cancelled(monkeypatch):
+    from datetime import datetime
+
+    from app.main import app
+    from app.routers import api
+
+    expired = [{"iata": "LHR", "mode": "train", "updated_at": datetime(2000, 1, 1)}]
+    monkeypatch.setattr(api, "get_transports_for_airport", lambda iata: expired)
+    monkeypatch.setattr(api, "get_failed_lookup", lambda iata: None)
+    monkeypatch.setattr(api, "get_version", lambda name: {"version": 1})
+
+    def out_of_budget(iata):
+        raise Cancelled(DEADLINE, "airport_lookup")
+
+    monkeypatch.setattr(api, "regenerate_transports", out_of_budget)
+
+    r = TestClient(app).get("/airports/LHR/transports")
+    assert r.status_code == 200
+    assert r.headers["X-Data-Freshness"] == "expired"
+    assert r.json()["transports"][0]["mode"] == "train"
+
+
+def test_client_disconnect_cancels_the_worker_through_the_app(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    started = threading.Event()
+    tokens = []
+
+    def slow_lookup(iata, token=None):
+        tokens.append(token)
+        started.set()
+        deadline = time.monotonic() + 5
+        while not token.cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        token.raise_if_cancelled()
+        return []
+
+    monkeypatch.setattr(api, "run_airport_lookup", slow_lookup)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/airports/LHR/transports/update",
+        "raw_path": b"/airports/LHR/transports/update",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The client goes away once the worker is running
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), timeout=10))
+
+    assert tokens[0].reason == CLIENT_DISCONNECTED
+    assert sent[0]["status"] == 499
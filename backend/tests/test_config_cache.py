@@ -0,0 +1,64 @@
+from app.services import config_cache as config_cache_module
+from app.services.config_cache import ConfigCache
+
+
+def test_values_are_cached_until_invalidated():
+    cache = ConfigCache(ttl_seconds=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {"regions": len(loads)}
+
+    assert cache.get("regions", loader) == {"regions": 1}
+    assert cache.get("regions", loader) == {"regions": 1}
+    cache.invalidate("regions")
+    assert cache.get("regions", loader) == {"regions": 2}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["cached"] == ["regions"]
+    assert stats["versions"] == {"regions": 1}
+
+
+def test_expired_entries_are_reloaded():
+    cache = ConfigCache(ttl_seconds=0)
+    loads = []
+    cache.get("regions", lambda: loads.append(1))
+    cache.get("regions", lambda: loads.append(1))
+    assert len(loads) == 2
+
+
+def test_value_loaded_across_an_invalidation_is_not_stored():
+    cache = ConfigCache(ttl_seconds=60)
+
+    def stale_loader():
+        # A write lands while the old value is being read
+        cache.invalidate("regions")
+        return "old"
+
+    assert cache.get("regions", stale_loader) == "old"
+    assert cache.get("regions", lambda: "new") == "new"
+
+
+def test_change_stream_invalidates_the_watched_key(monkeypatch):
+    cache = ConfigCache(ttl_seconds=60)
+    monkeypatch.setattr(config_cache_module, "config_cache", cache)
+    cache.get("regions", lambda: "old")
+
+    class FakeDb:
+        def watch(self, pipeline):
+            class Stream:
+                def __enter__(self):
+                    return iter([{"ns": {"coll": "country_regions"}}])
+
+                def __exit__(self, *exc):
+                    return False
+
+            return Stream()
+
+    thread = config_cache_module.watch_collections(
+        FakeDb(), {"country_regions": "regions"}
+    )
+    thread.join(timeout=5)
+    assert cache.get("regions", lambda: "new") == "new"
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+
+def test_airports_revalidation_returns_304_until_version_changes(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    stamp = {"version": 3, "updated_at": datetime(2025, 1, 1, 12, 0, 0)}
+    airports = [{"iata": f"A{i:02d}", "name": f"Airport {i}"} for i in range(100)]
+    loads = []
+
+    def fake_airports():
+        loads.append(1)
+        return airports
+
+    monkeypatch.setattr(api, "get_version", lambda name: dict(stamp))
+    monkeypatch.setattr(api, "get_all_airports", fake_airports)
+    monkeypatch.setattr(api.airport_registry, "loaded", False)
+
+    client = TestClient(app)
+    r = client.get("/airports")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert r.headers["Last-Modified"] == "Wed, 01 Jan 2025 12:00:00 GMT"
+    assert "max-age" in r.headers["Cache-Control"]
+
+    r = client.get("/airports", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    r = client.get(
+        "/airports", headers={"If-Modified-Since": "Wed, 01 Jan 2025 12:00:00 GMT"}
+    )
+    assert r.status_code == 304
+    assert len(loads) == 1
+
+    # Unconditional requests are served from the cached bytes
+    r = client.get("/airports", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.json() == {"airports": airports}
+    r = client.get("/airports", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in r.headers
+    assert r.json() == {"airports": airports}
+    assert len(loads) == 1
+
+    stamp["version"] = 4
+    r = client.get("/airports", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert len(loads) == 2
+
+
+def test_compression_middleware_respects_threshold_and_reuses_variants(monkeypatch):
+    from app.main import app
+    from app.routers import api
+    from app.utils.compression import COMPRESSION_MIN_BYTES, compression_stats
+
+    stamp = {"version": 1, "updated_at": None}
+    big = [{"mode": "bus", "stops": [[51.47, -0.45]] * 20} for _ in range(20)]
+    monkeypatch.setattr(api, "get_version", lambda name: dict(stamp))
+    monkeypatch.setattr(api, "get_transports_for_airport", lambda iata: big)
+    monkeypatch.setattr(api, "classify_transports", lambda docs: api.FRESH)
+
+    client = TestClient(app)
+    before = compression_stats.stats()["by_encoding"].get("gzip", {})
+    for _ in range(2):
+        r = client.get("/airports/LHR/transports", headers={"Accept-Encoding": "gzip"})
+        assert r.status_code == 200
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.json() == {"transports": big}
+    after = compression_stats.stats()["by_encoding"]["gzip"]
+    assert after["responses"] - before.get("responses", 0) == 2
+    # The second response reuses the compressed bytes of the first (same ETag)
+    assert after["cache_hits"] - before.get("cache_hits", 0) == 1
+    assert after["bytes_saved"] > before.get("bytes_saved", 0)
+
+    r = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert len(r.content) < COMPRESSION_MIN_BYTES
+    assert "Content-Encoding" not in r.headers
@@ -0,0 +1,39 @@
+from app.services import airport_agent
+from app.services.json_repair import repair_json
+
+
+def test_truncated_array_keeps_complete_elements_and_reports_the_rest():
+    text = (
+        '<|channel|>```json\n[{"id": "hex", "stops": [{"lat": 1}]},'
+        ' {"id": "picc", "stops": [{"lat": 2}, {"lat": 3}]}, {"id": "bus", "stops": [{"la'
+    )
+    report = repair_json(text)
+    assert report.value == [
+        {"id": "hex", "stops": [{"lat": 1}]},
+        {"id": "picc", "stops": [{"lat": 2}, {"lat": 3}]},
+    ]
+    assert report.kept_items == 2
+    assert report.dropped_items == 1
+    assert report.dropped_excerpt == '{"id": "bus", "stops": [{"la'
+    assert "stripped control tokens" in report.repairs
+
+
+def test_truncated_object_is_closed_at_last_complete_value():
+    report = repair_json('{"LHR": {"sections": [{"name": "T2", "tips": []}, {"na')
+    assert report.value == {"LHR": {"sections": [{"name": "T2", "tips": []}]}}
+    assert report.dropped_excerpt == '{"na'
+    assert repair_json('[{"a').value is None
+    assert repair_json("no json here").value is None
+
+
+def test_agent_accepts_salvaged_array_without_another_round_trip(monkeypatch):
+    calls = []
+
+    def fake_ask(model, messages, token):
+        calls.append(messages)
+        return '[{"id": "hex", "mode": "train"}, {"id": "picc", "mo'
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    result = airport_agent.run_airport_lookup("LHR", samples=1, per_mode=False)
+    assert result == [{"id": "hex", "mode": "train"}]
+    assert len(calls) == 1
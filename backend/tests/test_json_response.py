@@ -0,0 +1,25 @@
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.json_response import FastJSONResponse
+
+
+def test_fast_response_matches_default_encoding_for_mongo_documents():
+    oid = ObjectId()
+    doc = {
+        "_id": oid,
+        "mode": "train",
+        "stops": [{"name": "Paddington", "lat": 51.5154, "lon": -0.1755}],
+        "prices": {"adult": 25.5, "currency": "GBP"},
+        "co2": None,
+        "updated_at": datetime(2025, 3, 1, 8, 30, 15, 120000),
+        "checked_at": datetime(2025, 3, 1, 8, 30, tzinfo=timezone.utc),
+    }
+
+    body = FastJSONResponse({"transports": [doc]}).body
+    expected = jsonable_encoder({"transports": [doc]}, custom_encoder={ObjectId: str})
+    assert json.loads(body) == expected
+    assert json.loads(body)["transports"][0]["_id"] == str(oid)
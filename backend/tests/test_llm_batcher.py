@@ -0,0 +1,88 @@
+import threading
+
+from app.services.llm_batcher import MicroBatcher
+
+
+def _run_concurrently(batcher, keys):
+    results = {}
+    threads = [
+        threading.Thread(target=lambda k=k: results.setdefault(k, batcher.call(k)))
+        for k in keys
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_concurrent_keys_share_one_request_and_bad_parts_fall_back():
+    batches, singles = [], []
+
+    def batch(keys, token):
+        batches.append(sorted(keys))
+        # "c" is missing from the reply and "b" comes back invalid
+        return {"a": "A", "b": None}
+
+    def single(key, token):
+        singles.append(key)
+        return key.upper()
+
+    def validate(key, part):
+        if part is None:
+            raise ValueError("empty")
+        return part
+
+    batcher = MicroBatcher("test", single, batch, validate, window_ms=200)
+    results = _run_concurrently(batcher, ["a", "b", "c"])
+
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert batches == [["a", "b", "c"]]
+    assert sorted(singles) == ["b", "c"]
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["batched_keys"] == 3
+    assert stats["fallbacks"] == 2
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    def batch(keys, token):
+        raise RuntimeError("upstream error")
+
+    batcher = MicroBatcher(
+        "test_fail", lambda k, t: k * 2, batch, lambda k, p: p, window_ms=200
+    )
+    assert _run_concurrently(batcher, ["x", "y"]) == {"x": "xx", "y": "yy"}
+    assert batcher.stats()["fallbacks"] == 2
+
+
+def test_lone_request_skips_the_batch_prompt():
+    def batch(keys, token):
+        raise AssertionError("batch prompt used for one key")
+
+    batcher = MicroBatcher(
+        "test_one", lambda k, t: k, batch, lambda k, p: p, window_ms=1
+    )
+    assert batcher.call("z") == "z"
+    assert batcher.stats()["batches"] == 0
+
+
+def test_fare_batch_prompt_numbers_cities_and_reads_replies_by_number(monkeypatch):
+    from app.services import city_fares
+
+    prompts = []
+
+    def fake_ask(task, messages, validate, token):
+        prompts.append(messages[0]["content"])
+        reply = '{"1": {"city": "PARIS", "modes": {}}, "2": {"city": "?", "modes": {}}}'
+        return validate(reply), "model"
+
+    monkeypatch.setattr(city_fares, "ask_routed", fake_ask)
+    parts = city_fares._summarise_cities(["Paris", "New York", "Lima"], None)
+
+    assert "1) Paris\n2) New York\n3) Lima" in prompts[0]
+    assert "City: " not in prompts[0]
+    assert parts == {
+        "Paris": {"city": "PARIS", "modes": {}},
+        "New York": {"city": "?", "modes": {}},
+    }
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from app.services import model_router
+from app.services.model_router import ask_routed, router_stats
+
+
+def _coords(text):
+    obj = json.loads(text)
+    if obj.get("lat") is None:
+        raise ValueError("missing lat")
+    return obj["lat"], obj["lon"]
+
+
+def test_escalates_only_when_small_model_reply_is_invalid(monkeypatch):
+    replies = {"small": '{"lat": null}', "large": '{"lat": 51.5, "lon": -0.1}'}
+    asked = []
+
+    def fake_ask(model, messages, token=None):
+        asked.append(model)
+        return replies[model]
+
+    monkeypatch.setenv("LLM_TIERS_TEST_COORDS", "small,large")
+    monkeypatch.setattr(model_router, "ask_ollama", fake_ask)
+
+    assert ask_routed("test_coords", [], _coords) == ((51.5, -0.1), "large")
+    replies["small"] = '{"lat": 1, "lon": 2}'
+    assert ask_routed("test_coords", [], _coords) == ((1, 2), "small")
+    assert asked == ["small", "large", "small"]
+
+    stats = router_stats.stats()["test_coords"]
+    assert stats["tiers"] == ["small", "large"]
+    assert stats["calls"] == 2
+    assert stats["escalation_rate"] == 0.5
+    assert stats["models"]["small"]["invalid"] == 1
+    assert stats["models"]["small"]["accepted"] == 1
+    assert stats["models"]["large"]["accepted"] == 1
+
+
+def test_last_tier_failure_is_raised(monkeypatch):
+    monkeypatch.setenv("LLM_TIERS_TEST_BROKEN", "small,large")
+    monkeypatch.setattr(model_router, "ask_ollama", lambda m, msgs, t=None: "nope")
+    with pytest.raises(ValueError):
+        ask_routed("test_broken", [], _coords)
+    assert router_stats.stats()["test_broken"]["escalated"] == 1
@@ -0,0 +1,68 @@
+from app.services import airport_agent
+from app.services.transport_prompt import get_prompt, in_mode_group
+
+
+def _scope(prompt, answers):
+    # The catch-all scope also lists every grouped mode, so match it first
+    if "is NOT one of:" in prompt:
+        return "other"
+    return next(key for key in answers if f"one of: {key}." in prompt)
+
+
+def test_per_mode_lookup_merges_groups_and_dedupes_by_id(monkeypatch):
+    answers = {
+        '"train", "rail"': '[{"id": "hex", "mode": "train"}, {"id": "bus1", "mode": "bus"}]',
+        '"underground", "tube", "metro"': '[{"id": "picc", "mode": "underground"}]',
+        '"bus"': 'truncated [{"id": "bus1", "mode": "bus"',
+        '"coach"': '[{"id": "hex", "mode": "coach"}, {"id": "nx", "mode": "coach"}]',
+        '"taxi"': "[]",
+        "other": "[]",
+    }
+    calls = []
+
+    def fake_ask(model, messages, token):
+        scope = _scope(messages[1]["content"], answers)
+        calls.append(scope)
+        if scope == '"bus"' and calls.count(scope) > 1:
+            return '[{"id": "bus1", "mode": "bus"}]'
+        return answers[scope]
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    result = airport_agent.run_airport_lookup("LHR", per_mode=True, samples=1)
+
+    assert [t["id"] for t in result] == ["hex", "picc", "bus1", "nx"]
+    # Only the bus group retried
+    assert calls.count('"bus"') == 2
+    assert len(calls) == 7
+
+
+def test_per_mode_lookup_keeps_taxi_and_ungrouped_modes(monkeypatch):
+    answers = {
+        '"train", "rail"': '[{"id": "hex", "mode": "train"}, {"id": "cab", "mode": "taxi"}]',
+        '"underground", "tube", "metro"': "[]",
+        '"bus"': "[]",
+        '"coach"': "[]",
+        '"taxi"': '[{"id": "cab", "mode": "Taxi"}]',
+        "other": (
+            '[{"id": "tram", "mode": "tram"}, {"id": "ferry", "mode": "ferry"},'
+            ' {"id": "pod", "mode": "shuttle"}, {"id": "nx", "mode": "coach"}]'
+        ),
+    }
+
+    def fake_ask(model, messages, token):
+        return answers[_scope(messages[1]["content"], answers)]
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    result = airport_agent.run_airport_lookup("LGW", per_mode=True, samples=1)
+
+    # Each transport is kept once, by the group it belongs to
+    assert [t["id"] for t in result] == ["hex", "cab", "tram", "ferry", "pod"]
+    assert result[1]["mode"] == "Taxi"
+
+
+def test_catch_all_group_matches_only_ungrouped_modes():
+    assert in_mode_group("Ferry", "other")
+    assert in_mode_group(None, "other")
+    assert not in_mode_group("metro", "other")
+    assert not in_mode_group("tram", "taxi")
+    assert '"taxi"' in get_prompt("other")
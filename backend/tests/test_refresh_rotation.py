@@ -0,0 +1,33 @@
+import mongomock
+from unittest.mock import patch
+
+from app.auth import services
+
+
+def test_refresh_rotation_revokes_old_token_and_detects_reuse():
+    db = mongomock.MongoClient()["test_db"]
+    refresh_col = db["refreshTokens"]
+
+    with patch("app.auth.services.refresh_col", refresh_col):
+        user_id = "user-1"
+        token, _ = services.create_refresh_token_doc(user_id)
+        other_token, _ = services.create_refresh_token_doc(user_id)
+
+        rotated = services.verify_and_rotate_refresh_token(token)
+        assert rotated is not None
+        new_token, rotated_user = rotated
+        assert rotated_user == user_id
+        assert new_token != token
+
+        old_doc = refresh_col.find_one({"token_hash": services.hash_token(token)})
+        assert old_doc["revoked"] is True
+        new_doc = refresh_col.find_one({"token_hash": services.hash_token(new_token)})
+        assert new_doc["revoked"] is False
+
+        # Presenting the rotated-out token again revokes the whole family
+        assert services.verify_and_rotate_refresh_token(token) is None
+        assert refresh_col.count_documents({"user_id": user_id, "revoked": False}) == 0
+        assert services.verify_and_rotate_refresh_token(other_token) is None
+
+        # Unknown tokens are rejected without touching anything
+        assert services.verify_and_rotate_refresh_token("not-a-token") is None
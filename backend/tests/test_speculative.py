@@ -0,0 +1,45 @@
+import threading
+import time
+
+from app.services import airport_agent
+from app.services.speculative import first_valid, speculation_stats
+
+
+def test_first_valid_sample_wins_and_losers_are_cancelled(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+    loser_cancelled = threading.Event()
+
+    def fake_ask(model, messages, token):
+        with lock:
+            n = len(calls)
+            calls.append(token)
+        if n == 0:
+            return "not json at all"
+        if n == 1:
+            time.sleep(0.05)
+            return '[{"id": "lhr-train", "mode": "train"}]'
+        while not token.cancelled:
+            time.sleep(0.01)
+        loser_cancelled.set()
+        token.raise_if_cancelled()
+
+    monkeypatch.setattr(airport_agent, "ask_ollama", fake_ask)
+    result = airport_agent.run_airport_lookup("LHR", max_iters=1, samples=3)
+
+    assert result == [{"id": "lhr-train", "mode": "train"}]
+    assert len(calls) == 3
+    assert loser_cancelled.wait(1)
+    stats = speculation_stats.stats()["airport_agent"]
+    assert stats["races"] == 1
+    assert stats["samples_sent"] == 3
+    assert sum(stats["wins_by_sample"].values()) == 1
+    assert stats["win_latency_p95_seconds"] >= 0.05
+
+
+def test_first_valid_returns_fallback_when_nothing_validates():
+    outcome = first_valid(lambda token: "nope", lambda text: None, 2, operation="t")
+    assert outcome.index is None
+    assert outcome.text == "nope"
+    assert outcome.sent == 2
+    assert speculation_stats.stats()["t"]["no_valid"] == 1
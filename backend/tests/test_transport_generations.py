@@ -0,0 +1,211 @@
+import threading
+import time
+from datetime import datetime
+
+import mongomock
+from unittest.mock import patch
+
+from app.services import airport_transports
+
+
+def _transport(tid, name):
+    return {"id": tid, "name": name, "mode": "train", "stops": []}
+
+
+def test_generational_swap_keeps_previous_generation_and_sponsored_docs():
+    db = mongomock.MongoClient()["test_db"]
+    col = db[airport_transports.TRANSPORTS_COLLECTION]
+    # Pre-existing data written before generations existed
+    col.insert_many(
+        [
+            {"iata": "LHR", **_transport("old", "Old Express")},
+            {"iata": "LHR", "sponsored": True, **_transport("ad", "Sponsored")},
+        ]
+    )
+
+    with patch.object(airport_transports, "get_db", return_value=db):
+
+        def ids():
+            transports = airport_transports.get_transports_for_airport("LHR")
+            return sorted(t["id"] for t in transports)
+
+        assert ids() == ["ad", "old"]
+
+        first = airport_transports.replace_transports_for_airport(
+            "LHR", [_transport("gen1", "First")]
+        )
+        assert ids() == ["ad", "gen1"]
+
+        airport_transports.replace_transports_for_airport(
+            "LHR", [_transport("gen2", "Second")]
+        )
+        assert ids() == ["ad", "gen2"]
+        # legacy generation is garbage-collected, the previous one is kept
+        assert col.count_documents({"generation": "legacy"}) == 0
+        assert col.count_documents({"generation": first}) == 1
+
+        assert airport_transports.rollback_transports_for_airport("LHR") == first
+        assert ids() == ["ad", "gen1"]
+
+
+def test_rollback_without_history_returns_none():
+    db = mongomock.MongoClient()["test_db"]
+    with patch.object(airport_transports, "get_db", return_value=db):
+        assert airport_transports.rollback_transports_for_airport("LGW") is None
+
+
+def test_batch_read_matches_per_airport_reads():
+    db = mongomock.MongoClient()["test_db"]
+    col = db[airport_transports.TRANSPORTS_COLLECTION]
+    col.insert_many(
+        [
+            {"iata": "LGW", **_transport("legacy", "Legacy")},
+            {"iata": "LHR", "sponsored": True, **_transport("ad", "Sponsored")},
+        ]
+    )
+
+    with patch.object(airport_transports, "get_db", return_value=db):
+        for gen in ("gen1", "gen2"):
+            airport_transports.replace_transports_for_airport(
+                "LHR", [_transport(gen, gen)]
+            )
+
+        batch = airport_transports.get_transports_for_airports(["lhr", "LGW", "STN"])
+        assert set(batch) == {"LHR", "LGW", "STN"}
+        assert batch["STN"] == []
+
+        def by_id(transports):
+            return sorted(transports, key=lambda t: t["id"])
+
+        for iata in ("LHR", "LGW"):
+            single = airport_transports.get_transports_for_airport(iata)
+            assert by_id(batch[iata]) == by_id(single)
+        assert sorted(t["id"] for t in batch["LHR"]) == ["ad", "gen2"]
+
+
+class _Clock:
+    """Stands in for `datetime` in airport_transports with a settable utcnow()."""
+
+    def __init__(self):
+        self.now = datetime(2025, 1, 1)
+
+    def utcnow(self):
+        return self.now
+
+    def at(self, minute):
+        self.now = datetime(2025, 1, 1, 0, minute)
+
+
+def _interleave(monkeypatch, db, other_writer):
+    """Run `other_writer` after the next write's insert but before its swap."""
+    original = airport_transports._swap_generation
+    pending = [other_writer]
+
+    def swap(iata, generation, started_at):
+        if pending:
+            pending.pop()()
+        return original(iata, generation, started_at)
+
+    monkeypatch.setattr(airport_transports, "_swap_generation", swap)
+    monkeypatch.setattr(airport_transports, "get_db", lambda: db)
+    monkeypatch.setattr(airport_transports, "bump_version", lambda name: None)
+
+
+def _ids(iata="LHR"):
+    return sorted(t["id"] for t in airport_transports.get_transports_for_airport(iata))
+
+
+def test_overlapping_writer_keeps_newer_in_flight_generation(monkeypatch):
+    db = mongomock.MongoClient()["test_db"]
+    clock = _Clock()
+    monkeypatch.setattr(airport_transports, "datetime", clock)
+
+    def older_writer():
+        clock.at(10)
+        airport_transports.replace_transports_for_airport(
+            "LHR", [_transport("older", "Older")]
+        )
+
+    _interleave(monkeypatch, db, lambda: None)
+    airport_transports.replace_transports_for_airport("LHR", [_transport("gen0", "0")])
+    # The older writer finishes (and garbage-collects) while this one waits
+    _interleave(monkeypatch, db, older_writer)
+    clock.at(20)
+    newer = airport_transports.replace_transports_for_airport(
+        "LHR", [_transport("newer", "Newer")]
+    )
+
+    assert _ids() == ["newer"]
+    assert airport_transports.get_transport_generation("LHR")["current"] == newer
+    col = db[airport_transports.TRANSPORTS_COLLECTION]
+    assert col.count_documents({"id": "gen0"}) == 0
+    assert col.count_documents({"id": "older"}) == 1
+
+
+def test_overlapping_writer_that_started_first_does_not_swap(monkeypatch):
+    db = mongomock.MongoClient()["test_db"]
+    clock = _Clock()
+    monkeypatch.setattr(airport_transports, "datetime", clock)
+
+    def newer_writer():
+        clock.at(20)
+        airport_transports.replace_transports_for_airport(
+            "LHR", [_transport("newer", "Newer")]
+        )
+
+    _interleave(monkeypatch, db, lambda: None)
+    airport_transports.replace_transports_for_airport("LHR", [_transport("gen0", "0")])
+    _interleave(monkeypatch, db, newer_writer)
+    clock.at(10)
+    served = airport_transports.replace_transports_for_airport(
+        "LHR", [_transport("older", "Older")]
+    )
+
+    assert _ids() == ["newer"]
+    assert airport_transports.get_transport_generation("LHR")["current"] == served
+    col = db[airport_transports.TRANSPORTS_COLLECTION]
+    assert col.count_documents({"id": "older"}) == 0
+
+
+def test_concurrent_regenerations_share_one_agent_run(monkeypatch):
+    from app.services import transport_freshness
+
+    release = threading.Event()
+    runs = []
+
+    def slow_lookup(iata):
+        runs.append(iata)
+        release.wait(timeout=5)
+        return [_transport("gen", "Generated")]
+
+    stored = []
+    monkeypatch.setattr(transport_freshness, "run_airport_lookup", slow_lookup)
+    monkeypatch.setattr(
+        transport_freshness,
+        "replace_transports_for_airport",
+        lambda iata, docs: stored.append(iata),
+    )
+    monkeypatch.setattr(transport_freshness, "clear_failed_lookup", lambda iata: None)
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                transport_freshness.regenerate_transports("lhr")
+            )
+        )
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    while not runs:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert runs == ["LHR"]
+    assert stored == ["LHR"]
+    assert len(results) == 3
+    assert all(r == results[0] for r in results)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import mongomock
+from fastapi.testclient import TestClient
+
+from app.services import airport_transports
+
+
+def _setup(monkeypatch, known=("LHR",)):
+    from app.routers import api
+
+    db = mongomock.MongoClient()["test_db"]
+    monkeypatch.setattr(airport_transports, "get_db", lambda: db)
+    monkeypatch.setattr(api, "get_version", lambda name: {"version": 1})
+    monkeypatch.setattr(api.airport_registry, "loaded", False)
+    monkeypatch.setattr(
+        api,
+        "get_airport_by_iata",
+        lambda iata: {"iata": iata} if iata in known else None,
+    )
+    runs = []
+
+    def empty_lookup(iata, token=None):
+        runs.append(iata)
+        return []
+
+    monkeypatch.setattr(api, "run_airport_lookup", empty_lookup)
+    return db, runs
+
+
+def test_unknown_airport_is_rejected_without_running_the_agent(monkeypatch):
+    from app.main import app
+
+    _, runs = _setup(monkeypatch)
+    r = TestClient(app).get("/airports/ZZZ/transports")
+    assert r.status_code == 404
+    assert runs == []
+
+
+def test_empty_lookup_is_cached_until_backoff_expires(monkeypatch):
+    from app.main import app
+
+    db, runs = _setup(monkeypatch)
+    client = TestClient(app)
+    for _ in range(3):
+        r = client.get("/airports/LHR/transports")
+        assert r.status_code == 200
+        assert r.json() == {"transports": []}
+    assert runs == ["LHR"]
+    miss = db[airport_transports.TRANSPORT_MISSES_COLLECTION].find_one({"iata": "LHR"})
+    assert miss["reason"] == "empty_result"
+    assert miss["failures"] == 1
+
+
+def test_expired_transports_in_backoff_are_served_without_regenerating(
+    monkeypatch,
+):
+    from app.main import app
+    from app.routers import api
+
+    _setup(monkeypatch)
+    expired = [{"iata": "LHR", "mode": "train", "updated_at": datetime(2000, 1, 1)}]
+    monkeypatch.setattr(api, "get_transports_for_airport", lambda iata: expired)
+    regenerated = []
+    monkeypatch.setattr(
+        api, "regenerate_transports", lambda iata: regenerated.append(iata) or []
+    )
+    airport_transports.record_failed_lookup("LHR", "agent_error")
+
+    r = TestClient(app).get("/airports/LHR/transports")
+    assert r.status_code == 200
+    assert r.headers["X-Data-Freshness"] == "expired"
+    assert r.json()["transports"][0]["mode"] == "train"
+    assert regenerated == []
+
+
+def test_backoff_doubles_per_consecutive_failure(monkeypatch):
+    db = mongomock.MongoClient()["test_db"]
+    monkeypatch.setattr(airport_transports, "get_db", lambda: db)
+
+    first = airport_transports.record_failed_lookup("lhr", "empty_result")
+    second = airport_transports.record_failed_lookup("LHR", "agent_error")
+
+    def delay(entry):
+        return (entry["retry_at"] - entry["last_failed_at"]).total_seconds()
+
+    assert second["failures"] == 2
+    assert delay(second) == min(
+        2 * delay(first), airport_transports.NEGATIVE_CACHE_MAX_SECONDS
+    )
+    assert airport_transports.get_failed_lookup("LHR")["reason"] == "agent_error"
+
+    airport_transports.clear_failed_lookup("LHR")
+    assert airport_transports.get_failed_lookup("LHR") is None
@@ -0,0 +1,59 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.services.json_stream import ArrayItemStream
+
+
+def test_array_item_stream_emits_objects_as_they_complete():
+    stream = ArrayItemStream()
+    text = '```json\n[{"name": "a}]\\"", "stops": [{"lat": 1}]}, {"name": "b"}, {"na'
+    items = []
+    for i in range(0, len(text), 4):
+        items += stream.feed(text[i : i + 4])
+    assert items == [{"name": 'a}]"', "stops": [{"lat": 1}]}, {"name": "b"}]
+    assert not stream.done
+    assert stream.feed('me": "c"}]') == [{"name": "c"}]
+    assert stream.done
+
+
+def test_stream_endpoint_emits_transports_then_saved(monkeypatch):
+    from app.main import app
+    from app.routers import api
+
+    def fake_lookup(iata, stream=False):
+        yield "status", {"attempt": 1}
+        yield "transport", {"attempt": 1, "index": 0, "transport": {"id": "x"}}
+        yield "retry", {"attempt": 1, "reason": "invalid_json"}
+        yield "status", {"attempt": 2}
+        yield "transport", {"attempt": 2, "index": 0, "transport": {"id": "y"}}
+        yield "result", [{"id": "y"}]
+
+    saved = {}
+    monkeypatch.setattr(api.airport_registry, "loaded", False)
+    monkeypatch.setattr(api, "get_airport_by_iata", lambda iata: {"iata": iata})
+    monkeypatch.setattr(api, "get_transports_for_airport", lambda iata: [])
+    monkeypatch.setattr(api, "get_failed_lookup", lambda iata: None)
+    monkeypatch.setattr(api, "clear_failed_lookup", lambda iata: None)
+    monkeypatch.setattr(api, "iter_airport_lookup", fake_lookup)
+    monkeypatch.setattr(
+        api,
+        "replace_transports_for_airport",
+        lambda iata, docs: saved.setdefault(iata, docs) and "gen-1",
+    )
+
+    r = TestClient(app).get("/airports/LHR/transports/stream?format=ndjson")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert [e["type"] for e in events] == [
+        "status",
+        "transport",
+        "retry",
+        "status",
+        "transport",
+        "saved",
+    ]
+    assert events[-1]["transports"] == [{"id": "y"}]
+    assert events[-1]["generation"] == "gen-1"
+    assert saved == {"LHR": [{"id": "y"}]}